@@ -0,0 +1,134 @@
+-- Add Contact Rollup
+-- Per-contact counts, opportunity value and last activity, maintained incrementally
+-- by the sync write path so exports, the UI and validation don't re-aggregate.
+-- Run after schema.sql
+
+create table if not exists keap.contact_rollup (
+    contact_id bigint primary key references keap.contacts(id) on delete cascade,
+    opportunity_count int not null default 0,
+    opportunity_value numeric(18,2),
+    task_count int not null default 0,
+    open_task_count int not null default 0,
+    note_count int not null default 0,
+    tag_count int not null default 0,
+    last_activity_at timestamptz,
+    refreshed_at timestamptz not null default now()
+);
+
+create index if not exists idx_contact_rollup_last_activity on keap.contact_rollup(last_activity_at);
+
+-- Recompute the rollup for the given contacts only (called once per upsert batch).
+-- Each child is looked up through its contact_id index.
+create or replace function keap.refresh_contact_rollup(_contact_ids bigint[])
+returns int
+language sql as $$
+    with upserted as (
+        insert into keap.contact_rollup as r (
+            contact_id, opportunity_count, opportunity_value, task_count, open_task_count,
+            note_count, tag_count, last_activity_at, refreshed_at
+        )
+        select
+            c.id,
+            o.opportunity_count,
+            o.opportunity_value,
+            t.task_count,
+            t.open_task_count,
+            n.note_count,
+            ct.tag_count,
+            nullif(greatest(
+                coalesce(o.last_updated, '-infinity'),
+                coalesce(t.last_updated, '-infinity'),
+                coalesce(n.last_updated, '-infinity')
+            ), '-infinity'),
+            now()
+        from keap.contacts c
+        cross join lateral (
+            select count(*)::int as opportunity_count,
+                   sum(value)::numeric(18,2) as opportunity_value,
+                   max(updated_at) as last_updated
+            from keap.opportunities where contact_id = c.id
+        ) o
+        cross join lateral (
+            select count(*)::int as task_count,
+                   count(*) filter (where completed_date is null)::int as open_task_count,
+                   max(updated_at) as last_updated
+            from keap.tasks where contact_id = c.id
+        ) t
+        cross join lateral (
+            select count(*)::int as note_count, max(updated_at) as last_updated
+            from keap.notes where contact_id = c.id
+        ) n
+        cross join lateral (
+            select count(*)::int as tag_count from keap.contact_tags where contact_id = c.id
+        ) ct
+        where c.id = any(_contact_ids)
+        on conflict (contact_id) do update set
+            opportunity_count = excluded.opportunity_count,
+            opportunity_value = excluded.opportunity_value,
+            task_count = excluded.task_count,
+            open_task_count = excluded.open_task_count,
+            note_count = excluded.note_count,
+            tag_count = excluded.tag_count,
+            last_activity_at = excluded.last_activity_at,
+            refreshed_at = excluded.refreshed_at
+        returning 1
+    )
+    select count(*)::int from upserted;
+$$;
+
+-- Full rebuild from set-based aggregates, for backfill or after manual data fixes
+create or replace function keap.rebuild_contact_rollup()
+returns int
+language plpgsql as $$
+declare
+    affected int;
+begin
+    truncate keap.contact_rollup;
+
+    insert into keap.contact_rollup (
+        contact_id, opportunity_count, opportunity_value, task_count, open_task_count,
+        note_count, tag_count, last_activity_at
+    )
+    select
+        c.id,
+        coalesce(o.opportunity_count, 0),
+        o.opportunity_value,
+        coalesce(t.task_count, 0),
+        coalesce(t.open_task_count, 0),
+        coalesce(n.note_count, 0),
+        coalesce(ct.tag_count, 0),
+        nullif(greatest(
+            coalesce(o.last_updated, '-infinity'),
+            coalesce(t.last_updated, '-infinity'),
+            coalesce(n.last_updated, '-infinity')
+        ), '-infinity')
+    from keap.contacts c
+    left join (
+        select contact_id, count(*) as opportunity_count,
+               sum(value)::numeric(18,2) as opportunity_value, max(updated_at) as last_updated
+        from keap.opportunities group by contact_id
+    ) o on o.contact_id = c.id
+    left join (
+        select contact_id, count(*) as task_count,
+               count(*) filter (where completed_date is null) as open_task_count,
+               max(updated_at) as last_updated
+        from keap.tasks group by contact_id
+    ) t on t.contact_id = c.id
+    left join (
+        select contact_id, count(*) as note_count, max(updated_at) as last_updated
+        from keap.notes group by contact_id
+    ) n on n.contact_id = c.id
+    left join (
+        select contact_id, count(*) as tag_count from keap.contact_tags group by contact_id
+    ) ct on ct.contact_id = c.id;
+
+    get diagnostics affected = row_count;
+    return affected;
+end $$;
+
+-- Backfill
+select keap.rebuild_contact_rollup();
+
+comment on table keap.contact_rollup is 'Per-contact activity rollup, refreshed for touched contacts on every sync batch';
+comment on function keap.refresh_contact_rollup(bigint[]) is 'Recomputes contact_rollup rows for the given contact ids';
+comment on function keap.rebuild_contact_rollup() is 'Rebuilds contact_rollup for all contacts';
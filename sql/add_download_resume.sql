@@ -0,0 +1,18 @@
+-- Add Download Resume
+-- Tracks partially downloaded files in keap.file_download_log so an interrupted
+-- download resumes with an HTTP Range request instead of starting over.
+-- Run after add_file_storage.sql
+
+alter table keap.file_download_log add column if not exists file_url text;
+alter table keap.file_download_log add column if not exists temp_path text;
+alter table keap.file_download_log add column if not exists bytes_received bigint;
+-- ETag or Last-Modified of the partial content, sent back as If-Range
+alter table keap.file_download_log add column if not exists validator text;
+alter table keap.file_download_log add column if not exists updated_at timestamptz default now();
+
+-- At most one open partial per staging file
+create unique index if not exists idx_file_download_log_partial
+    on keap.file_download_log(temp_path) where operation = 'partial';
+
+comment on column keap.file_download_log.temp_path is 'Staging file under files/temp for partial downloads';
+comment on column keap.file_download_log.bytes_received is 'Bytes already in the staging file';
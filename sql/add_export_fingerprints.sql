@@ -0,0 +1,53 @@
+-- Add Export Fingerprints
+-- Lets bulk exports skip tables that have not changed since their last export.
+-- Run after keap_etl_support.sql
+
+-- Last export of each table per export shape (format + options that change the file)
+create table if not exists keap_meta.export_fingerprint (
+    schema_name text not null,
+    table_name text not null,
+    export_key text not null,
+    fingerprint text not null,
+    row_count bigint not null,
+    file_path text not null,
+    exported_at timestamptz not null default now(),
+    primary key (schema_name, table_name, export_key)
+);
+
+-- Cheap change fingerprint: row count, id range/sum and the synced_at markers
+-- from sql/add_sync_markers.sql. The sync stamps synced_at on every insert and
+-- payload change, so the sum of the markers moves even when the changed row is
+-- not the newest one (Keap's updated_at can be old or NULL, so it is not used).
+-- Inserts and deletes also move the count or id aggregates. Tables without
+-- synced_at fall back to the full table_digest checksum.
+create or replace function keap_meta.table_fingerprint(_schema text, _table text)
+returns table(row_count bigint, fingerprint text)
+language plpgsql stable as $$
+declare
+  sql text;
+  has_id_col boolean;
+  has_synced_col boolean;
+begin
+  select coalesce(bool_or(column_name = 'id'), false),
+         coalesce(bool_or(column_name = 'synced_at'), false)
+  into has_id_col, has_synced_col
+  from information_schema.columns
+  where table_schema = _schema and table_name = _table;
+
+  if has_synced_col then
+    sql := format($f$
+      select count(*)::bigint,
+             md5(concat_ws('|', count(*), %s, max(synced_at), sum(extract(epoch from synced_at)::numeric)))
+      from %I.%I
+    $f$, case when has_id_col then 'min(id), max(id), sum(id)' else 'null' end, _schema, _table);
+  else
+    sql := format($f$
+      select d.row_count, d.checksum_md5 from keap_meta.table_digest(%L, %L) d
+    $f$, _schema, _table);
+  end if;
+
+  return query execute sql;
+end $$;
+
+comment on table keap_meta.export_fingerprint is 'Fingerprint and file of the last export per table and export shape';
+comment on function keap_meta.table_fingerprint(text, text) is 'Cheap change fingerprint used to skip unchanged tables on export';
@@ -0,0 +1,10 @@
+-- Add File Compression
+-- With FILE_COMPRESSION=zstd, compressible downloads (text, PDF, email, ...) are
+-- stored as objects/ab/cd/<sha256>.zst; file_size stays the original size.
+-- Run after add_file_objects.sql
+
+alter table keap.contact_files add column if not exists stored_size bigint;
+alter table keap.contact_files add column if not exists compression text;
+
+comment on column keap.contact_files.stored_size is 'Bytes on disk for the stored object (after compression)';
+comment on column keap.contact_files.compression is 'Compression of the stored object (zstd), or null when stored as-is';
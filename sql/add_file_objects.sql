@@ -0,0 +1,10 @@
+-- Add File Objects
+-- Downloaded files are stored once per content hash under files/objects/ab/cd/<sha256>;
+-- per-contact paths are hardlinks to (or, where hardlinks fail, references of) the object.
+-- Run after add_file_storage.sql
+
+alter table keap.contact_files add column if not exists content_hash text;
+
+create index if not exists idx_contact_files_content_hash on keap.contact_files(content_hash);
+
+comment on column keap.contact_files.content_hash is 'SHA-256 of the downloaded content; names the shared object file';
@@ -0,0 +1,52 @@
+-- Add File Sync State
+-- Lets the contact file sync visit only contacts changed since its last run and
+-- resume an interrupted run from its last checkpointed contact id.
+-- Run after add_file_storage.sql and keap_etl_support.sql
+
+-- One row per sync scope ('contact_files')
+create table if not exists keap_meta.file_sync_state (
+    name text primary key,
+    -- contacts.updated_at covered by the last completed run
+    watermark timestamptz,
+    -- max(contacts.updated_at) when the current run started; becomes the watermark on completion
+    target_watermark timestamptz,
+    -- every selected contact with id <= last_contact_id has been processed
+    last_contact_id bigint,
+    status text not null default 'completed' check (status in ('running', 'completed')),
+    run_started_at timestamptz,
+    updated_at timestamptz default now()
+);
+
+-- Contacts the contact sync changed, picked up by the next file sync even
+-- when Keap's last_updated did not move
+create table if not exists keap.file_sync_pending (
+    contact_id bigint primary key references keap.contacts(id) on delete cascade,
+    flagged_at timestamptz not null default now()
+);
+
+create or replace function keap.flag_contact_file_sync()
+returns trigger
+language plpgsql as $$
+begin
+    insert into keap.file_sync_pending (contact_id) values (new.id)
+    on conflict (contact_id) do update set flagged_at = now();
+    return null;
+end $$;
+
+drop trigger if exists contacts_flag_file_sync_insert on keap.contacts;
+create trigger contacts_flag_file_sync_insert
+    after insert on keap.contacts
+    for each row execute function keap.flag_contact_file_sync();
+
+-- Re-upserting an unchanged contact does not flag it
+drop trigger if exists contacts_flag_file_sync_update on keap.contacts;
+create trigger contacts_flag_file_sync_update
+    after update on keap.contacts
+    for each row when (old.raw is distinct from new.raw)
+    execute function keap.flag_contact_file_sync();
+
+-- Per-contact timings are written to file_download_log by each run
+create index if not exists idx_file_download_log_contact on keap.file_download_log(contact_id, created_at);
+
+comment on table keap_meta.file_sync_state is 'Watermark and checkpoint of the incremental contact file sync';
+comment on table keap.file_sync_pending is 'Contacts flagged by the contact sync for the next file sync';
@@ -238,6 +238,55 @@ begin
 end;
 $$ language plpgsql;
 
+-- One row per health sample with metrics pivoted into columns, so memory spikes
+-- and stalls can be lined up against the entity and page being fetched
+create or replace view keap_meta.system_health_timeline as
+select
+    sh.run_id,
+    date_trunc('second', sh.recorded_at) as sampled_at,
+    sh.tags->>'entity' as entity,
+    (sh.tags->>'page')::int as page,
+    max(sh.metric_value) filter (where sh.metric_name = 'memory_rss') as rss_mb,
+    max(sh.metric_value) filter (where sh.metric_name = 'cpu_usage') as cpu_percent,
+    max(sh.metric_value) filter (where sh.metric_name = 'cpu_time') as cpu_time_seconds,
+    max(sh.metric_value) filter (where sh.metric_name = 'gc_pause') as gc_pause_ms,
+    max(sh.metric_value) filter (where sh.metric_name = 'db_connections') as db_connections,
+    max(sh.metric_value) filter (where sh.metric_name = 'http_connections_in_use') as http_connections_in_use,
+    max(sh.metric_value) filter (where sh.metric_name = 'pages_in_flight') as pages_in_flight,
+    max(sh.metric_value) filter (where sh.metric_name = 'throttle_remaining') as throttle_remaining
+from keap_meta.system_health sh
+group by sh.run_id, date_trunc('second', sh.recorded_at), sh.tags->>'entity', (sh.tags->>'page')::int;
+
+-- Function to summarize health samples per entity for a run
+create or replace function keap_meta.get_system_health_summary(run_id_param bigint)
+returns table(
+    entity text,
+    samples bigint,
+    peak_rss_mb numeric,
+    avg_cpu_percent numeric,
+    total_gc_pause_ms numeric,
+    max_db_connections numeric,
+    max_http_connections_in_use numeric,
+    min_throttle_remaining numeric
+) as $$
+begin
+    return query
+    select
+        coalesce(t.entity, '(idle)'),
+        count(*),
+        max(t.rss_mb),
+        round(avg(t.cpu_percent), 1),
+        sum(t.gc_pause_ms),
+        max(t.db_connections),
+        max(t.http_connections_in_use),
+        min(t.throttle_remaining)
+    from keap_meta.system_health_timeline t
+    where t.run_id = run_id_param
+    group by t.entity
+    order by min(t.sampled_at);
+end;
+$$ language plpgsql;
+
 -- Add comments
 comment on table keap_meta.etl_request_metrics is 'Detailed metrics for each API request';
 comment on table keap_meta.entity_performance is 'Performance metrics aggregated per entity';
@@ -248,3 +297,5 @@ comment on function keap_meta.calculate_entity_performance(bigint, text) is 'Cal
 comment on function keap_meta.get_run_performance_summary(bigint) is 'Returns performance summary for a run';
 comment on function keap_meta.get_throttle_analysis(bigint) is 'Returns throttle analysis for a run';
 comment on function keap_meta.get_error_analysis(bigint) is 'Returns error analysis for a run';
+comment on view keap_meta.system_health_timeline is 'Health samples pivoted to one row per sample with entity/page context';
+comment on function keap_meta.get_system_health_summary(bigint) is 'Returns per-entity resource usage summary for a run';
@@ -0,0 +1,18 @@
+-- Add Search Indexes
+-- Back the UI Entity Browser search so ILIKE '%term%' on names and emails and
+-- full-text search on note bodies use indexes instead of sequential scans.
+-- Run after schema.sql
+
+create extension if not exists pg_trgm;
+
+-- Contacts: given_name / family_name / email ILIKE
+create index if not exists idx_contacts_given_name_trgm on keap.contacts using gin (given_name gin_trgm_ops);
+create index if not exists idx_contacts_family_name_trgm on keap.contacts using gin (family_name gin_trgm_ops);
+create index if not exists idx_contacts_email_trgm on keap.contacts using gin (email gin_trgm_ops);
+
+-- Companies: name ILIKE
+create index if not exists idx_companies_name_trgm on keap.companies using gin (name gin_trgm_ops);
+
+-- Notes: title ILIKE, body full-text (expression must match the UI query)
+create index if not exists idx_notes_title_trgm on keap.notes using gin (title gin_trgm_ops);
+create index if not exists idx_notes_body_fts on keap.notes using gin (to_tsvector('english', coalesce(body, '')));
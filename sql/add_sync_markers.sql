@@ -0,0 +1,38 @@
+-- Add Sync Markers
+-- Stamps keap.<entity>.synced_at whenever the sync inserts a row or changes its
+-- raw payload, so incremental dataset exports select rows by when Postgres got
+-- them rather than by Keap's updated_at (which can be old or NULL).
+-- Run after schema.sql
+
+create or replace function keap.touch_synced_at()
+returns trigger
+language plpgsql as $$
+begin
+    -- now() is the writing transaction's start; exports bound their reads accordingly
+    new.synced_at := now();
+    return new;
+end $$;
+
+do $$
+declare
+    tbl text;
+begin
+    -- Every entity table with a raw payload and an updated_at column
+    for tbl in
+        select c.table_name
+        from information_schema.columns c
+        join information_schema.columns u
+          on u.table_schema = c.table_schema and u.table_name = c.table_name and u.column_name = 'updated_at'
+        join information_schema.tables t
+          on t.table_schema = c.table_schema and t.table_name = c.table_name and t.table_type = 'BASE TABLE'
+        where c.table_schema = 'keap' and c.column_name = 'raw'
+    loop
+        execute format('alter table keap.%I add column if not exists synced_at timestamptz not null default now()', tbl);
+        execute format('create index if not exists %I on keap.%I (synced_at)', 'idx_' || tbl || '_synced_at', tbl);
+        execute format('drop trigger if exists %I on keap.%I', tbl || '_touch_synced_at', tbl);
+        -- Re-upserting an unchanged row keeps its marker
+        execute format('create trigger %I before update on keap.%I for each row '
+                       'when (old.raw is distinct from new.raw) execute function keap.touch_synced_at()',
+                       tbl || '_touch_synced_at', tbl);
+    end loop;
+end $$;
@@ -0,0 +1,174 @@
+-- Add Throttle Wait Accounting
+-- Records why each throttle wait happened and splits entity time into throttled vs working.
+-- Run after add_observability_metrics.sql
+
+-- Why the client waited: critical/low/medium header backoff, retry_after, or http_429
+alter table keap_meta.throttle_events
+    add column if not exists reason text;
+
+-- Time split per entity
+alter table keap_meta.entity_performance
+    add column if not exists throttle_wait_ms bigint default 0,
+    add column if not exists working_ms bigint default 0;
+
+-- calculate_entity_performance upserts on (run_id, entity). Earlier versions
+-- inserted a row per call, so keep only the latest row of each pair first.
+delete from keap_meta.entity_performance ep
+using keap_meta.entity_performance newer
+where newer.run_id = ep.run_id
+  and newer.entity = ep.entity
+  and newer.id > ep.id;
+
+create unique index if not exists uq_entity_performance_run_entity
+    on keap_meta.entity_performance(run_id, entity);
+
+create index if not exists idx_throttle_events_reason on keap_meta.throttle_events(run_id, reason);
+
+-- Recalculate entity performance including throttle wait vs working time.
+-- Page durations include the client's throttle sleeps, so working time is the remainder.
+create or replace function keap_meta.calculate_entity_performance(
+    run_id_param bigint,
+    entity_name text
+)
+returns void as $$
+declare
+    total_pages int;
+    total_items int;
+    total_duration_ms int;
+    avg_page_duration_ms numeric;
+    min_page_duration_ms int;
+    max_page_duration_ms int;
+    throttle_hits int;
+    retry_attempts int;
+    error_count int;
+    throughput_items_per_second numeric;
+    throttle_wait_ms bigint;
+begin
+    select
+        count(*),
+        sum(item_count),
+        sum(duration_ms),
+        avg(duration_ms),
+        min(duration_ms),
+        max(duration_ms),
+        count(case when throttle_remaining < 100 then 1 end),
+        sum(retry_count),
+        count(case when error_message is not null then 1 end)
+    into
+        total_pages,
+        total_items,
+        total_duration_ms,
+        avg_page_duration_ms,
+        min_page_duration_ms,
+        max_page_duration_ms,
+        throttle_hits,
+        retry_attempts,
+        error_count
+    from keap_meta.etl_request_metrics
+    where run_id = run_id_param and entity = entity_name;
+
+    select coalesce(sum(te.wait_time_ms), 0)
+    into throttle_wait_ms
+    from keap_meta.throttle_events te
+    where te.run_id = run_id_param and te.entity = entity_name;
+
+    if total_duration_ms > 0 then
+        throughput_items_per_second := (total_items * 1000.0) / total_duration_ms;
+    else
+        throughput_items_per_second := 0;
+    end if;
+
+    insert into keap_meta.entity_performance (
+        run_id, entity, total_pages, total_items, total_duration_ms,
+        avg_page_duration_ms, min_page_duration_ms, max_page_duration_ms,
+        throttle_hits, retry_attempts, error_count, throughput_items_per_second,
+        throttle_wait_ms, working_ms
+    )
+    values (
+        run_id_param, entity_name, total_pages, total_items, total_duration_ms,
+        avg_page_duration_ms, min_page_duration_ms, max_page_duration_ms,
+        throttle_hits, retry_attempts, error_count, throughput_items_per_second,
+        throttle_wait_ms, greatest(coalesce(total_duration_ms, 0) - throttle_wait_ms, 0)
+    )
+    on conflict (run_id, entity) do update set
+        total_pages = excluded.total_pages,
+        total_items = excluded.total_items,
+        total_duration_ms = excluded.total_duration_ms,
+        avg_page_duration_ms = excluded.avg_page_duration_ms,
+        min_page_duration_ms = excluded.min_page_duration_ms,
+        max_page_duration_ms = excluded.max_page_duration_ms,
+        throttle_hits = excluded.throttle_hits,
+        retry_attempts = excluded.retry_attempts,
+        error_count = excluded.error_count,
+        throughput_items_per_second = excluded.throughput_items_per_second,
+        throttle_wait_ms = excluded.throttle_wait_ms,
+        working_ms = excluded.working_ms,
+        created_at = now();
+end;
+$$ language plpgsql;
+
+-- count()/sum() return bigint; cast to match the declared result columns
+create or replace function keap_meta.get_throttle_analysis(run_id_param bigint)
+returns table(
+    entity text,
+    endpoint text,
+    throttle_type text,
+    throttle_events int,
+    avg_throttle_remaining numeric,
+    total_wait_time_ms int
+) as $$
+begin
+    return query
+    select
+        te.entity,
+        te.endpoint,
+        te.throttle_type,
+        count(*)::int as throttle_events,
+        avg(te.throttle_remaining) as avg_throttle_remaining,
+        sum(te.wait_time_ms)::int as total_wait_time_ms
+    from keap_meta.throttle_events te
+    where te.run_id = run_id_param
+    group by te.entity, te.endpoint, te.throttle_type
+    order by throttle_events desc;
+end;
+$$ language plpgsql;
+
+-- Throttled vs working time per entity, to tell whether a run was quota-bound
+create or replace function keap_meta.get_throttle_time_split(run_id_param bigint)
+returns table(
+    entity text,
+    throttle_events int,
+    http_429_count int,
+    throttle_wait_ms bigint,
+    working_ms bigint,
+    throttled_pct numeric
+) as $$
+begin
+    return query
+    select
+        ep.entity,
+        coalesce(te.events, 0)::int,
+        coalesce(te.http_429, 0)::int,
+        coalesce(ep.throttle_wait_ms, 0),
+        coalesce(ep.working_ms, 0),
+        case when coalesce(ep.throttle_wait_ms, 0) + coalesce(ep.working_ms, 0) > 0
+             then round(100.0 * ep.throttle_wait_ms / (ep.throttle_wait_ms + ep.working_ms), 1)
+             else 0 end
+    from keap_meta.entity_performance ep
+    left join (
+        select t.entity,
+               count(*) as events,
+               count(*) filter (where t.reason = 'http_429') as http_429
+        from keap_meta.throttle_events t
+        where t.run_id = run_id_param
+        group by t.entity
+    ) te on te.entity = ep.entity
+    where ep.run_id = run_id_param
+    order by ep.throttle_wait_ms desc nulls last;
+end;
+$$ language plpgsql;
+
+comment on column keap_meta.throttle_events.reason is 'Why the wait happened: critical/low/medium header backoff, retry_after, http_429';
+comment on column keap_meta.entity_performance.throttle_wait_ms is 'Time spent waiting on throttling';
+comment on column keap_meta.entity_performance.working_ms is 'Request time not spent waiting on throttling';
+comment on function keap_meta.get_throttle_time_split(bigint) is 'Returns throttled vs working time per entity for a run';
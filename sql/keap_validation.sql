@@ -111,10 +111,26 @@ select
   (select count(*) from keap.tasks) as tasks,
   (select count(*) from keap.notes) as notes;
 
+-- Per-contact coverage from the rollup (add_contact_rollup.sql, installed by make setup-db)
 select
-  (select count(distinct contact_id) from keap.contact_tags) as contacts_with_tags,
-  (select count(distinct contact_id) from keap.opportunities) as contacts_with_opps,
-  (select count(distinct contact_id) from keap.tasks) as contacts_with_tasks;
+  count(*) filter (where tag_count > 0) as contacts_with_tags,
+  count(*) filter (where opportunity_count > 0) as contacts_with_opps,
+  count(*) filter (where task_count > 0) as contacts_with_tasks,
+  count(*) filter (where note_count > 0) as contacts_with_notes
+from keap.contact_rollup;
+
+-- Contacts missing a rollup row (expect 0; run keap.rebuild_contact_rollup() if not)
+select count(*) as contacts_without_rollup
+from keap.contacts c
+where not exists (select 1 from keap.contact_rollup r where r.contact_id = c.id);
+
+-- Rollup drift on a sample against live child counts (expect no rows)
+select r.contact_id, r.tag_count, r.opportunity_count, r.task_count, r.note_count
+from (select * from keap.contact_rollup order by random() limit 500) r
+where r.tag_count <> (select count(*) from keap.contact_tags ct where ct.contact_id = r.contact_id)
+   or r.opportunity_count <> (select count(*) from keap.opportunities o where o.contact_id = r.contact_id)
+   or r.task_count <> (select count(*) from keap.tasks t where t.contact_id = r.contact_id)
+   or r.note_count <> (select count(*) from keap.notes n where n.contact_id = r.contact_id);
 
 -- 6) Required fields sanity
 select id from keap.companies where coalesce(name,'') = '' limit 100;
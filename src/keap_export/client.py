@@ -1,20 +1,115 @@
 from __future__ import annotations
-import time, typing as t
+import threading, time, typing as t
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import requests
 from tenacity import retry, stop_after_attempt, wait_exponential_jitter
 from .config import Settings
 from .auth import load_token_bundle, refresh_tokens, save_token_bundle
 
+class RateLimiter:
+    """
+    Thread-safe request pacing shared by all threads using one client.
+    
+    Requests are spaced evenly at ``per_minute`` (0 disables pacing);
+    ``hold`` pushes the next slot back for everyone, e.g. while the API
+    reports a throttle.
+    """
+    
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+    
+    def acquire(self) -> float:
+        """Wait for the next request slot; returns the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        wait = start - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+    
+    def hold(self, seconds: float) -> None:
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+_backoff = wait_exponential_jitter(initial=1, max=30)
+
+def _throttled_response(retry_state) -> t.Optional[requests.Response]:
+    """The 429 response behind a failed attempt, if that is why it failed."""
+    response = getattr(retry_state.outcome.exception(), 'response', None)
+    if response is not None and response.status_code == 429:
+        return response
+    return None
+
+def _retry_wait(retry_state) -> float:
+    """Honour Retry-After on 429s; back off exponentially on other failures."""
+    response = _throttled_response(retry_state)
+    if response is not None:
+        return KeapClient.retry_after_seconds(response)
+    return _backoff(retry_state)
+
+def _before_retry_sleep(retry_state) -> None:
+    """Account for every 429 wait and hold other threads sharing the client."""
+    if _throttled_response(retry_state) is None:
+        return
+    client = retry_state.args[0]
+    wait_seconds = retry_state.next_action.sleep
+    client.record_throttle_wait(wait_seconds, client.last_throttle_type or 'http_429',
+                                client.last_throttle_remaining, 'http_429')
+    client.rate_limiter.hold(wait_seconds)
+
+class _PerThread:
+    """Client attribute kept per thread: the request that thread made last."""
+    
+    def __init__(self, default=None):
+        self.default = default
+    
+    def __set_name__(self, owner, name):
+        self.name = name
+    
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return getattr(obj._local, self.name, self.default)
+    
+    def __set__(self, obj, value):
+        setattr(obj._local, self.name, value)
+
 class KeapClient:
+    """
+    Keap REST client, safe to share between threads.
+    
+    Every request of every sync is paced by one RateLimiter at
+    MAX_REQUESTS_PER_MINUTE. Token refreshes are serialized, since Keap
+    refresh tokens are single-use.
+    """
+    
+    # Per-request metrics, read back by the thread that made the request
+    last_endpoint = _PerThread()
+    last_response_size = _PerThread()
+    last_retry_count = _PerThread(0)
+    
     def __init__(self, cfg: Settings):
         self.cfg = cfg
         self.session = requests.Session()
         self.base = cfg.base_url.rstrip("/")
-        # Metrics tracking
+        self.rate_limiter = RateLimiter(cfg.max_requests_per_minute)
+        self._local = threading.local()
+        self._token_lock = threading.Lock()
+        # Guards the shared throttle state and counters below
+        self._stats_lock = threading.Lock()
+        # Latest throttle budget reported by the API, from any thread
         self.last_throttle_remaining = None
         self.last_throttle_type = None
-        self.last_retry_count = 0
-        self.last_response_size = None
+        # Throttle accounting; on_throttle(endpoint, throttle_type, remaining, wait_seconds, reason)
+        # is called for every pause so callers can persist the event
+        self.on_throttle: t.Optional[t.Callable[..., None]] = None
+        self.throttle_wait_seconds = 0.0
+        self.throttle_events = 0
 
     def _headers(self) -> dict:
         headers = {"Accept": "application/json"}
@@ -25,15 +120,34 @@ class KeapClient:
             if not tb:
                 raise RuntimeError("No OAuth tokens found. Run initial auth to create token file.")
             if tb.is_expired:
-                tb = refresh_tokens(self.cfg, tb.refresh_token)
-                save_token_bundle(self.cfg, tb)
+                tb = self._refresh_tokens()
             headers["Authorization"] = f"Bearer {tb.access_token}"
         return headers
+    
+    def _refresh_tokens(self, rejected_token: t.Optional[str] = None):
+        """
+        Refresh the OAuth tokens once, however many threads find them stale.
+        
+        Under the lock the bundle is re-read; it is only refreshed if it is
+        still expired or still holds ``rejected_token``, otherwise another
+        thread already did it.
+        """
+        with self._token_lock:
+            tb = load_token_bundle(self.cfg)
+            if tb and (tb.is_expired or (rejected_token and tb.access_token == rejected_token)):
+                tb = refresh_tokens(self.cfg, tb.refresh_token)
+                save_token_bundle(self.cfg, tb)
+            return tb
 
-    @retry(stop=stop_after_attempt(5), wait=wait_exponential_jitter(initial=1, max=30))
+    # Every retry wait, including each 429, is slept and accounted for here; the
+    # final failure is re-raised as the HTTPError so outer handlers can see it
+    @retry(stop=stop_after_attempt(5), wait=_retry_wait, before_sleep=_before_retry_sleep, reraise=True)
     def request(self, method: str, path: str, **kwargs) -> requests.Response:
         url = self.base + path
-        r = self.session.request(method, url, headers=self._headers(), timeout=60, **kwargs)
+        self.last_endpoint = path
+        self.rate_limiter.acquire()
+        headers = self._headers()
+        r = self.session.request(method, url, headers=headers, timeout=60, **kwargs)
         
         # Track metrics
         self.last_response_size = len(r.content)
@@ -43,14 +157,50 @@ class KeapClient:
         self._handle_throttle_headers(r)
         
         if r.status_code == 401 and not self.cfg.api_key:
-            tb = load_token_bundle(self.cfg)
-            if tb:
-                tb = refresh_tokens(self.cfg, tb.refresh_token)
-                save_token_bundle(self.cfg, tb)
+            rejected = headers["Authorization"].split(" ", 1)[1]
+            if self._refresh_tokens(rejected_token=rejected):
                 r = self.session.request(method, url, headers=self._headers(), timeout=60, **kwargs)
         r.raise_for_status()
         return r
     
+    @staticmethod
+    def retry_after_seconds(response: requests.Response, default: float = 5.0) -> float:
+        """Parse a Retry-After header given either as seconds or as an HTTP date."""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return default
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+        except (TypeError, ValueError):
+            return default
+    
+    def record_throttle_wait(self, wait_seconds: float, throttle_type: str,
+                             remaining: t.Optional[int], reason: str,
+                             endpoint: t.Optional[str] = None) -> None:
+        """Account for a throttle wait, whoever performs the sleep."""
+        with self._stats_lock:
+            self.throttle_wait_seconds += wait_seconds
+            self.throttle_events += 1
+        if self.on_throttle is None:
+            print(f"Throttle {reason} ({throttle_type}: {remaining}), waiting {wait_seconds}s")
+            return
+        try:
+            self.on_throttle(endpoint or self.last_endpoint, throttle_type, remaining, wait_seconds, reason)
+        except Exception as e:
+            print(f"Warning: Failed to record throttle event: {e}")
+    
+    def _throttle_pause(self, wait_seconds: float, throttle_type: str,
+                        remaining: t.Optional[int], reason: str) -> None:
+        self.record_throttle_wait(wait_seconds, throttle_type, remaining, reason)
+        # Other threads sharing this client wait out the throttle too
+        self.rate_limiter.hold(wait_seconds)
+        time.sleep(wait_seconds)
+    
     def _handle_throttle_headers(self, response: requests.Response) -> None:
         """Handle Keap throttle headers and implement appropriate backoff."""
         headers = response.headers
@@ -77,26 +227,21 @@ class KeapClient:
                     continue
         
         # Track throttle metrics
-        self.last_throttle_remaining = int(min_available) if min_available != float('inf') else None
-        self.last_throttle_type = throttle_type
+        with self._stats_lock:
+            self.last_throttle_remaining = int(min_available) if min_available != float('inf') else None
+            self.last_throttle_type = throttle_type
         
         # Implement backoff based on throttle status
         if min_available != float('inf'):
             if min_available < 10:
                 # Critical throttle - wait longer
-                wait_time = 5.0
-                print(f"Critical throttle detected ({throttle_type}: {min_available}), waiting {wait_time}s")
-                time.sleep(wait_time)
+                self._throttle_pause(5.0, throttle_type, int(min_available), 'critical')
             elif min_available < 50:
                 # Low throttle - moderate wait
-                wait_time = 2.0
-                print(f"Low throttle detected ({throttle_type}: {min_available}), waiting {wait_time}s")
-                time.sleep(wait_time)
+                self._throttle_pause(2.0, throttle_type, int(min_available), 'low')
             elif min_available < 100:
                 # Medium throttle - short wait
-                wait_time = 0.5
-                print(f"Medium throttle detected ({throttle_type}: {min_available}), waiting {wait_time}s")
-                time.sleep(wait_time)
+                self._throttle_pause(0.5, throttle_type, int(min_available), 'medium')
             else:
                 # Good throttle level - no wait needed
                 pass
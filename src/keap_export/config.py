@@ -15,8 +15,29 @@ class Settings:
     redirect_uri: Optional[str] = os.getenv("KEAP_REDIRECT_URI")
     api_key: Optional[str] = os.getenv("KEAP_API_KEY")
     token_file: str = os.getenv("KEAP_TOKEN_FILE", ".keap_tokens.json")
+    max_requests_per_minute: int = int(os.getenv("MAX_REQUESTS_PER_MINUTE", "1000"))
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
     log_format: str = os.getenv("LOG_FORMAT", "json")
+    log_async: bool = os.getenv("LOG_ASYNC", "true").lower() in ("1", "true", "yes")
+    log_queue_size: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    log_sample: str = os.getenv("LOG_SAMPLE", "")
+    health_sample_interval: float = float(os.getenv("HEALTH_SAMPLE_INTERVAL", "15"))
+    metrics_port: int = int(os.getenv("METRICS_PORT", "0"))
+    metrics_host: str = os.getenv("METRICS_HOST", "127.0.0.1")
+    export_row_group_size: int = int(os.getenv("EXPORT_ROW_GROUP_SIZE", "50000"))
+    export_parquet_compression: str = os.getenv("EXPORT_PARQUET_COMPRESSION", "snappy")
+    export_flatten_jsonb: bool = os.getenv("EXPORT_FLATTEN_JSONB", "true").lower() in ("1", "true", "yes")
+    export_arrow_compression: str = os.getenv("EXPORT_ARROW_COMPRESSION", "none")
+    export_workers: int = int(os.getenv("EXPORT_WORKERS", "4"))
+    export_partition_granularity: str = os.getenv("EXPORT_PARTITION_GRANULARITY", "day")
+    export_compaction_target_mb: int = int(os.getenv("EXPORT_COMPACTION_TARGET_MB", "128"))
+    file_sync_workers: int = int(os.getenv("FILE_SYNC_WORKERS", "8"))
+    file_sync_per_host: int = int(os.getenv("FILE_SYNC_PER_HOST", "4"))
+    file_metadata_batch_size: int = int(os.getenv("FILE_METADATA_BATCH_SIZE", "500"))
+    file_sync_checkpoint_every: int = int(os.getenv("FILE_SYNC_CHECKPOINT_EVERY", "500"))
+    file_compression: str = os.getenv("FILE_COMPRESSION", "none")
+    file_compression_level: int = int(os.getenv("FILE_COMPRESSION_LEVEL", "3"))
+    file_known_set_limit: int = int(os.getenv("FILE_KNOWN_SET_LIMIT", "2000000"))
 
     db_host: str = os.getenv("DB_HOST", "localhost")
     db_port: int = int(os.getenv("DB_PORT", "5432"))
@@ -3,7 +3,7 @@ import json
 import psycopg2
 import psycopg2.extras
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional, Set
 from .config import Settings
 
 def get_conn(cfg: Settings):
@@ -345,3 +345,51 @@ def upsert(conn, table: str, row: Dict[str, Any]) -> None:
         raise ValueError(f"Unknown table: {table}")
     
     upsert_methods[table](conn, row)
+
+# Child tables whose rows feed keap.contact_rollup
+ROLLUP_CHILD_TABLES = ('opportunities', 'tasks', 'notes', 'contact_tags')
+
+# Whether keap.refresh_contact_rollup exists, checked once per process
+_rollup_available: Optional[bool] = None
+
+def rollup_contact_ids(conn, table: str, rows: List[Dict[str, Any]]) -> Set[int]:
+    """
+    Contacts whose rollup a batch of upserts can change.
+    
+    Call before upserting: for child rows that already exist this also
+    returns their current contact, so a record moving between contacts
+    refreshes both.
+    """
+    if table == 'contacts':
+        return {row['id'] for row in rows if row.get('id')}
+    if table not in ROLLUP_CHILD_TABLES:
+        return set()
+    contact_ids = {row['contact_id'] for row in rows if row.get('contact_id')}
+    record_ids = [row['id'] for row in rows if row.get('id')]
+    if table != 'contact_tags' and record_ids:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"select distinct contact_id from keap.{table} "
+                "where id = any(%s) and contact_id is not null",
+                (record_ids,),
+            )
+            contact_ids.update(row[0] for row in cur.fetchall())
+    return contact_ids
+
+def contact_rollup_available(conn) -> bool:
+    """Whether sql/add_contact_rollup.sql is applied (checked once per process)."""
+    global _rollup_available
+    if _rollup_available is None:
+        with conn.cursor() as cur:
+            cur.execute("select to_regprocedure('keap.refresh_contact_rollup(bigint[])') is not null")
+            _rollup_available = bool(cur.fetchone()[0])
+    return _rollup_available
+
+def refresh_contact_rollup(conn, contact_ids: Iterable[int]) -> int:
+    """Recompute keap.contact_rollup for the given contacts in the caller's transaction."""
+    contact_ids = sorted(contact_ids)
+    if not contact_ids or not contact_rollup_available(conn):
+        return 0
+    with conn.cursor() as cur:
+        cur.execute("select keap.refresh_contact_rollup(%s::bigint[])", (contact_ids,))
+        return cur.fetchone()[0]
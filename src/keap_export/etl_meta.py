@@ -5,6 +5,7 @@ import psycopg2.extras
 from dataclasses import dataclass
 from typing import Optional
 from .config import Settings
+from .health_sampler import start_health_sampler
 
 ETL_ENABLED = os.getenv("ETL_META", "on").lower() not in {"0", "false", "off"}
 
@@ -19,6 +20,7 @@ class EtlTracker:
         self._conn = None
         self.run_id = None
         self.enabled = ETL_ENABLED
+        self.health_sampler = None
 
     def _conn_autocommit(self):
         if self._conn is None:
@@ -36,6 +38,7 @@ class EtlTracker:
         with conn.cursor() as cur:
             cur.execute('insert into keap_meta.etl_run_log(status, notes) values (%s, %s) returning id', ('running', notes))
             self.run_id = cur.fetchone()[0]
+        self.health_sampler = start_health_sampler(self.cfg, self.run_id)
         return self.run_id
 
     def log_request(self, endpoint: str, page_offset: int, page_limit: int, http_status: int, item_count: int, duration_ms: int, throttled: bool = False, error: str = None):
@@ -72,7 +75,7 @@ class EtlTracker:
     
     def log_throttle_event(self, entity: str, endpoint: str, throttle_type: str,
                           throttle_remaining: int, throttle_reset_time: str = None,
-                          wait_time_ms: int = None):
+                          wait_time_ms: int = None, reason: str = None):
         """Log a throttle event."""
         if not self.enabled or self.run_id is None:
             return
@@ -81,10 +84,10 @@ class EtlTracker:
             cur.execute(
                 '''insert into keap_meta.throttle_events 
                    (run_id, entity, endpoint, throttle_type, throttle_remaining, 
-                    throttle_reset_time, wait_time_ms) 
-                   values (%s, %s, %s, %s, %s, %s, %s)''',
+                    throttle_reset_time, wait_time_ms, reason) 
+                   values (%s, %s, %s, %s, %s, %s, %s, %s)''',
                 (self.run_id, entity, endpoint, throttle_type, throttle_remaining,
-                 throttle_reset_time, wait_time_ms)
+                 throttle_reset_time, wait_time_ms, reason)
             )
     
     def log_error_event(self, entity: str, endpoint: str, error_type: str, error_message: str,
@@ -128,9 +131,22 @@ class EtlTracker:
                 (self.run_id, entity)
             )
 
+    def attach_sync(self, sync):
+        """Let the health sampler tag samples with the sync that is running."""
+        if self.health_sampler is not None:
+            self.health_sampler.attach(sync)
+
+    def detach_sync(self, sync):
+        """Clear the sampler's sync context once the sync is done."""
+        if self.health_sampler is not None:
+            self.health_sampler.detach(sync)
+
     def end_run(self, success: bool, notes: str = None):
         if not self.enabled or self.run_id is None:
             return
+        if self.health_sampler is not None:
+            self.health_sampler.stop()
+            self.health_sampler = None
         conn = self._conn_autocommit()
         with conn.cursor() as cur:
             cur.execute(
@@ -1,34 +1,409 @@
 """
 Data Export Module for Keap Database
-Supports CSV and Parquet export formats for external analysis.
+Supports CSV, Parquet, Arrow IPC and Excel export formats for external analysis.
 """
 
 from __future__ import annotations
 import os
-import csv
+import fcntl
+import gzip
+import shutil
+import hashlib
 import json
-import pandas as pd
+import time
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
 import psycopg2
+from psycopg2 import sql
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Union
 from pathlib import Path
 from .config import Settings
+from .db import contact_rollup_available
+
+# Columns left out of exports unless asked for; raw holds the full API payload
+DEFAULT_EXCLUDED_COLUMNS = ('raw', 'synced_at')
+
+COMPRESSION_SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+def open_compressed(filepath: Path, compression: Optional[str] = None):
+    """Open a binary output stream, optionally gzip or zstd compressed."""
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unsupported compression: {compression}")
+    if compression == 'gzip':
+        return gzip.open(filepath, 'wb', compresslevel=6)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd compression requires the zstandard package (pip install zstandard)")
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(filepath, 'wb'), closefd=True)
+    return open(filepath, 'wb')
+
+# Postgres types read natively by psycopg2 and written as typed Arrow columns.
+# Anything else (json/jsonb, uuid, inet, ...) is cast to text in SQL so no
+# per-cell parsing happens in Python. Numerics without a precision Arrow can
+# hold are cast to float8, since psycopg2 would return them as Decimal.
+_ARROW_TYPES = {
+    'int2': pa.int16(),
+    'int4': pa.int32(),
+    'int8': pa.int64(),
+    'float4': pa.float32(),
+    'float8': pa.float64(),
+    'bool': pa.bool_(),
+    'date': pa.date32(),
+    'time': pa.time64('us'),
+    'timestamp': pa.timestamp('us'),
+    'timestamptz': pa.timestamp('us', tz='UTC'),
+    'interval': pa.duration('us'),
+    'text': pa.string(),
+    'varchar': pa.string(),
+    'bpchar': pa.string(),
+    'name': pa.string(),
+}
+
+def arrow_type_for(typname: str, typmod: int = -1, elem_typname: str = None):
+    """
+    Map a Postgres column type to an Arrow type.
+
+    Returns ``(arrow_type, cast)``; when ``cast`` is set the column must be
+    selected as ``col::<cast>`` (``text``, ``float8`` or ``float8[]``).
+    """
+    if elem_typname:
+        elem_type, elem_cast = arrow_type_for(elem_typname)
+        if elem_cast == 'text':
+            return pa.string(), 'text'
+        return pa.list_(elem_type), elem_cast and f"{elem_cast}[]"
+    if typname == 'numeric':
+        # typmod packs precision/scale; unconstrained numeric has no fixed width
+        if typmod >= 4:
+            precision, scale = ((typmod - 4) >> 16) & 0xFFFF, (typmod - 4) & 0xFFFF
+            if precision <= 38:
+                return pa.decimal128(precision, scale), None
+        return pa.float64(), 'float8'
+    if typname in _ARROW_TYPES:
+        return _ARROW_TYPES[typname], None
+    return pa.string(), 'text'
+
+# JSONB columns holding arrays of objects, with the fields of each element.
+# Postgres types the elements with jsonb_to_recordset; Parquet/Arrow exports
+# store them as list<struct> and CSV can project or explode them.
+JSONB_RECORDS = {
+    'email_addresses': (('email', 'text'), ('field', 'text')),
+    'phone_numbers': (('number', 'text'), ('extension', 'text'), ('field', 'text'), ('type', 'text')),
+    'addresses': (('line1', 'text'), ('line2', 'text'), ('locality', 'text'), ('region', 'text'),
+                  ('postal_code', 'text'), ('zip_code', 'text'), ('zip_four', 'text'),
+                  ('country_code', 'text'), ('field', 'text')),
+    'custom_fields': (('id', 'int8'), ('content', 'text')),
+    'stage_moves': (('from_stage_id', 'int8'), ('to_stage_id', 'int8'),
+                    ('moved_date', 'timestamptz'), ('user_id', 'int8')),
+}
+
+# Arrow field metadata marking a column selected as JSON text and parsed in Arrow
+JSON_ENCODED = {b'keap.encoding': b'json'}
+
+def jsonb_recordset(column: str) -> sql.Composable:
+    """
+    ``jsonb_to_recordset(col) AS r(field type, ...)`` for a JSONB_RECORDS column.
+    
+    Non-arrays give no rows and non-object elements are dropped, since
+    jsonb_to_recordset raises on them and would fail the whole export.
+    """
+    return sql.SQL("jsonb_to_recordset(CASE WHEN jsonb_typeof({col}) = 'array' "
+                   "THEN jsonb_path_query_array({col}, '$[*] ? (@.type() == \"object\")') END) "
+                   "AS r({fields})").format(
+        col=sql.Identifier(column),
+        fields=
+        sql.SQL(', ').join(sql.SQL("{} {}").format(sql.Identifier(name), sql.SQL(typname))
+                           for name, typname in JSONB_RECORDS[column]),
+    )
+
+def jsonb_struct_type(column: str):
+    """Arrow ``list<struct>`` type for a JSONB_RECORDS column."""
+    return pa.list_(pa.struct([(name, arrow_type_for(typname)[0])
+                               for name, typname in JSONB_RECORDS[column]]))
+
+def json_to_arrow(values, arrow_type):
+    """
+    Parse a column of JSON texts into ``arrow_type`` in one vectorized pass.
+    
+    The cells are wrapped into newline-delimited ``{"v": ...}`` objects with
+    Arrow compute and handed to Arrow's JSON reader with an explicit schema.
+    """
+    text = pc.fill_null(pa.array(values, type=pa.string()), 'null')
+    lines = pc.binary_join_element_wise('{"v":', text, '}\n', '')
+    data = lines.buffers()[2].slice(0, pc.sum(pc.binary_length(lines)).as_py())
+    table = pa_json.read_json(
+        pa.BufferReader(data),
+        read_options=pa_json.ReadOptions(block_size=max(data.size, 1 << 20)),
+        parse_options=pa_json.ParseOptions(explicit_schema=pa.schema([('v', arrow_type)]),
+                                           unexpected_field_behavior='ignore'),
+    )
+    return table.column('v').combine_chunks()
+
+class CopyProgress:
+    """File-like sink for COPY ... TO STDOUT that reports bytes written and throughput."""
+
+    def __init__(self, fileobj, label: str, report_interval: float = 5.0):
+        self.fileobj = fileobj
+        self.label = label
+        self.report_interval = report_interval
+        self.bytes_written = 0
+        self.started = time.monotonic()
+        self._last_report = self.started
+
+    def write(self, data: bytes) -> int:
+        self.fileobj.write(data)
+        self.bytes_written += len(data)
+        now = time.monotonic()
+        if now - self._last_report >= self.report_interval:
+            self._last_report = now
+            print(f"  {self.label}: {self.megabytes():.1f} MB written ({self.throughput():.1f} MB/s)")
+        return len(data)
+
+    def megabytes(self) -> float:
+        return self.bytes_written / (1024 * 1024)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def throughput(self) -> float:
+        elapsed = self.elapsed()
+        return self.megabytes() / elapsed if elapsed > 0 else 0.0
+
+# Partition value used by Hive-style readers for NULL keys
+HIVE_NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+PARTITION_FORMATS = {'day': '%Y-%m-%d', 'month': '%Y-%m'}
+
+def file_sha256(filepath: Path) -> str:
+    """SHA-256 of a file, read in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def link_or_copy(source: Path, target: Path) -> None:
+    """Hardlink ``source`` to ``target``, copying across filesystems, and refresh its mtime."""
+    if source.resolve() == target.resolve():
+        return
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+    # Shared inode: refresh mtime so cleanup_old_exports keeps the new name
+    os.utime(target)
+
+# Key columns for Arrow snapshot indexes, in order of preference
+ARROW_INDEX_COLUMNS = ('contact_id', 'id')
+
+def arrow_index_path(filepath: Union[str, Path]) -> Path:
+    """Sidecar index file of an Arrow snapshot (``x.arrow`` -> ``x.index.arrow``)."""
+    return Path(filepath).with_suffix('.index.arrow')
+
+class ArrowSnapshot:
+    """
+    Memory-mapped reader for an Arrow IPC snapshot and its index.
+    
+    Uncompressed snapshots are opened without copying: column buffers point
+    into the mapped file. ``lookup`` binary-searches the sorted index and
+    takes only the matching rows.
+    """
+    
+    def __init__(self, filepath: Union[str, Path]):
+        self.path = Path(filepath)
+        self.table = ipc.open_file(pa.memory_map(str(self.path), 'r')).read_all()
+        self.index_column = None
+        self._keys = self._rows = None
+        index_path = arrow_index_path(self.path)
+        if index_path.exists():
+            index = ipc.open_file(pa.memory_map(str(index_path), 'r')).read_all()
+            self.index_column = index.schema.metadata[b'column'].decode()
+            self._keys = index.column('key').to_numpy()
+            self._rows = index.column('row').to_numpy()
+    
+    def lookup(self, key: int):
+        """Return the rows whose index column equals ``key``."""
+        if self._keys is None:
+            raise ValueError(f"{self.path} has no index")
+        start, stop = np.searchsorted(self._keys, [key, key + 1])
+        return self.table.take(pa.array(self._rows[start:stop]))
+
+# Per-contact aggregates with the columns of keap.contact_rollup, computed at
+# export time when sql/add_contact_rollup.sql has not been applied
+CONTACT_ROLLUP_FALLBACK = """(
+    SELECT c.id AS contact_id,
+           o.opportunity_count, o.opportunity_value,
+           t.task_count, t.open_task_count,
+           n.note_count, ct.tag_count,
+           greatest(o.last_updated, t.last_updated, n.last_updated) AS last_activity_at
+    FROM keap.contacts c
+    LEFT JOIN (
+        SELECT contact_id, count(*) AS opportunity_count,
+               sum(value)::numeric(18,2) AS opportunity_value, max(updated_at) AS last_updated
+        FROM keap.opportunities GROUP BY contact_id
+    ) o ON o.contact_id = c.id
+    LEFT JOIN (
+        SELECT contact_id, count(*) AS task_count,
+               count(*) FILTER (WHERE completed_date IS NULL) AS open_task_count,
+               max(updated_at) AS last_updated
+        FROM keap.tasks GROUP BY contact_id
+    ) t ON t.contact_id = c.id
+    LEFT JOIN (
+        SELECT contact_id, count(*) AS note_count, max(updated_at) AS last_updated
+        FROM keap.notes GROUP BY contact_id
+    ) n ON n.contact_id = c.id
+    LEFT JOIN (
+        SELECT contact_id, count(*) AS tag_count FROM keap.contact_tags GROUP BY contact_id
+    ) ct ON ct.contact_id = c.id
+)"""
+
+# Column set by sql/add_sync_markers.sql whenever a sync changes a row
+SYNC_MARKER_COLUMN = 'synced_at'
+
+def new_run_id(prefix: str = '') -> str:
+    """Sortable, unique id for dataset files (``part-<run_id>.parquet``)."""
+    return f"{prefix}{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:6]}"
+
+class DatasetManifest:
+    """
+    Watermarks, row counts and checksums for an incremental Parquet dataset.
+    
+    Stored as ``_manifest.json`` at the dataset root. Every file records the
+    run that produced it, so consumers can pick up only new partitions.
+    """
+    
+    FILENAME = "_manifest.json"
+    LOCK_FILENAME = "_manifest.lock"
+    
+    def __init__(self, dataset_dir: Union[str, Path]):
+        self.dataset_dir = Path(dataset_dir)
+        self.path = self.dataset_dir / self.FILENAME
+        self.data = self._load()
+    
+    def _load(self) -> Dict[str, Any]:
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'version': 1, 'tables': {}, 'files': []}
+    
+    @contextmanager
+    def locked(self):
+        """
+        Reload the manifest under an exclusive lock and save it on exit.
+        
+        Exports and compaction both modify the manifest inside this block,
+        so neither overwrites the other's changes.
+        """
+        self.dataset_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.dataset_dir / self.LOCK_FILENAME, 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self.data = self._load()
+                yield self
+                self.save()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    
+    def watermark(self, entity: str) -> Optional[str]:
+        """Highest updated_at already exported for an entity."""
+        return self.data['tables'].get(entity, {}).get('watermark')
+    
+    def synced_watermark(self, entity: str) -> Optional[str]:
+        """Lower bound of synced_at for rows not yet exported (sync marker tables)."""
+        return self.data['tables'].get(entity, {}).get('synced_watermark')
+    
+    def files(self, entity: str = None) -> List[Dict[str, Any]]:
+        return [f for f in self.data['files'] if entity is None or f['entity'] == entity]
+    
+    def record_run(self, entity: str, run_id: str, files: List[Dict[str, Any]],
+                   watermark: Optional[str], mode: str = 'incremental',
+                   primary_key: Optional[List[str]] = None,
+                   synced_watermark: Optional[str] = None) -> None:
+        """Add a run's files and advance the entity watermark."""
+        if mode == 'full':
+            self.data['files'] = [f for f in self.data['files'] if f['entity'] != entity]
+        self.data['files'].extend(files)
+        table = self.data['tables'].setdefault(entity, {'row_count': 0})
+        rows = sum(f['rows'] for f in files)
+        table['row_count'] = rows if mode == 'full' else table['row_count'] + rows
+        table['mode'] = mode
+        table['last_run'] = run_id
+        table['last_run_rows'] = rows
+        if watermark:
+            table['watermark'] = watermark
+        if synced_watermark:
+            table['synced_watermark'] = synced_watermark
+        if primary_key:
+            table['primary_key'] = primary_key
+    
+    def save(self) -> None:
+        """Write the manifest atomically (temp file + rename)."""
+        self.dataset_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
 
 class BaseExporter:
     """Base class for data exporters."""
     
-    def __init__(self, cfg: Settings, output_dir: str = "exports"):
+    def __init__(self, cfg: Settings, output_dir: str = "exports",
+                 snapshot_id: Optional[str] = None):
         self.cfg = cfg
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        # Exported snapshot (pg_export_snapshot) every connection reads from, if any
+        self.snapshot_id = snapshot_id
     
-    def get_connection(self):
-        """Get database connection."""
+    def _connect(self):
         return psycopg2.connect(
             host=self.cfg.db_host, port=self.cfg.db_port,
             dbname=self.cfg.db_name, user=self.cfg.db_user, password=self.cfg.db_password
         )
     
+    def get_connection(self):
+        """Get database connection, inside the shared snapshot when one is set."""
+        conn = self._connect()
+        if self.snapshot_id:
+            conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+            with conn.cursor() as cur:
+                cur.execute("SET TRANSACTION SNAPSHOT %s", (self.snapshot_id,))
+        return conn
+    
+    def changes_bound(self) -> str:
+        """
+        Lower bound of synced_at for writes a snapshot taken after this call may miss.
+        
+        A row's synced_at is its writing transaction's start time, so the
+        bound is the start of the oldest open transaction (or now). That
+        includes transactions that have only read so far: a sync batch runs
+        its SELECTs before its upserts. Read outside any snapshot, before the
+        export snapshot is taken.
+        """
+        conn = self._connect()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT least(now(), min(xact_start))
+                    FROM pg_stat_activity
+                    WHERE xact_start IS NOT NULL AND pid <> pg_backend_pid()
+                """)
+                return cur.fetchone()[0].isoformat(timespec='microseconds')
+        finally:
+            conn.close()
+    
     def get_table_data(self, table_name: str, schema: str = "keap", 
                       where_clause: str = None, limit: int = None) -> List[Dict[str, Any]]:
         """Get data from a database table."""
@@ -52,6 +427,145 @@ class BaseExporter:
         finally:
             conn.close()
     
+    def get_table_columns(self, table_name: str, schema: str = "keap") -> List[str]:
+        """Get the column names of a table in ordinal order."""
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT column_name
+                    FROM information_schema.columns
+                    WHERE table_schema = %s AND table_name = %s
+                    ORDER BY ordinal_position
+                """, (schema, table_name))
+                return [row[0] for row in cur.fetchall()]
+        finally:
+            conn.close()
+
+    def select_columns(self, table_name: str, schema: str = "keap",
+                       columns: Optional[List[str]] = None,
+                       include_raw: bool = False) -> List[str]:
+        """Resolve the columns to export, dropping raw payloads unless requested."""
+        available = self.get_table_columns(table_name, schema)
+        if not available:
+            raise ValueError(f"Table not found: {schema}.{table_name}")
+        if columns:
+            unknown = [c for c in columns if c not in available]
+            if unknown:
+                raise ValueError(f"Unknown columns for {schema}.{table_name}: {', '.join(unknown)}")
+            return list(columns)
+        if include_raw:
+            return available
+        return [c for c in available if c not in DEFAULT_EXCLUDED_COLUMNS]
+
+    def get_column_types(self, table_name: str, schema: str = "keap") -> Dict[str, tuple]:
+        """Get ``{column: (typname, typmod, array_element_typname)}`` from pg_attribute."""
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT a.attname, t.typname, a.atttypmod,
+                           CASE WHEN t.typcategory = 'A' THEN et.typname END
+                    FROM pg_attribute a
+                    JOIN pg_type t ON t.oid = a.atttypid
+                    LEFT JOIN pg_type et ON et.oid = t.typelem
+                    WHERE a.attrelid = %s::regclass
+                      AND a.attnum > 0 AND NOT a.attisdropped
+                    ORDER BY a.attnum
+                """, (f"{schema}.{table_name}",))
+                return {row[0]: (row[1], row[2], row[3]) for row in cur.fetchall()}
+        finally:
+            conn.close()
+
+    def get_primary_key(self, table_name: str, schema: str = "keap") -> List[str]:
+        """Get the primary key columns of a table."""
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT a.attname
+                    FROM pg_index i
+                    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+                    WHERE i.indrelid = %s::regclass AND i.indisprimary
+                    ORDER BY array_position(i.indkey, a.attnum)
+                """, (f"{schema}.{table_name}",))
+                return [row[0] for row in cur.fetchall()]
+        finally:
+            conn.close()
+
+    def table_fingerprint(self, table_name: str, schema: str = "keap") -> tuple:
+        """Return ``(row_count, fingerprint)`` from keap_meta.table_fingerprint."""
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT * FROM keap_meta.table_fingerprint(%s, %s)", (schema, table_name))
+                return cur.fetchone()
+        finally:
+            conn.close()
+    
+    def get_previous_export(self, table_name: str, export_key: str,
+                            schema: str = "keap") -> Optional[tuple]:
+        """Return ``(fingerprint, file_path)`` of the last export with this shape."""
+        conn = self._connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT fingerprint, file_path FROM keap_meta.export_fingerprint
+                    WHERE schema_name = %s AND table_name = %s AND export_key = %s
+                """, (schema, table_name, export_key))
+                return cur.fetchone()
+        finally:
+            conn.close()
+    
+    def record_export(self, table_name: str, export_key: str, fingerprint: str,
+                      row_count: int, file_path: str, schema: str = "keap") -> None:
+        """Remember the fingerprint and file of an export (outside the read-only snapshot)."""
+        conn = self._connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO keap_meta.export_fingerprint
+                        (schema_name, table_name, export_key, fingerprint, row_count, file_path)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (schema_name, table_name, export_key) DO UPDATE SET
+                        fingerprint = EXCLUDED.fingerprint,
+                        row_count = EXCLUDED.row_count,
+                        file_path = EXCLUDED.file_path,
+                        exported_at = now()
+                """, (schema, table_name, export_key, fingerprint, row_count, file_path))
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def export_if_changed(self, table_name: str, export_key: str, filename: str,
+                          schema: str = "keap", **options) -> tuple:
+        """
+        Export a table unless its fingerprint matches the last export with this shape.
+        
+        An unchanged table reuses the previous file, hardlinked (or copied
+        across filesystems) to the new filename. Returns ``(path, skipped)``.
+        """
+        row_count, fingerprint = self.table_fingerprint(table_name, schema)
+        previous = self.get_previous_export(table_name, export_key, schema)
+        target = self.output_dir / filename
+        if previous and previous[0] == fingerprint and Path(previous[1]).exists():
+            source = Path(previous[1])
+            link_or_copy(source, target)
+            for sidecar, linked in zip(self.sidecar_paths(source), self.sidecar_paths(target)):
+                if sidecar.exists():
+                    link_or_copy(sidecar, linked)
+            print(f"Skipped {schema}.{table_name}: unchanged since last export, reused {source.name}")
+            return str(target), True
+        
+        filepath = self.export_table(table_name, schema, filename=filename, **options)
+        if filepath:
+            self.record_export(table_name, export_key, fingerprint, row_count, filepath, schema)
+        return filepath, False
+
+    def sidecar_paths(self, filepath: Path) -> List[Path]:
+        """Files written alongside an export that must travel with it."""
+        return []
+    
     def get_entity_tables(self) -> List[str]:
         """Get list of entity tables in the keap schema."""
         conn = self.get_connection()
@@ -69,43 +583,114 @@ class BaseExporter:
             conn.close()
 
 class CSVExporter(BaseExporter):
-    """CSV export functionality."""
+    """CSV export functionality, streamed from PostgreSQL with COPY."""
+    
+    def copy_query_to_file(self, query: Union[str, sql.Composable], filepath: Path,
+                           compression: Optional[str] = None, label: str = None) -> int:
+        """Stream ``COPY (query) TO STDOUT`` into a file. Returns the row count."""
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cur:
+                copy_sql = sql.SQL("COPY ({}) TO STDOUT WITH (FORMAT csv, HEADER true)").format(
+                    query if isinstance(query, sql.Composable) else sql.SQL(query)
+                )
+                with open_compressed(filepath, compression) as out:
+                    progress = CopyProgress(out, label or filepath.name)
+                    cur.copy_expert(copy_sql, progress)
+                rows = cur.rowcount
+        except Exception:
+            filepath.unlink(missing_ok=True)
+            raise
+        finally:
+            conn.close()
+        
+        print(f"  {label or filepath.name}: {rows} rows, {progress.megabytes():.1f} MB "
+              f"in {progress.elapsed():.1f}s ({progress.throughput():.1f} MB/s)")
+        return rows
+    
+    @staticmethod
+    def flattened_select(schema: str, table_name: str, selected: List[str],
+                         jsonb: str = "text", explode: Optional[str] = None) -> sql.Composable:
+        """
+        Build the SELECT for a CSV export with JSONB_RECORDS columns flattened.
+        
+        ``jsonb="first"`` replaces each such column with ``<column>_<field>``
+        columns taken from its first element. ``explode`` emits one row per
+        element of that column (rows without elements are kept once), with
+        the element fields as ``<column>_<field>`` columns. ``jsonb="text"``
+        leaves the other columns as JSON text.
+        """
+        if jsonb not in ("text", "first"):
+            raise ValueError(f"Unsupported jsonb mode: {jsonb}")
+        if explode and (explode not in selected or explode not in JSONB_RECORDS):
+            raise ValueError(f"Cannot explode {explode}: not a selected JSONB array column "
+                             f"({', '.join(sorted(JSONB_RECORDS))})")
+        items = []
+        for column in selected:
+            if column == explode:
+                items.extend(sql.Identifier('x', f"{column}_{name}") for name, _ in JSONB_RECORDS[column])
+            elif jsonb == "first" and column in JSONB_RECORDS:
+                items.extend(
+                    sql.SQL("CASE WHEN jsonb_typeof({col}) = 'array' THEN ({col} -> 0 ->> {key})::{typ} END "
+                            "AS {alias}").format(col=sql.Identifier(column), key=sql.Literal(name),
+                                                 typ=sql.SQL(typname),
+                                                 alias=sql.Identifier(f"{column}_{name}"))
+                    for name, typname in JSONB_RECORDS[column]
+                )
+            else:
+                items.append(sql.Identifier(column))
+        query = sql.SQL("SELECT {} FROM {}.{}").format(
+            sql.SQL(', ').join(items), sql.Identifier(schema), sql.Identifier(table_name)
+        )
+        if explode:
+            # Element fields are renamed inside the lateral so a WHERE on table columns stays unambiguous
+            query += sql.SQL(" LEFT JOIN LATERAL (SELECT {} FROM {}) x ON true").format(
+                sql.SQL(', ').join(sql.SQL("r.{} AS {}").format(sql.Identifier(name),
+                                                                sql.Identifier(f"{explode}_{name}"))
+                                   for name, _ in JSONB_RECORDS[explode]),
+                jsonb_recordset(explode),
+            )
+        return query
     
     def export_table(self, table_name: str, schema: str = "keap", 
                     where_clause: str = None, limit: int = None,
-                    filename: str = None) -> str:
-        """Export a single table to CSV."""
-        data = self.get_table_data(table_name, schema, where_clause, limit)
-        
-        if not data:
-            print(f"No data found for table {schema}.{table_name}")
-            return None
+                    filename: str = None, columns: Optional[List[str]] = None,
+                    include_raw: bool = False, compression: Optional[str] = None,
+                    jsonb: str = "text", explode: Optional[str] = None) -> str:
+        """Export a single table to CSV without buffering rows in memory."""
+        selected = self.select_columns(table_name, schema, columns, include_raw)
+        query = self.flattened_select(schema, table_name, selected, jsonb, explode)
+        if where_clause:
+            query += sql.SQL(" WHERE " + where_clause)
+        if limit:
+            query += sql.SQL(" LIMIT {}").format(sql.Literal(int(limit)))
         
         # Generate filename if not provided
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{table_name}_{timestamp}.csv"
+            filename = f"{table_name}_{timestamp}.csv{COMPRESSION_SUFFIXES[compression]}"
         
         filepath = self.output_dir / filename
+        rows = self.copy_query_to_file(query, filepath, compression, label=f"{schema}.{table_name}")
         
-        # Write CSV file
-        with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-            if data:
-                writer = csv.DictWriter(csvfile, fieldnames=data[0].keys())
-                writer.writeheader()
-                writer.writerows(data)
+        if not rows:
+            filepath.unlink(missing_ok=True)
+            print(f"No data found for table {schema}.{table_name}")
+            return None
         
-        print(f"Exported {len(data)} records from {schema}.{table_name} to {filepath}")
+        print(f"Exported {rows} records from {schema}.{table_name} to {filepath}")
         return str(filepath)
     
-    def export_all_entities(self, where_clause: str = None, limit: int = None) -> List[str]:
+    def export_all_entities(self, where_clause: str = None, limit: int = None,
+                            include_raw: bool = False, compression: Optional[str] = None) -> List[str]:
         """Export all entity tables to CSV."""
         tables = self.get_entity_tables()
         exported_files = []
         
         for table in tables:
             try:
-                filepath = self.export_table(table, where_clause=where_clause, limit=limit)
+                filepath = self.export_table(table, where_clause=where_clause, limit=limit,
+                                             include_raw=include_raw, compression=compression)
                 if filepath:
                     exported_files.append(filepath)
             except Exception as e:
@@ -114,114 +699,361 @@ class CSVExporter(BaseExporter):
         
         return exported_files
     
-    def export_contacts_with_relationships(self, limit: int = None) -> str:
+    def export_contacts_with_relationships(self, limit: int = None,
+                                           compression: Optional[str] = None) -> str:
         """Export contacts with related data (companies, tags, etc.)."""
+        query = """
+            SELECT 
+                c.id,
+                c.given_name,
+                c.family_name,
+                c.email,
+                c.phone,
+                c.address,
+                c.city,
+                c.state,
+                c.postal_code,
+                c.country_code,
+                c.email_status,
+                c.email_opted_in,
+                c.score_value,
+                co.name as company_name,
+                co.website as company_website,
+                u.email as owner_email,
+                u.given_name as owner_name,
+                c.created_at,
+                c.updated_at
+            FROM keap.contacts c
+            LEFT JOIN keap.companies co ON c.company_id = co.id
+            LEFT JOIN keap.users u ON c.owner_id = u.id
+        """
+        
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"contacts_with_relationships_{timestamp}.csv{COMPRESSION_SUFFIXES[compression]}"
+        filepath = self.output_dir / filename
+        rows = self.copy_query_to_file(query, filepath, compression, label="contacts_with_relationships")
+        
+        if not rows:
+            filepath.unlink(missing_ok=True)
+            print("No contact data found")
+            return None
+        
+        print(f"Exported {rows} contacts with relationships to {filepath}")
+        return str(filepath)
+
+class ParquetExporter(BaseExporter):
+    """Parquet export functionality, written in row groups from a server-side cursor."""
+    
+    extension = "parquet"
+    
+    @staticmethod
+    def _typed_select(columns: List[tuple], flatten_jsonb: bool = True):
+        """
+        Build Arrow fields and select items for ``(name, typname, typmod, elem)`` columns.
+        
+        Columns without a native Arrow mapping are selected as ``col::text``
+        (numerics beyond decimal128 as ``col::float8``). With ``flatten_jsonb``,
+        JSONB_RECORDS columns are normalized by jsonb_to_recordset in SQL and
+        typed as list<struct>.
+        """
+        fields, select_items = [], []
+        for column, typname, typmod, elem in columns:
+            if flatten_jsonb and typname == 'jsonb' and column in JSONB_RECORDS:
+                fields.append(pa.field(column, jsonb_struct_type(column), metadata=JSON_ENCODED))
+                select_items.append(sql.SQL(
+                    "CASE WHEN jsonb_typeof({col}) = 'array' THEN coalesce("
+                    "(SELECT jsonb_agg(to_jsonb(r)) FROM {recordset}), '[]')::text END AS {col}"
+                ).format(col=sql.Identifier(column), recordset=jsonb_recordset(column)))
+                continue
+            arrow_type, cast = arrow_type_for(typname, typmod, elem)
+            fields.append(pa.field(column, arrow_type))
+            if cast:
+                select_items.append(sql.SQL("{}::{} AS {}").format(
+                    sql.Identifier(column), sql.SQL(cast), sql.Identifier(column)))
+            else:
+                select_items.append(sql.Identifier(column))
+        return pa.schema(fields), sql.SQL(', ').join(select_items)
+    
+    def build_arrow_schema(self, table_name: str, schema: str = "keap",
+                           columns: Optional[List[str]] = None):
+        """Return ``(arrow_schema, select_sql)`` for the given columns of a table."""
+        column_types = self.get_column_types(table_name, schema)
+        arrow_schema, select_list = self._typed_select(
+            [(column, *column_types[column]) for column in columns or list(column_types)],
+            self.cfg.export_flatten_jsonb)
+        query = sql.SQL("SELECT {} FROM {}.{}").format(
+            select_list, sql.Identifier(schema), sql.Identifier(table_name)
+        )
+        return arrow_schema, query
+    
+    def build_query_schema(self, query: str):
+        """
+        Return ``(arrow_schema, select_sql)`` for an arbitrary SELECT.
+        
+        Result column types come from a ``LIMIT 0`` probe and pg_type; the
+        query is wrapped so non-native columns are cast to text (or float8).
+        """
         conn = self.get_connection()
         try:
             with conn.cursor() as cur:
-                query = """
-                    SELECT 
-                        c.id,
-                        c.given_name,
-                        c.family_name,
-                        c.email,
-                        c.phone,
-                        c.address,
-                        c.city,
-                        c.state,
-                        c.postal_code,
-                        c.country_code,
-                        c.email_status,
-                        c.email_opted_in,
-                        c.score_value,
-                        co.name as company_name,
-                        co.website as company_website,
-                        u.email as owner_email,
-                        u.given_name as owner_name,
-                        c.created_at,
-                        c.updated_at
-                    FROM keap.contacts c
-                    LEFT JOIN keap.companies co ON c.company_id = co.id
-                    LEFT JOIN keap.users u ON c.owner_id = u.id
-                """
-                
-                if limit:
-                    query += f" LIMIT {limit}"
-                
+                cur.execute(sql.SQL("SELECT * FROM ({}) q LIMIT 0").format(sql.SQL(query)))
+                description = cur.description
+                cur.execute("""
+                    SELECT t.oid, t.typname, CASE WHEN t.typcategory = 'A' THEN et.typname END
+                    FROM pg_type t
+                    LEFT JOIN pg_type et ON et.oid = t.typelem
+                    WHERE t.oid = ANY(%s)
+                """, ([column.type_code for column in description],))
+                types = {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+        finally:
+            conn.close()
+        
+        columns = []
+        for column in description:
+            typname, elem = types[column.type_code]
+            typmod = -1
+            if typname == 'numeric' and column.precision is not None:
+                typmod = (column.precision << 16) + (column.scale or 0) + 4
+            columns.append((column.name, typname, typmod, elem))
+        arrow_schema, select_list = self._typed_select(columns, self.cfg.export_flatten_jsonb)
+        return arrow_schema, sql.SQL("SELECT {} FROM ({}) q").format(select_list, sql.SQL(query))
+    
+    @staticmethod
+    def record_batch(rows: List[tuple], arrow_schema):
+        """Build a typed RecordBatch from cursor rows, column by column."""
+        return pa.RecordBatch.from_arrays(
+            [json_to_arrow(values, field.type) if field.metadata == JSON_ENCODED
+             else pa.array(values, type=field.type)
+             for values, field in zip(zip(*rows), arrow_schema)],
+            schema=arrow_schema,
+        )
+    
+    def write_query(self, query: Union[str, sql.Composable], arrow_schema, filepath: Path,
+                    row_group_size: int = None, compression: str = None) -> int:
+        """
+        Stream a query into a Parquet file one row group at a time.
+        
+        Rows are read with fetchmany() from a named (server-side) cursor, so
+        peak memory is a single chunk regardless of table size.
+        """
+        row_group_size = row_group_size or self.cfg.export_row_group_size
+        compression = compression or self.cfg.export_parquet_compression
+        conn = self.get_connection()
+        writer = None
+        rows = 0
+        try:
+            with conn.cursor(name="keap_parquet_export") as cur:
+                cur.itersize = row_group_size
                 cur.execute(query)
-                columns = [desc[0] for desc in cur.description]
-                rows = cur.fetchall()
-                
-                data = [dict(zip(columns, row)) for row in rows]
-                
-                if not data:
-                    print("No contact data found")
-                    return None
-                
-                # Export to CSV
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"contacts_with_relationships_{timestamp}.csv"
-                filepath = self.output_dir / filename
-                
-                with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-                    writer = csv.DictWriter(csvfile, fieldnames=data[0].keys())
-                    writer.writeheader()
-                    writer.writerows(data)
-                
-                print(f"Exported {len(data)} contacts with relationships to {filepath}")
-                return str(filepath)
+                while True:
+                    chunk = cur.fetchmany(row_group_size)
+                    if not chunk:
+                        break
+                    batch = self.record_batch(chunk, arrow_schema)
+                    if writer is None:
+                        writer = pq.ParquetWriter(filepath, arrow_schema, compression=compression)
+                    writer.write_batch(batch, row_group_size=row_group_size)
+                    rows += len(chunk)
+        except Exception:
+            if writer is not None:
+                writer.close()
+                writer = None
+            filepath.unlink(missing_ok=True)
+            raise
         finally:
+            if writer is not None:
+                writer.close()
             conn.close()
-
-class ParquetExporter(BaseExporter):
-    """Parquet export functionality."""
+        return rows
     
     def export_table(self, table_name: str, schema: str = "keap",
                     where_clause: str = None, limit: int = None,
-                    filename: str = None) -> str:
-        """Export a single table to Parquet."""
-        data = self.get_table_data(table_name, schema, where_clause, limit)
-        
-        if not data:
-            print(f"No data found for table {schema}.{table_name}")
-            return None
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
-        
-        # Handle JSONB columns
-        for col in df.columns:
-            if df[col].dtype == 'object':
-                # Check if column contains JSON-like data
-                sample_val = df[col].dropna().iloc[0] if not df[col].dropna().empty else None
-                if isinstance(sample_val, str) and (sample_val.startswith('{') or sample_val.startswith('[')):
-                    try:
-                        # Convert JSON strings to proper JSON objects
-                        df[col] = df[col].apply(lambda x: json.loads(x) if isinstance(x, str) else x)
-                    except (json.JSONDecodeError, TypeError):
-                        pass
+                    filename: str = None, columns: Optional[List[str]] = None,
+                    include_raw: bool = False, compression: Optional[str] = None,
+                    row_group_size: int = None) -> str:
+        """Export a single table to Parquet with a schema taken from the catalog."""
+        selected = self.select_columns(table_name, schema, columns, include_raw)
+        arrow_schema, query = self.build_arrow_schema(table_name, schema, selected)
+        if where_clause:
+            query += sql.SQL(" WHERE " + where_clause)
+        if limit:
+            query += sql.SQL(" LIMIT {}").format(sql.Literal(int(limit)))
         
         # Generate filename if not provided
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{table_name}_{timestamp}.parquet"
+            filename = f"{table_name}_{timestamp}.{self.extension}"
         
         filepath = self.output_dir / filename
+        started = time.monotonic()
+        rows = self.write_query(query, arrow_schema, filepath, row_group_size, compression)
         
-        # Write Parquet file
-        df.to_parquet(filepath, index=False, engine='pyarrow')
+        if not rows:
+            print(f"No data found for table {schema}.{table_name}")
+            return None
         
-        print(f"Exported {len(data)} records from {schema}.{table_name} to {filepath}")
+        print(f"Exported {rows} records from {schema}.{table_name} to {filepath} "
+              f"in {time.monotonic() - started:.1f}s")
         return str(filepath)
     
-    def export_all_entities(self, where_clause: str = None, limit: int = None) -> List[str]:
+    def write_partitioned(self, query: Union[str, sql.Composable], arrow_schema, entity_dir: Path,
+                          run_id: str, granularity: str = 'day', row_group_size: int = None,
+                          compression: str = None) -> List[Dict[str, Any]]:
+        """
+        Stream a query ordered by updated_at into ``updated_date=`` partitions.
+        
+        Because input is ordered, a partition missing from the current chunk
+        is complete and its writer is closed, so only one or two files are
+        open at a time. Returns a manifest entry per written file.
+        """
+        row_group_size = row_group_size or self.cfg.export_row_group_size
+        compression = compression or self.cfg.export_parquet_compression
+        date_format = PARTITION_FORMATS[granularity]
+        writers: Dict[str, Dict[str, Any]] = {}
+        written: List[Dict[str, Any]] = []
+        
+        def close(value):
+            entry = writers.pop(value)
+            entry['writer'].close()
+            path = entry['path']
+            written.append({
+                'path': path.relative_to(entity_dir.parent).as_posix(),
+                'partition': f"updated_date={value}",
+                'rows': entry['rows'],
+                'min_updated_at': entry['min'].isoformat(timespec='microseconds') if entry['min'] else None,
+                'max_updated_at': entry['max'].isoformat(timespec='microseconds') if entry['max'] else None,
+                'bytes': path.stat().st_size,
+                'sha256': file_sha256(path),
+            })
+        
+        conn = self.get_connection()
+        try:
+            with conn.cursor(name="keap_parquet_export") as cur:
+                cur.itersize = row_group_size
+                cur.execute(query)
+                while True:
+                    chunk = cur.fetchmany(row_group_size)
+                    if not chunk:
+                        break
+                    batch = self.record_batch(chunk, arrow_schema)
+                    keys = pc.fill_null(pc.strftime(batch.column('updated_at'), format=date_format),
+                                        HIVE_NULL_PARTITION)
+                    seen = set()
+                    for value in pc.unique(keys).to_pylist():
+                        seen.add(value)
+                        if value not in writers:
+                            path = entity_dir / f"updated_date={value}" / f"part-{run_id}.parquet"
+                            path.parent.mkdir(parents=True, exist_ok=True)
+                            writers[value] = {
+                                'writer': pq.ParquetWriter(path, arrow_schema, compression=compression),
+                                'path': path, 'rows': 0, 'min': None, 'max': None,
+                            }
+                        entry = writers[value]
+                        part = batch.filter(pc.equal(keys, value))
+                        entry['writer'].write_batch(part, row_group_size=row_group_size)
+                        entry['rows'] += part.num_rows
+                        bounds = pc.min_max(part.column('updated_at')).as_py()
+                        if bounds['min'] is not None:
+                            entry['min'] = min(filter(None, [entry['min'], bounds['min']]))
+                            entry['max'] = max(filter(None, [entry['max'], bounds['max']]))
+                    for value in [v for v in writers if v not in seen]:
+                        close(value)
+            for value in list(writers):
+                close(value)
+        except Exception:
+            for entry in writers.values():
+                entry['writer'].close()
+                entry['path'].unlink(missing_ok=True)
+            for entry in written:
+                (entity_dir.parent / entry['path']).unlink(missing_ok=True)
+            raise
+        finally:
+            conn.close()
+        return written
+    
+    def export_incremental(self, table_name: str, manifest: DatasetManifest, run_id: str,
+                           schema: str = "keap", include_raw: bool = False,
+                           granularity: str = None, changes_bound: str = None) -> Dict[str, Any]:
+        """
+        Append rows changed since the manifest watermark to a partitioned dataset.
+        
+        Layout is ``entity=<table>/updated_date=<date>/part-<run_id>.parquet``.
+        Tables with the synced_at marker (sql/add_sync_markers.sql) select
+        rows the sync wrote since the previous run's ``changes_bound``, so
+        rows written with an old or NULL updated_at are not lost; rows seen
+        twice are deduplicated by compaction. Without the marker, rows past
+        the updated_at watermark are selected. Tables without updated_at are
+        re-exported in full and replace their previous files.
+        
+        When reading from an exported snapshot, pass the ``changes_bound()``
+        taken before the snapshot.
+        """
+        granularity = granularity or self.cfg.export_partition_granularity
+        available = self.get_table_columns(table_name, schema)
+        selected = self.select_columns(table_name, schema, include_raw=include_raw)
+        selected = [c for c in selected if c != SYNC_MARKER_COLUMN]
+        arrow_schema, query = self.build_arrow_schema(table_name, schema, selected)
+        entity_dir = manifest.dataset_dir / f"entity={table_name}"
+        
+        if 'updated_at' not in selected:
+            filepath = entity_dir / f"part-{run_id}.parquet"
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            rows = self.write_query(query, arrow_schema, filepath)
+            files = []
+            if rows:
+                files.append({
+                    'entity': table_name, 'run_id': run_id,
+                    'path': filepath.relative_to(manifest.dataset_dir).as_posix(),
+                    'partition': None, 'rows': rows,
+                    'bytes': filepath.stat().st_size, 'sha256': file_sha256(filepath),
+                })
+            with manifest.locked():
+                previous = [f for f in manifest.files(table_name) if f['run_id'] != run_id]
+                manifest.record_run(table_name, run_id, files, None, mode='full')
+            for entry in previous:
+                (manifest.dataset_dir / entry['path']).unlink(missing_ok=True)
+            return {'entity': table_name, 'mode': 'full', 'rows': rows, 'files': len(files)}
+        
+        watermark = manifest.watermark(table_name)
+        synced_watermark = None
+        if SYNC_MARKER_COLUMN in available:
+            synced_watermark = changes_bound or self.changes_bound()
+            since = manifest.synced_watermark(table_name)
+            if since:
+                query += sql.SQL(" WHERE {} >= {}").format(
+                    sql.Identifier(SYNC_MARKER_COLUMN), sql.Literal(since))
+        elif watermark:
+            query += sql.SQL(" WHERE updated_at > {}").format(sql.Literal(watermark))
+        query += sql.SQL(" ORDER BY updated_at NULLS FIRST")
+        
+        files = self.write_partitioned(query, arrow_schema, entity_dir, run_id, granularity)
+        for entry in files:
+            entry.update({'entity': table_name, 'run_id': run_id})
+        
+        maxima = [f['max_updated_at'] for f in files if f['max_updated_at']]
+        new_watermark = max(filter(None, [watermark, *maxima]), default=None)
+        
+        with manifest.locked():
+            manifest.record_run(table_name, run_id, files, new_watermark,
+                                primary_key=self.get_primary_key(table_name, schema),
+                                synced_watermark=synced_watermark)
+        rows = sum(f['rows'] for f in files)
+        return {'entity': table_name, 'mode': 'incremental', 'rows': rows,
+                'files': len(files), 'watermark': new_watermark}
+    
+    def export_all_entities(self, where_clause: str = None, limit: int = None,
+                            include_raw: bool = False, compression: Optional[str] = None) -> List[str]:
         """Export all entity tables to Parquet."""
         tables = self.get_entity_tables()
         exported_files = []
         
         for table in tables:
             try:
-                filepath = self.export_table(table, where_clause=where_clause, limit=limit)
+                filepath = self.export_table(table, where_clause=where_clause, limit=limit,
+                                             include_raw=include_raw, compression=compression)
                 if filepath:
                     exported_files.append(filepath)
             except Exception as e:
@@ -231,72 +1063,406 @@ class ParquetExporter(BaseExporter):
         return exported_files
     
     def export_analytics_dataset(self, limit: int = None) -> str:
-        """Export a comprehensive analytics dataset."""
+        """
+        Export a comprehensive analytics dataset.
+        
+        Per-contact counts and opportunity value come from keap.contact_rollup,
+        which the sync keeps current, joined 1:1 to contacts; nothing is
+        re-aggregated at export time. Without the rollup table each child
+        table is aggregated per contact instead.
+        """
         conn = self.get_connection()
         try:
-            with conn.cursor() as cur:
-                # Create a comprehensive analytics view
-                query = """
-                    WITH contact_metrics AS (
-                        SELECT 
-                            c.id as contact_id,
-                            c.given_name,
-                            c.family_name,
-                            c.email,
-                            c.email_status,
-                            c.email_opted_in,
-                            c.score_value,
-                            co.name as company_name,
-                            co.website as company_website,
-                            u.email as owner_email,
-                            COUNT(DISTINCT o.id) as opportunity_count,
-                            COUNT(DISTINCT t.id) as task_count,
-                            COUNT(DISTINCT n.id) as note_count,
-                            COUNT(DISTINCT ct.tag_id) as tag_count,
-                            SUM(o.value) as total_opportunity_value,
-                            c.created_at,
-                            c.updated_at
-                        FROM keap.contacts c
-                        LEFT JOIN keap.companies co ON c.company_id = co.id
-                        LEFT JOIN keap.users u ON c.owner_id = u.id
-                        LEFT JOIN keap.opportunities o ON c.id = o.contact_id
-                        LEFT JOIN keap.tasks t ON c.id = t.contact_id
-                        LEFT JOIN keap.notes n ON c.id = n.contact_id
-                        LEFT JOIN keap.contact_tags ct ON c.id = ct.contact_id
-                        GROUP BY c.id, c.given_name, c.family_name, c.email, 
-                                c.email_status, c.email_opted_in, c.score_value,
-                                co.name, co.website, u.email, c.created_at, c.updated_at
-                    )
-                    SELECT * FROM contact_metrics
-                """
-                
-                if limit:
-                    query += f" LIMIT {limit}"
-                
+            rollup = "keap.contact_rollup" if contact_rollup_available(conn) else CONTACT_ROLLUP_FALLBACK
+        finally:
+            conn.close()
+        
+        query = f"""
+            SELECT
+                c.id as contact_id,
+                c.given_name,
+                c.family_name,
+                c.email,
+                c.email_status,
+                c.email_opted_in,
+                c.score_value,
+                co.name as company_name,
+                co.website as company_website,
+                u.email as owner_email,
+                coalesce(r.opportunity_count, 0) as opportunity_count,
+                coalesce(r.task_count, 0) as task_count,
+                coalesce(r.open_task_count, 0) as open_task_count,
+                coalesce(r.note_count, 0) as note_count,
+                coalesce(r.tag_count, 0) as tag_count,
+                r.opportunity_value as total_opportunity_value,
+                r.last_activity_at,
+                c.created_at,
+                c.updated_at
+            FROM keap.contacts c
+            LEFT JOIN keap.companies co ON c.company_id = co.id
+            LEFT JOIN keap.users u ON c.owner_id = u.id
+            LEFT JOIN {rollup} r ON r.contact_id = c.id
+        """
+        
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        
+        arrow_schema, select_query = self.build_query_schema(query)
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"analytics_dataset_{timestamp}.{self.extension}"
+        filepath = self.output_dir / filename
+        started = time.monotonic()
+        rows = self.write_query(select_query, arrow_schema, filepath)
+        
+        if not rows:
+            print("No analytics data found")
+            return None
+        
+        print(f"Exported {rows} analytics records to {filepath} in {time.monotonic() - started:.1f}s")
+        return str(filepath)
+
+class ArrowExporter(ParquetExporter):
+    """
+    Arrow IPC (Feather v2) snapshots for fast repeated loads.
+    
+    Uses the same catalog-typed schema as Parquet. Files are uncompressed
+    by default so ArrowSnapshot can memory-map them without decoding. A
+    sidecar index maps contact id (or id) to row offsets.
+    """
+    
+    extension = "arrow"
+    
+    def sidecar_paths(self, filepath: Path) -> List[Path]:
+        return [arrow_index_path(filepath)]
+    
+    @staticmethod
+    def write_index(filepath: Path, column: str, keys: np.ndarray) -> int:
+        """Write the sorted ``key -> row`` index for a snapshot; returns its entry count."""
+        rows = np.flatnonzero(~np.isnan(keys)) if keys.dtype.kind == 'f' else np.arange(len(keys))
+        keys = keys[rows].astype(np.int64)
+        order = np.argsort(keys, kind='stable')
+        index = pa.table({'key': keys[order], 'row': rows[order].astype(np.int64)})
+        index = index.replace_schema_metadata({'column': column})
+        tmp_path = filepath.with_name(f".{filepath.name}")
+        with ipc.new_file(tmp_path, index.schema) as writer:
+            writer.write_table(index)
+        os.replace(tmp_path, filepath)
+        return len(keys)
+    
+    def write_query(self, query: Union[str, sql.Composable], arrow_schema, filepath: Path,
+                    row_group_size: int = None, compression: str = None) -> int:
+        """
+        Stream a query into an Arrow IPC file one record batch per fetch chunk.
+        
+        The index column's values are kept (8 bytes a row) and written to the
+        sidecar index once the snapshot is complete.
+        """
+        row_group_size = row_group_size or self.cfg.export_row_group_size
+        compression = compression or self.cfg.export_arrow_compression
+        options = ipc.IpcWriteOptions(compression=None if compression == 'none' else compression)
+        index_column = next((c for c in ARROW_INDEX_COLUMNS if c in arrow_schema.names
+                             and pa.types.is_integer(arrow_schema.field(c).type)), None)
+        index_path = arrow_index_path(filepath)
+        conn = self.get_connection()
+        writer = None
+        keys = []
+        rows = 0
+        try:
+            with conn.cursor(name="keap_arrow_export") as cur:
+                cur.itersize = row_group_size
                 cur.execute(query)
-                columns = [desc[0] for desc in cur.description]
-                rows = cur.fetchall()
-                
-                data = [dict(zip(columns, row)) for row in rows]
-                
-                if not data:
-                    print("No analytics data found")
-                    return None
-                
-                # Convert to DataFrame
-                df = pd.DataFrame(data)
-                
-                # Export to Parquet
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"analytics_dataset_{timestamp}.parquet"
-                filepath = self.output_dir / filename
-                
-                df.to_parquet(filepath, index=False, engine='pyarrow')
-                
-                print(f"Exported {len(data)} analytics records to {filepath}")
-                return str(filepath)
+                while True:
+                    chunk = cur.fetchmany(row_group_size)
+                    if not chunk:
+                        break
+                    batch = self.record_batch(chunk, arrow_schema)
+                    if writer is None:
+                        writer = ipc.new_file(filepath, arrow_schema, options=options)
+                    writer.write_batch(batch)
+                    if index_column:
+                        keys.append(batch.column(index_column).to_numpy(zero_copy_only=False))
+                    rows += len(chunk)
+            if writer is not None:
+                writer.close()
+                writer = None
+                if index_column:
+                    self.write_index(index_path, index_column, np.concatenate(keys))
+        except Exception:
+            if writer is not None:
+                writer.close()
+                writer = None
+            filepath.unlink(missing_ok=True)
+            index_path.unlink(missing_ok=True)
+            raise
+        finally:
+            if writer is not None:
+                writer.close()
+            conn.close()
+        return rows
+
+# Excel sheet limits: 1,048,576 rows including the header, 32,767 characters per cell
+XLSX_MAX_ROWS = 1048575
+XLSX_MAX_CELL_CHARS = 32767
+
+# Types openpyxl writes natively; timestamptz is converted to naive UTC
+# since Excel has no time zones, and everything else is cast to text.
+_XLSX_NATIVE_TYPES = {'int2', 'int4', 'int8', 'float4', 'float8', 'numeric', 'bool',
+                      'date', 'timestamp', 'text', 'varchar', 'bpchar', 'name'}
+
+class ExcelExporter(BaseExporter):
+    """
+    Excel export in openpyxl's write-only mode, streamed from a server-side cursor.
+    
+    Rows are appended chunk by chunk and flushed by openpyxl as they are
+    written, so memory stays bounded; tables beyond the sheet row limit
+    continue on ``<table>_2``, ``<table>_3``, ... sheets.
+    """
+    
+    def excel_select(self, table_name: str, schema: str = "keap",
+                     columns: Optional[List[str]] = None) -> sql.Composable:
+        """SELECT with each column converted to a type openpyxl can write."""
+        column_types = self.get_column_types(table_name, schema)
+        items = []
+        for column in columns or list(column_types):
+            typname, _, elem = column_types[column]
+            if elem is None and typname == 'timestamptz':
+                items.append(sql.SQL("{} AT TIME ZONE 'UTC' AS {}").format(
+                    sql.Identifier(column), sql.Identifier(column)))
+            elif elem is None and typname in _XLSX_NATIVE_TYPES:
+                items.append(sql.Identifier(column))
+            else:
+                items.append(sql.SQL("{}::text AS {}").format(
+                    sql.Identifier(column), sql.Identifier(column)))
+        return sql.SQL("SELECT {} FROM {}.{}").format(
+            sql.SQL(', ').join(items), sql.Identifier(schema), sql.Identifier(table_name)
+        )
+    
+    def write_query(self, query: Union[str, sql.Composable], header: List[str], filepath: Path,
+                    sheet_name: str, rows_per_sheet: int = XLSX_MAX_ROWS,
+                    chunk_size: int = None) -> int:
+        """Stream a query into a write-only workbook, starting a new sheet every ``rows_per_sheet`` rows."""
+        try:
+            from openpyxl import Workbook
+            from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+        except ImportError:
+            raise ValueError("xlsx export requires the openpyxl package (pip install openpyxl)")
+        
+        def clean(value):
+            if isinstance(value, str):
+                return ILLEGAL_CHARACTERS_RE.sub('', value)[:XLSX_MAX_CELL_CHARS]
+            return value
+        
+        chunk_size = chunk_size or self.cfg.export_row_group_size
+        workbook = Workbook(write_only=True)
+        sheet, sheets, sheet_rows, rows = None, 0, 0, 0
+        conn = self.get_connection()
+        try:
+            with conn.cursor(name="keap_xlsx_export") as cur:
+                cur.itersize = chunk_size
+                cur.execute(query)
+                while True:
+                    chunk = cur.fetchmany(chunk_size)
+                    if not chunk:
+                        break
+                    for row in chunk:
+                        if sheet is None or sheet_rows >= rows_per_sheet:
+                            sheets += 1
+                            suffix = f"_{sheets}" if sheets > 1 else ""
+                            sheet = workbook.create_sheet(f"{sheet_name[:31 - len(suffix)]}{suffix}")
+                            sheet.append(header)
+                            sheet_rows = 0
+                        sheet.append([clean(value) for value in row])
+                        sheet_rows += 1
+                    rows += len(chunk)
+            if rows:
+                workbook.save(filepath)
+        except Exception:
+            filepath.unlink(missing_ok=True)
+            raise
         finally:
             conn.close()
+        return rows
+    
+    def export_table(self, table_name: str, schema: str = "keap",
+                    where_clause: str = None, limit: int = None,
+                    filename: str = None, columns: Optional[List[str]] = None,
+                    include_raw: bool = False, compression: Optional[str] = None,
+                    rows_per_sheet: int = XLSX_MAX_ROWS) -> str:
+        """Export a single table to an .xlsx workbook (already zip-compressed; ``compression`` is ignored)."""
+        selected = self.select_columns(table_name, schema, columns, include_raw)
+        query = self.excel_select(table_name, schema, selected)
+        if where_clause:
+            query += sql.SQL(" WHERE " + where_clause)
+        if limit:
+            query += sql.SQL(" LIMIT {}").format(sql.Literal(int(limit)))
+        
+        if not filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = f"{table_name}_{timestamp}.xlsx"
+        
+        filepath = self.output_dir / filename
+        started = time.monotonic()
+        rows = self.write_query(query, selected, filepath, table_name, rows_per_sheet)
+        
+        if not rows:
+            print(f"No data found for table {schema}.{table_name}")
+            return None
+        
+        sheets = -(-rows // rows_per_sheet)
+        print(f"Exported {rows} records from {schema}.{table_name} to {filepath} "
+              f"({sheets} sheet(s)) in {time.monotonic() - started:.1f}s")
+        return str(filepath)
+
+class DatasetCompactor:
+    """
+    Merges small files in an incremental dataset and drops superseded rows.
+    
+    For each entity, every row version is ranked by (updated_at, run) using
+    only the key columns, so the latest version of each primary key wins
+    even when older versions sit in other date partitions. Partitions with
+    several files or superseded rows are rewritten into target-size files;
+    the others are left alone.
+    
+    New files are written under a dot-prefixed temp name (ignored by
+    dataset readers) and renamed into place; the manifest swap happens
+    under the manifest lock and only covers the files that were compacted,
+    so incremental exports can keep appending while this runs.
+    """
+    
+    def __init__(self, cfg: Settings, dataset_dir: Union[str, Path]):
+        self.cfg = cfg
+        self.dataset_dir = Path(dataset_dir)
+    
+    def compact(self, entity: str = None, target_file_mb: int = None) -> List[Dict[str, Any]]:
+        """Compact one entity or every incremental entity in the dataset."""
+        target_bytes = (target_file_mb or self.cfg.export_compaction_target_mb) * 1024 * 1024
+        manifest = DatasetManifest(self.dataset_dir)
+        entities = [entity] if entity else sorted(manifest.data['tables'])
+        results = []
+        for name in entities:
+            table = manifest.data['tables'].get(name)
+            if not table or table.get('mode') == 'full':
+                continue
+            results.append(self.compact_entity(manifest, name, target_bytes))
+        return results
+    
+    def _latest_versions(self, files: List[Dict[str, Any]], primary_key: List[str]) -> Dict[int, np.ndarray]:
+        """Return, per file index, the row numbers holding the latest version of their key."""
+        parts = []
+        for index, entry in enumerate(files):
+            keys = pq.read_table(self.dataset_dir / entry['path'], columns=primary_key + ['updated_at'])
+            parts.append(keys.append_column('_file', pa.array(np.full(keys.num_rows, index, dtype=np.int32)))
+                             .append_column('_row', pa.array(np.arange(keys.num_rows, dtype=np.int64))))
+        versions = pa.concat_tables(parts)
+        # Later updated_at wins (NULL counts as oldest); on ties the later run wins,
+        # since files are in run order
+        versions = versions.append_column('_ts', pc.fill_null(
+            pc.cast(versions['updated_at'], pa.int64()), np.iinfo(np.int64).min))
+        versions = versions.take(pc.sort_indices(
+            versions, sort_keys=[('_ts', 'ascending'), ('_file', 'ascending'), ('_row', 'ascending')]))
+        versions = versions.append_column('_rank', pa.array(np.arange(versions.num_rows, dtype=np.int64)))
+        winners = versions.take(versions.group_by(primary_key).aggregate([('_rank', 'max')])['_rank_max'])
+        
+        file_ids = winners['_file'].to_numpy()
+        rows = winners['_row'].to_numpy()
+        return {index: np.sort(rows[file_ids == index]) for index in range(len(files))}
+    
+    def compact_entity(self, manifest: DatasetManifest, entity: str, target_bytes: int) -> Dict[str, Any]:
+        """Dedupe and merge the partitions of one entity."""
+        files = sorted(manifest.files(entity), key=lambda f: (f['run_id'], f['path']))
+        primary_key = manifest.data['tables'][entity].get('primary_key') or ['id']
+        result = {'entity': entity, 'partitions': 0, 'files_in': 0, 'files_out': 0, 'rows_dropped': 0}
+        if not files:
+            return result
+        
+        keep = self._latest_versions(files, primary_key)
+        partitions: Dict[str, List[int]] = {}
+        for index, entry in enumerate(files):
+            partitions.setdefault(entry['partition'], []).append(index)
+        
+        compaction_id = new_run_id("compact_")
+        for partition, indexes in sorted(partitions.items(), key=lambda item: str(item[0])):
+            dropped = sum(files[i]['rows'] - len(keep[i]) for i in indexes)
+            if len(indexes) < 2 and not dropped:
+                continue
+            old_entries = [files[i] for i in indexes]
+            tables = [pq.read_table(self.dataset_dir / files[i]['path']).take(pa.array(keep[i]))
+                      for i in indexes]
+            if len({t.schema for t in tables}) > 1:
+                print(f"Skipping {entity}/{partition}: files have different schemas")
+                continue
+            
+            new_entries = self._write_compacted(entity, partition, compaction_id,
+                                                pa.concat_tables(tables).sort_by('updated_at'),
+                                                old_entries, target_bytes)
+            with manifest.locked():
+                current = {f['path'] for f in manifest.files(entity)}
+                old_paths = {f['path'] for f in old_entries}
+                if not old_paths <= current:
+                    # Another compaction got here first; leave its result alone
+                    for entry in new_entries:
+                        (self.dataset_dir / entry['path']).unlink(missing_ok=True)
+                    continue
+                manifest.data['files'] = [f for f in manifest.data['files'] if f['path'] not in old_paths]
+                manifest.data['files'].extend(new_entries)
+                table = manifest.data['tables'][entity]
+                table['row_count'] = sum(f['rows'] for f in manifest.files(entity))
+                table['last_compaction'] = compaction_id
+            for entry in old_entries:
+                (self.dataset_dir / entry['path']).unlink(missing_ok=True)
+            
+            result['partitions'] += 1
+            result['files_in'] += len(old_entries)
+            result['files_out'] += len(new_entries)
+            result['rows_dropped'] += dropped
+        return result
+    
+    def _write_compacted(self, entity: str, partition: str, compaction_id: str, table,
+                         old_entries: List[Dict[str, Any]], target_bytes: int) -> List[Dict[str, Any]]:
+        """Write a partition's surviving rows as target-size files."""
+        if table.num_rows == 0:
+            return []
+        bytes_per_row = sum(f['bytes'] for f in old_entries) / max(sum(f['rows'] for f in old_entries), 1)
+        rows_per_file = max(int(target_bytes / max(bytes_per_row, 1)), 1)
+        directory = self.dataset_dir / f"entity={entity}" / partition
+        entries = []
+        for n, offset in enumerate(range(0, table.num_rows, rows_per_file)):
+            chunk = table.slice(offset, rows_per_file)
+            final_path = directory / f"part-{compaction_id}-{n:03d}.parquet"
+            tmp_path = directory / f".{final_path.name}.tmp"
+            pq.write_table(chunk, tmp_path, row_group_size=self.cfg.export_row_group_size,
+                           compression=self.cfg.export_parquet_compression,
+                           use_dictionary=True, write_statistics=True)
+            os.replace(tmp_path, final_path)
+            bounds = pc.min_max(chunk.column('updated_at')).as_py()
+            entries.append({
+                'entity': entity, 'run_id': compaction_id,
+                'path': final_path.relative_to(self.dataset_dir).as_posix(),
+                'partition': partition, 'rows': chunk.num_rows,
+                'min_updated_at': bounds['min'].isoformat(timespec='microseconds') if bounds['min'] else None,
+                'max_updated_at': bounds['max'].isoformat(timespec='microseconds') if bounds['max'] else None,
+                'bytes': final_path.stat().st_size, 'sha256': file_sha256(final_path),
+                'compacted_from': len(old_entries),
+            })
+        return entries
+
+def _export_table_in_snapshot(cfg: Settings, output_dir: str, format: str, table: str,
+                              snapshot_id: str, options: Dict[str, Any],
+                              export_key: Optional[str] = None) -> tuple:
+    """
+    Worker entry point: export one table from an imported snapshot.
+    
+    With an ``export_key`` unchanged tables are skipped. Returns ``(path, skipped)``.
+    """
+    exporter_cls = {"csv": CSVExporter, "parquet": ParquetExporter, "arrow": ArrowExporter,
+                    "xlsx": ExcelExporter}[format]
+    exporter = exporter_cls(cfg, output_dir, snapshot_id=snapshot_id)
+    if export_key:
+        options = dict(options)
+        filename = options.pop('filename')
+        return exporter.export_if_changed(table, export_key, filename, **options)
+    return exporter.export_table(table, **options), False
 
 class ExportManager:
     """Manages data exports with multiple formats and options."""
@@ -305,37 +1471,201 @@ class ExportManager:
         self.cfg = cfg
         self.csv_exporter = CSVExporter(cfg, output_dir)
         self.parquet_exporter = ParquetExporter(cfg, output_dir)
+        self.arrow_exporter = ArrowExporter(cfg, output_dir)
+        self.excel_exporter = ExcelExporter(cfg, output_dir)
         self.output_dir = Path(output_dir)
     
     def export_entity(self, entity: str, format: str = "csv", 
-                     where_clause: str = None, limit: int = None) -> str:
-        """Export a specific entity in the specified format."""
+                     where_clause: str = None, limit: int = None,
+                     columns: Optional[List[str]] = None, include_raw: bool = False,
+                     compression: Optional[str] = None, jsonb: str = "text",
+                     explode: Optional[str] = None) -> str:
+        """
+        Export a specific entity in the specified format.
+        
+        ``jsonb`` and ``explode`` control JSONB array flattening for CSV;
+        Parquet and Arrow store those columns as list<struct> (EXPORT_FLATTEN_JSONB).
+        """
+        if format.lower() != "csv" and (jsonb != "text" or explode):
+            raise ValueError("--jsonb/--explode apply to CSV exports only")
         if format.lower() == "csv":
-            return self.csv_exporter.export_table(entity, where_clause=where_clause, limit=limit)
+            return self.csv_exporter.export_table(entity, where_clause=where_clause, limit=limit,
+                                                  columns=columns, include_raw=include_raw,
+                                                  compression=compression, jsonb=jsonb,
+                                                  explode=explode)
         elif format.lower() == "parquet":
-            return self.parquet_exporter.export_table(entity, where_clause=where_clause, limit=limit)
+            return self.parquet_exporter.export_table(entity, where_clause=where_clause, limit=limit,
+                                                      columns=columns, include_raw=include_raw,
+                                                      compression=compression)
+        elif format.lower() == "arrow":
+            return self.arrow_exporter.export_table(entity, where_clause=where_clause, limit=limit,
+                                                    columns=columns, include_raw=include_raw,
+                                                    compression=compression)
+        elif format.lower() == "xlsx":
+            return self.excel_exporter.export_table(entity, where_clause=where_clause, limit=limit,
+                                                    columns=columns, include_raw=include_raw)
         else:
             raise ValueError(f"Unsupported format: {format}")
     
     def export_all(self, format: str = "csv", where_clause: str = None, 
-                  limit: int = None) -> List[str]:
-        """Export all entities in the specified format."""
-        if format.lower() == "csv":
-            return self.csv_exporter.export_all_entities(where_clause=where_clause, limit=limit)
-        elif format.lower() == "parquet":
-            return self.parquet_exporter.export_all_entities(where_clause=where_clause, limit=limit)
-        else:
+                  limit: int = None, include_raw: bool = False,
+                  compression: Optional[str] = None, workers: int = None,
+                  skip_unchanged: bool = True) -> List[str]:
+        """
+        Export all entities in the specified format from one consistent snapshot.
+        
+        A REPEATABLE READ transaction is held open while its snapshot is
+        published with pg_export_snapshot(); each table is exported by a
+        worker process that imports that snapshot, so all files reflect the
+        same point in time even while a sync is running.
+        
+        Unless ``skip_unchanged`` is off (or a filter/limit is given), tables
+        whose keap_meta.table_fingerprint matches their last export with the
+        same format and options reuse the previous file instead.
+        """
+        format = format.lower()
+        if format not in ("csv", "parquet", "arrow", "xlsx"):
             raise ValueError(f"Unsupported format: {format}")
+        workers = workers or self.cfg.export_workers
+        export_key = None
+        if skip_unchanged and not where_clause and not limit:
+            export_key = f"{format}:{compression or ''}:raw={include_raw}"
+            if format != "csv" and self.cfg.export_flatten_jsonb:
+                export_key += ":jsonb=struct"
+        
+        with self.exported_snapshot() as (snapshot_id, tables):
+            # One timestamp for the whole set, since the files share a snapshot
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            extension = f"csv{COMPRESSION_SUFFIXES[compression]}" if format == "csv" else format
+            jobs = {
+                table: dict(where_clause=where_clause, limit=limit, include_raw=include_raw,
+                            compression=compression, filename=f"{table}_{timestamp}.{extension}")
+                for table in tables
+            }
+            
+            started = time.monotonic()
+            exported_files, skipped = [], []
+            
+            def collect(table, result):
+                filepath, was_skipped = result
+                if filepath:
+                    exported_files.append(filepath)
+                if was_skipped:
+                    skipped.append(table)
+            
+            if workers <= 1:
+                for table, options in jobs.items():
+                    try:
+                        collect(table, _export_table_in_snapshot(self.cfg, str(self.output_dir), format,
+                                                                 table, snapshot_id, options, export_key))
+                    except Exception as e:
+                        print(f"Error exporting {table}: {e}")
+            else:
+                with ProcessPoolExecutor(max_workers=min(workers, len(jobs) or 1)) as pool:
+                    futures = {
+                        pool.submit(_export_table_in_snapshot, self.cfg, str(self.output_dir),
+                                    format, table, snapshot_id, options, export_key): table
+                        for table, options in jobs.items()
+                    }
+                    for future in as_completed(futures):
+                        try:
+                            collect(futures[future], future.result())
+                        except Exception as e:
+                            print(f"Error exporting {futures[future]}: {e}")
+            
+            print(f"Exported {len(exported_files)} of {len(tables)} tables from snapshot "
+                  f"{snapshot_id} with {workers} worker(s) in {time.monotonic() - started:.1f}s")
+            if skipped:
+                print(f"Skipped {len(skipped)} unchanged table(s): {', '.join(sorted(skipped))}")
+            return sorted(exported_files)
     
-    def export_analytics(self, format: str = "parquet", limit: int = None) -> str:
+    @contextmanager
+    def exported_snapshot(self):
+        """
+        Hold a read-only REPEATABLE READ transaction and publish its snapshot.
+        
+        Yields ``(snapshot_id, tables)`` with keap tables ordered largest
+        first. The snapshot stays importable until the block exits.
+        """
+        conn = self.csv_exporter.get_connection()
+        try:
+            conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_export_snapshot()")
+                snapshot_id = cur.fetchone()[0]
+                # Largest tables first so they don't end up running alone at the tail
+                cur.execute("""
+                    SELECT c.relname
+                    FROM pg_class c
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE n.nspname = 'keap' AND c.relkind = 'r'
+                    ORDER BY pg_total_relation_size(c.oid) DESC, c.relname
+                """)
+                tables = [row[0] for row in cur.fetchall()]
+            yield snapshot_id, tables
+        finally:
+            # Ending the transaction releases the snapshot; workers are done by now
+            conn.rollback()
+            conn.close()
+    
+    def export_incremental(self, tables: Optional[List[str]] = None, dataset_dir: str = None,
+                           include_raw: bool = False, granularity: str = None) -> List[Dict[str, Any]]:
+        """
+        Append changed rows of each table to the partitioned Parquet dataset.
+        
+        Reads come from one exported snapshot so watermarks are consistent
+        across tables. The manifest is updated under its lock after each
+        table, so a failure only loses the table that was in progress.
+        """
+        dataset_path = Path(dataset_dir) if dataset_dir else self.output_dir / "dataset"
+        manifest = DatasetManifest(dataset_path)
+        run_id = new_run_id()
+        results = []
+        
+        # Taken before the snapshot: writes still in flight then are picked up next run
+        changes_bound = self.parquet_exporter.changes_bound()
+        with self.exported_snapshot() as (snapshot_id, all_tables):
+            exporter = ParquetExporter(self.cfg, str(self.output_dir), snapshot_id=snapshot_id)
+            for table in tables or all_tables:
+                started = time.monotonic()
+                try:
+                    result = exporter.export_incremental(table, manifest, run_id,
+                                                         include_raw=include_raw,
+                                                         granularity=granularity,
+                                                         changes_bound=changes_bound)
+                except Exception as e:
+                    print(f"Error exporting {table}: {e}")
+                    continue
+                result['seconds'] = round(time.monotonic() - started, 2)
+                results.append(result)
+                print(f"{table}: {result['rows']} rows in {result['files']} file(s) "
+                      f"[{result['mode']}] in {result['seconds']}s")
+        return results
+    
+    def export_analytics(self, format: str = "parquet", limit: int = None,
+                         compression: Optional[str] = None) -> str:
         """Export analytics dataset."""
         if format.lower() == "parquet":
             return self.parquet_exporter.export_analytics_dataset(limit=limit)
+        elif format.lower() == "arrow":
+            return self.arrow_exporter.export_analytics_dataset(limit=limit)
         elif format.lower() == "csv":
-            return self.csv_exporter.export_contacts_with_relationships(limit=limit)
+            return self.csv_exporter.export_contacts_with_relationships(limit=limit,
+                                                                        compression=compression)
         else:
             raise ValueError(f"Unsupported format: {format}")
     
+    def compact_dataset(self, dataset_dir: str = None, entity: str = None,
+                        target_file_mb: int = None) -> List[Dict[str, Any]]:
+        """Compact the incremental dataset (merge small files, drop superseded rows)."""
+        dataset_path = Path(dataset_dir) if dataset_dir else self.output_dir / "dataset"
+        results = DatasetCompactor(self.cfg, dataset_path).compact(entity, target_file_mb)
+        for result in results:
+            print(f"{result['entity']}: {result['partitions']} partition(s), "
+                  f"{result['files_in']} -> {result['files_out']} files, "
+                  f"{result['rows_dropped']} superseded rows dropped")
+        return results
+    
     def list_exported_files(self) -> List[str]:
         """List all exported files in the output directory."""
         return [str(f) for f in self.output_dir.glob("*") if f.is_file()]
@@ -6,17 +6,338 @@ Handles downloading, storing, and managing contact files.
 from __future__ import annotations
 import os
 import hashlib
+import json
+import math
 import mimetypes
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple
+from typing import BinaryIO, Dict, List, Any, Optional, Tuple
 from urllib.parse import urlparse
 import psycopg2
+import psycopg2.extras
 from .config import Settings
 from .client import KeapClient
 from .retry import KeapRetryHandler
 
+# Streaming download buffer
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# keap_meta.file_sync_state row of the contact file sync
+FILE_SYNC_SCOPE = 'contact_files'
+
+# Row layouts written by upsert_contact_files / insert_download_log
+CONTACT_FILE_COLUMNS = ('contact_id', 'file_name', 'file_path', 'file_size', 'mime_type',
+                        'file_hash', 'keap_file_id')
+DOWNLOAD_LOG_COLUMNS = ('contact_id', 'operation', 'files_found', 'files_downloaded', 'files_skipped',
+                        'total_size_bytes', 'duration_ms', 'error_message')
+
+# Files per page when listing the whole Keap file inventory
+INVENTORY_PAGE_SIZE = 1000
+
+# FILE_COMPRESSION modes for stored objects
+FILE_COMPRESSIONS = ('none', 'zstd')
+
+# MIME types compressed at rest; images, media and zip-based formats (docx,
+# xlsx, ...) are compressed already and are stored as-is
+COMPRESSIBLE_MIME_PREFIXES = ('text/',)
+COMPRESSIBLE_MIME_TYPES = frozenset({
+    'application/pdf', 'application/json', 'application/xml', 'application/rtf',
+    'application/msword', 'application/vnd.ms-excel', 'application/vnd.ms-powerpoint',
+    'application/postscript', 'application/javascript', 'application/x-sh',
+    'message/rfc822', 'image/svg+xml', 'image/bmp', 'image/tiff',
+})
+
+# A compressed copy is kept only if it is at least this much smaller
+MIN_COMPRESSION_SAVING = 0.1
+
+def is_compressible(mime_type: Optional[str]) -> bool:
+    """Whether files of this (guessed) MIME type are worth compressing."""
+    return bool(mime_type) and (mime_type.startswith(COMPRESSIBLE_MIME_PREFIXES)
+                                or mime_type in COMPRESSIBLE_MIME_TYPES)
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("zstd file compression requires the zstandard package (pip install zstandard)")
+    return zstandard
+
+def open_stored_file(path) -> BinaryIO:
+    """Open a stored file for reading, decompressing ``.zst`` objects as they are read."""
+    path = Path(path)
+    if path.suffix == '.zst':
+        return _zstandard().ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+def _content_range_total(response) -> Optional[int]:
+    """Total size from a ``Content-Range: bytes a-b/total`` (or ``bytes */total``) header."""
+    total = response.headers.get('Content-Range', '').rpartition('/')[2]
+    return int(total) if total.isdigit() else None
+
+def _content_range_start(response) -> Optional[int]:
+    """First byte position from a ``Content-Range: bytes a-b/total`` header."""
+    start = response.headers.get('Content-Range', '').partition(' ')[2].partition('-')[0]
+    return int(start) if start.isdigit() else None
+
+# Marks a file_hash built by remote_file_identity; rows without it predate it
+IDENTITY_PREFIX = 'k1:'
+
+def remote_file_identity(file_info: Dict[str, Any]) -> str:
+    """
+    ``file_hash`` of a Keap file from the listing metadata: id, size and modified date.
+
+    Files without an id fall back to their URL.
+    """
+    keap_file_id = file_info.get('id')
+    if keap_file_id is None:
+        key = file_info.get('file_url', '')
+    else:
+        modified = file_info.get('last_updated') or file_info.get('date_created') or ''
+        key = f"keap:{keap_file_id}:{file_info.get('file_size', '')}:{modified}"
+    return IDENTITY_PREFIX + hashlib.sha256(key.encode()).hexdigest()
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys (double hashing on a salted BLAKE2b)."""
+    
+    def __init__(self, capacity: int, error_rate: float = 1e-6):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+        # A fresh salt per filter, so a false positive is not repeated on the next run
+        self._salt = os.urandom(16)
+    
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16, salt=self._salt).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+    
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class KnownFiles:
+    """
+    ``(contact_id, file_hash)`` pairs already stored.
+    
+    Rows whose file_hash predates ``remote_file_identity`` are also keyed by
+    ``(contact_id, keap_file_id)``, so they are not downloaded again. Rows with
+    an identity match only on it, so a changed size or modified date re-syncs.
+    
+    Preloaded once per run so a file is recognised without a HEAD request or a
+    database lookup. Up to ``set_limit`` rows go into a set; above that a Bloom
+    filter keeps memory flat, at the cost of rarely deferring a new file to a
+    later run.
+    """
+    
+    def __init__(self, expected_rows: int = 0, set_limit: int = 2000000):
+        self.bloom = expected_rows > set_limit
+        # Up to two keys per row
+        self._keys = BloomFilter(2 * expected_rows) if self.bloom else set()
+        self._lock = threading.Lock()
+        self.rows = 0
+    
+    @staticmethod
+    def _pair_keys(contact_id: int, file_hash: str, keap_file_id: Optional[str]) -> List[str]:
+        keys = [f"{contact_id}:{file_hash}"]
+        if keap_file_id is not None:
+            keys.append(f"{contact_id}:id:{keap_file_id}")
+        return keys
+    
+    def add(self, contact_id: int, file_hash: str, keap_file_id: str = None) -> None:
+        if file_hash.startswith(IDENTITY_PREFIX):
+            keap_file_id = None
+        with self._lock:
+            for key in self._pair_keys(contact_id, file_hash, keap_file_id):
+                self._keys.add(key)
+            self.rows += 1
+    
+    def contains(self, contact_id: int, file_hash: str, keap_file_id: str = None) -> bool:
+        """Whether the file is stored, by identity or (for rows from before it) by Keap id."""
+        return any(key in self._keys for key in self._pair_keys(contact_id, file_hash, keap_file_id))
+
+class HostLimiter:
+    """Bounds concurrent requests per host (the API and file hosts are limited separately)."""
+    
+    def __init__(self, per_host: int):
+        self.per_host = max(per_host, 1)
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+    
+    @contextmanager
+    def slot(self, url: str):
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with semaphore:
+            yield
+
+class TransferStats:
+    """Thread-safe file sync counters with aggregate files/s and MB/s."""
+    
+    def __init__(self, report_interval: float = 10.0):
+        self.started = time.monotonic()
+        self.report_interval = report_interval
+        self._last_report = self.started
+        self._lock = threading.Lock()
+        self.contacts = 0
+        self.files_found = 0
+        self.files_stored = 0
+        self.files_skipped = 0
+        self.files_deduplicated = 0
+        self.bytes_downloaded = 0
+        self.errors = 0
+    
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            return {
+                "contacts_processed": self.contacts,
+                "total_files_found": self.files_found,
+                "total_files_downloaded": self.files_stored,
+                "total_files_skipped": self.files_skipped,
+                "total_files_deduplicated": self.files_deduplicated,
+                "bytes_downloaded": self.bytes_downloaded,
+                "errors": self.errors,
+                "elapsed_seconds": round(elapsed, 1),
+                "files_per_second": round(self.files_stored / elapsed, 2),
+                "mb_per_second": round(self.bytes_downloaded / (1024 * 1024) / elapsed, 2),
+            }
+    
+    def maybe_report(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_report < self.report_interval:
+                return
+            self._last_report = now
+        stats = self.snapshot()
+        print(f"  {stats['contacts_processed']} contacts, {stats['total_files_downloaded']} files, "
+              f"{stats['bytes_downloaded'] / (1024 * 1024):.1f} MB "
+              f"({stats['files_per_second']} files/s, {stats['mb_per_second']} MB/s)")
+
+def upsert_contact_files(cur, rows: List[tuple], content_hash: bool = False, fetch: bool = False,
+                         compression: bool = False):
+    """
+    Multi-row upsert into keap.contact_files in one statement.
+    
+    Rows follow CONTACT_FILE_COLUMNS, plus content_hash and then
+    stored_size, compression when those flags are set; keys must be unique
+    within ``rows``, since ON CONFLICT cannot update a row twice.
+    """
+    extra = (('content_hash',) if content_hash else ()) + (('stored_size', 'compression') if compression else ())
+    columns = CONTACT_FILE_COLUMNS + extra
+    updates = ('file_name', 'file_path', 'file_size', 'mime_type') + extra
+    return psycopg2.extras.execute_values(cur, f"""
+        INSERT INTO keap.contact_files ({', '.join(columns)})
+        VALUES %s
+        ON CONFLICT (contact_id, file_hash) DO UPDATE SET
+            {', '.join(f'{column} = EXCLUDED.{column}' for column in updates)},
+            updated_at = now()
+        {'RETURNING id' if fetch else ''}
+    """, rows, page_size=len(rows), fetch=fetch)
+
+def insert_download_log(cur, rows: List[tuple]) -> None:
+    """Multi-row insert into keap.file_download_log (rows follow DOWNLOAD_LOG_COLUMNS)."""
+    psycopg2.extras.execute_values(cur, f"""
+        INSERT INTO keap.file_download_log ({', '.join(DOWNLOAD_LOG_COLUMNS)})
+        VALUES %s
+    """, rows, page_size=len(rows))
+
+class MetadataWriter:
+    """
+    Buffers contact_files and file_download_log rows and writes them in batches.
+    
+    Worker threads share one writer and one connection; once ``batch_size``
+    rows are pending, both tables are written with one multi-row statement
+    each, in a single transaction. Rows for the same (contact_id, file_hash)
+    within a batch collapse to the last one.
+    """
+    
+    def __init__(self, connect, batch_size: int = 500, content_hash: bool = True,
+                 compression: bool = False):
+        self._connect = connect
+        self.batch_size = batch_size
+        self.content_hash = content_hash
+        self.compression = compression
+        self._lock = threading.Lock()
+        self._rows: Dict[Tuple[int, str], tuple] = {}
+        self._logs: List[tuple] = []
+        self._conn = None
+        self.rows_written = 0
+        self.log_rows_written = 0
+    
+    def add(self, contact_id: int, file_name: str, file_path: str, file_size: int,
+            mime_type: str, file_hash: str, keap_file_id: str = None,
+            content_hash: str = None, stored_size: int = None, compression: str = None) -> None:
+        row = (contact_id, file_name, file_path, file_size, mime_type, file_hash, keap_file_id)
+        if self.content_hash:
+            row += (content_hash,)
+        if self.compression:
+            row += (stored_size, compression)
+        with self._lock:
+            self._rows[(contact_id, file_hash)] = row
+            self._maybe_flush_locked()
+    
+    def add_log(self, contact_id: int, operation: str, files_found: int = 0, files_downloaded: int = 0,
+                files_skipped: int = 0, total_size_bytes: int = 0, duration_ms: int = None,
+                error_message: str = None) -> None:
+        with self._lock:
+            self._logs.append((contact_id, operation, files_found, files_downloaded, files_skipped,
+                               total_size_bytes, duration_ms, error_message))
+            self._maybe_flush_locked()
+    
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+    
+    def _maybe_flush_locked(self) -> None:
+        if len(self._rows) + len(self._logs) >= self.batch_size:
+            self._flush_locked()
+    
+    def _flush_locked(self) -> None:
+        if not self._rows and not self._logs:
+            return
+        rows, logs = list(self._rows.values()), self._logs[:]
+        if self._conn is None:
+            self._conn = self._connect()
+        try:
+            with self._conn.cursor() as cur:
+                if rows:
+                    upsert_contact_files(cur, rows, self.content_hash, compression=self.compression)
+                if logs:
+                    insert_download_log(cur, logs)
+            self._conn.commit()
+        except Exception:
+            self._conn.rollback()
+            raise
+        self.rows_written += len(rows)
+        self.log_rows_written += len(logs)
+        self._rows.clear()
+        self._logs.clear()
+    
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
 class FileManager:
     """Manages contact file downloads and storage."""
     
@@ -26,10 +347,90 @@ class FileManager:
         self.storage_dir.mkdir(exist_ok=True)
         self.client = KeapClient(cfg)
         self.retry_handler = KeapRetryHandler(cfg)
+        self.host_limiter = HostLimiter(cfg.file_sync_per_host)
+        if cfg.file_compression not in FILE_COMPRESSIONS:
+            raise ValueError(f"Unsupported FILE_COMPRESSION: {cfg.file_compression}")
+        if cfg.file_compression == 'zstd':
+            _zstandard()
+        # Let every worker keep its own pooled connection to the API host
+        self.client.session.mount('https://', HTTPAdapter(pool_maxsize=max(cfg.file_sync_workers, 10)))
+        self._local = threading.local()
         
         # Create subdirectories
         (self.storage_dir / "contacts").mkdir(exist_ok=True)
+        (self.storage_dir / "objects").mkdir(exist_ok=True)
         (self.storage_dir / "temp").mkdir(exist_ok=True)
+        self._columns: Dict[Tuple[str, str], bool] = {}
+    
+    def _column_exists(self, table: str, column: str) -> bool:
+        """Whether ``keap.<table>.<column>`` exists, i.e. an optional migration is applied."""
+        key = (table, column)
+        if key not in self._columns:
+            conn = self.get_connection()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_schema = 'keap' AND table_name = %s AND column_name = %s
+                    """, key)
+                    self._columns[key] = cur.fetchone() is not None
+            finally:
+                conn.close()
+        return self._columns[key]
+    
+    @property
+    def content_hash_supported(self) -> bool:
+        """Whether keap.contact_files has content_hash (sql/add_file_objects.sql applied)."""
+        return self._column_exists('contact_files', 'content_hash')
+    
+    @property
+    def resume_tracking_supported(self) -> bool:
+        """Whether file_download_log tracks partials (sql/add_download_resume.sql applied)."""
+        return self._column_exists('file_download_log', 'temp_path')
+    
+    @property
+    def incremental_sync_supported(self) -> bool:
+        """Whether file sync state and flags exist (sql/add_file_sync_state.sql applied)."""
+        return self._column_exists('file_sync_pending', 'contact_id')
+    
+    @property
+    def compression_supported(self) -> bool:
+        """Whether keap.contact_files records stored sizes (sql/add_file_compression.sql applied)."""
+        return self._column_exists('contact_files', 'stored_size')
+    
+    def object_path(self, content_hash: str, compressed: bool = False) -> Path:
+        """Content-addressed location of a stored file: ``objects/ab/cd/abcd...[.zst]``."""
+        name = f"{content_hash}.zst" if compressed else content_hash
+        return self.storage_dir / "objects" / content_hash[:2] / content_hash[2:4] / name
+    
+    def stored_object(self, content_hash: str) -> Optional[Path]:
+        """The object stored for a content hash, compressed or not, if any."""
+        for compressed in (True, False):
+            path = self.object_path(content_hash, compressed)
+            if path.exists():
+                return path
+        return None
+    
+    def open_contact_file(self, file_id: int) -> BinaryIO:
+        """Open a keap.contact_files row's file for streaming reads, decompressed on the fly."""
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT file_path FROM keap.contact_files WHERE id = %s", (file_id,))
+                row = cur.fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            raise ValueError(f"Unknown contact file: {file_id}")
+        return open_stored_file(row[0])
+    
+    @property
+    def download_session(self) -> requests.Session:
+        """Per-thread session for file hosts, so downloads reuse connections."""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
     
     def get_connection(self):
         """Get database connection."""
@@ -39,54 +440,233 @@ class FileManager:
         )
     
     def get_contact_files(self, contact_id: int) -> List[Dict[str, Any]]:
-        """Get file list for a contact from Keap API."""
-        try:
+        """
+        Get file list for a contact from Keap API.
+        
+        Errors (after the client's retries) are raised rather than read as no
+        files, so a run flags the contact again instead of passing it.
+        """
+        with self.host_limiter.slot(self.client.base):
             response = self.client.request('GET', f'/crm/rest/v1/contacts/{contact_id}/files')
-            return response.json().get('files', [])
+        return response.json().get('files', [])
+    
+    def download_file(self, file_url: str, contact_id: int, file_name: str,
+                      keap_file_id: str = None) -> Optional[Dict[str, Any]]:
+        """
+        Download a file into content-addressed storage and link it under the contact.
+        
+        Returns ``{path, content_hash, size, stored_size, compression,
+        mime_type, deduplicated}`` or None on error; ``path`` is the
+        per-contact hardlink, or the object itself where hardlinks are not
+        supported. With FILE_COMPRESSION=zstd, new objects of a compressible
+        MIME type are stored zstd-compressed (``.zst``); read them with
+        ``open_stored_file``.
+        """
+        try:
+            with self.host_limiter.slot(file_url):
+                content_hash, size, temp_path = self._download_to_temp(file_url, contact_id, keap_file_id)
+            mime_type, _ = mimetypes.guess_type(file_name)
+            compressed = False
+            if (self.cfg.file_compression == 'zstd' and is_compressible(mime_type)
+                    and self.stored_object(content_hash) is None):
+                temp_path, compressed = self._compress_temp(temp_path, size)
+            deduplicated = self._store_object(temp_path, content_hash, compressed)
+            path = self._link_contact_file(content_hash, contact_id, file_name)
+            stored = self.stored_object(content_hash)
+            return {"path": str(path), "content_hash": content_hash, "size": size,
+                    "stored_size": stored.stat().st_size,
+                    "compression": 'zstd' if stored.suffix == '.zst' else None,
+                    "mime_type": mime_type, "deduplicated": deduplicated}
         except Exception as e:
-            print(f"Error fetching files for contact {contact_id}: {e}")
-            return []
+            print(f"Error downloading file {file_name}: {e}")
+            return None
+    
+    def _temp_path(self, file_url: str, contact_id: int, keap_file_id: str = None) -> Path:
+        """Stable staging file for a download, so a later run finds its partial."""
+        key = f"{contact_id}:{keap_file_id or file_url}"
+        return self.storage_dir / "temp" / f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.part"
     
-    def download_file(self, file_url: str, contact_id: int, file_name: str) -> Optional[str]:
-        """Download a file and store it locally."""
+    def _download_to_temp(self, file_url: str, contact_id: int,
+                          keap_file_id: str = None) -> Tuple[str, int, Path]:
+        """
+        Stream a download into temp/, hashing each chunk as it is written.
+        
+        A staging file left by an interrupted run is resumed with a Range
+        request, guarded by If-Range with the recorded ETag/Last-Modified; a
+        server that answers 200 instead restarts it from zero. Without a
+        recorded validator (or with resume tracking not installed) the file
+        could have changed, so the download restarts from zero. The size is
+        verified against Content-Length/Content-Range. On failure the staging
+        file is kept and recorded as a partial in file_download_log.
+        """
+        temp_path = self._temp_path(file_url, contact_id, keap_file_id)
+        offset = temp_path.stat().st_size if temp_path.exists() else 0
+        partial = self._get_partial(temp_path) if offset else None
+        validator = partial['validator'] if partial else None
+        if not validator:
+            offset = 0
+        # Ranges count encoded bytes, so ask for the file as-is
+        headers = {'Accept-Encoding': 'identity'}
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+            headers['If-Range'] = validator
+        
+        digest = hashlib.sha256()
+        size = 0
         try:
-            # Get file content
-            response = requests.get(file_url, stream=True, timeout=30)
-            response.raise_for_status()
-            
-            # Create contact-specific directory
-            contact_dir = self.storage_dir / "contacts" / str(contact_id)
-            contact_dir.mkdir(exist_ok=True)
-            
-            # Generate safe filename
-            safe_filename = self._sanitize_filename(file_name)
-            file_path = contact_dir / safe_filename
-            
-            # Handle filename conflicts
-            counter = 1
-            original_path = file_path
-            while file_path.exists():
-                name_parts = original_path.stem, counter, original_path.suffix
-                file_path = original_path.parent / f"{name_parts[0]}_{name_parts[1]}{name_parts[2]}"
-                counter += 1
-            
-            # Download and save file
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            # Calculate file hash
-            file_hash = self._calculate_file_hash(file_path)
-            
-            # Get file metadata
-            file_size = file_path.stat().st_size
-            mime_type, _ = mimetypes.guess_type(str(file_path))
-            
-            return str(file_path)
+            with self.download_session.get(file_url, stream=True, timeout=30, headers=headers) as response:
+                if response.status_code == 416 and offset:
+                    # Nothing past our offset: either already complete or a stale partial
+                    if _content_range_total(response) == offset:
+                        return self._calculate_file_hash(temp_path), offset, temp_path
+                    temp_path.unlink()
+                    return self._download_to_temp(file_url, contact_id, keap_file_id)
+                response.raise_for_status()
+                if response.status_code == 206 and _content_range_start(response) != offset:
+                    # Not the range we asked for; splicing it would corrupt the file
+                    temp_path.unlink()
+                    return self._download_to_temp(file_url, contact_id, keap_file_id)
+                validator = response.headers.get('ETag') or response.headers.get('Last-Modified') or validator
+                
+                if response.status_code == 206:
+                    mode, expected = 'ab', _content_range_total(response)
+                    digest = self._hash_file(temp_path)
+                    size = offset
+                else:
+                    mode, expected = 'wb', response.headers.get('Content-Length')
+                    expected = int(expected) if expected else None
+                
+                with open(temp_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        digest.update(chunk)
+                        f.write(chunk)
+                        size += len(chunk)
             
+            if expected is not None and size != expected:
+                raise IOError(f"incomplete download: {size} of {expected} bytes")
         except Exception as e:
-            print(f"Error downloading file {file_name}: {e}")
+            self._record_partial(contact_id, file_url, temp_path, validator, str(e))
+            raise
+        
+        if partial:
+            self._complete_partial(temp_path, size)
+        return digest.hexdigest(), size, temp_path
+    
+    def _get_partial(self, temp_path: Path) -> Optional[Dict[str, Any]]:
+        """Tracked partial for a staging file, if any."""
+        if not self.resume_tracking_supported:
             return None
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT bytes_received, validator FROM keap.file_download_log
+                    WHERE temp_path = %s AND operation = 'partial'
+                """, (str(temp_path),))
+                row = cur.fetchone()
+                return {"bytes_received": row[0], "validator": row[1]} if row else None
+        finally:
+            conn.close()
+    
+    def _record_partial(self, contact_id: int, file_url: str, temp_path: Path,
+                        validator: Optional[str], error: str) -> None:
+        """Remember an interrupted download so the next run resumes it."""
+        if not temp_path.exists() or not self.resume_tracking_supported:
+            return
+        try:
+            conn = self.get_connection()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        INSERT INTO keap.file_download_log
+                        (contact_id, operation, file_url, temp_path, bytes_received, validator, error_message)
+                        VALUES (%s, 'partial', %s, %s, %s, %s, %s)
+                        ON CONFLICT (temp_path) WHERE operation = 'partial' DO UPDATE SET
+                            file_url = EXCLUDED.file_url,
+                            bytes_received = EXCLUDED.bytes_received,
+                            validator = EXCLUDED.validator,
+                            error_message = EXCLUDED.error_message,
+                            updated_at = now()
+                    """, (contact_id, file_url, str(temp_path), temp_path.stat().st_size, validator, error))
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Warning: Failed to record partial download {temp_path.name}: {e}")
+    
+    def _complete_partial(self, temp_path: Path, size: int) -> None:
+        """Close the partial record of a resumed download."""
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE keap.file_download_log
+                    SET operation = 'download', files_downloaded = 1, bytes_received = %s,
+                        total_size_bytes = %s, error_message = NULL, updated_at = now()
+                    WHERE temp_path = %s AND operation = 'partial'
+                """, (size, size, str(temp_path)))
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def _compress_temp(self, temp_path: Path, size: int) -> Tuple[Path, bool]:
+        """
+        zstd-compress a finished download next to itself.
+        
+        Returns the compressed file and True, or the original and False when
+        compression saves less than MIN_COMPRESSION_SAVING.
+        """
+        compressed_path = temp_path.with_name(temp_path.name + '.zst')
+        compressor = _zstandard().ZstdCompressor(level=self.cfg.file_compression_level)
+        with open(temp_path, 'rb') as source, open(compressed_path, 'wb') as target:
+            compressor.copy_stream(source, target, size=size, read_size=DOWNLOAD_CHUNK_SIZE)
+        if compressed_path.stat().st_size > size * (1 - MIN_COMPRESSION_SAVING):
+            compressed_path.unlink()
+            return temp_path, False
+        temp_path.unlink()
+        return compressed_path, True
+    
+    def _store_object(self, temp_path: Path, content_hash: str, compressed: bool = False) -> bool:
+        """Move a download into objects/; returns True if the content was already stored."""
+        if self.stored_object(content_hash) is not None:
+            temp_path.unlink()
+            return True
+        object_path = self.object_path(content_hash, compressed)
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_path, object_path)
+        return False
+    
+    def _link_contact_file(self, content_hash: str, contact_id: int, file_name: str) -> Path:
+        """
+        Hardlink an object as ``contacts/<id>/<name>``, falling back to the object path.
+        
+        Links to compressed objects get a ``.zst`` suffix, so the name says what is on disk.
+        """
+        object_path = self.stored_object(content_hash)
+        contact_dir = self.storage_dir / "contacts" / str(contact_id)
+        contact_dir.mkdir(exist_ok=True)
+        
+        # Generate safe filename
+        file_name = self._sanitize_filename(file_name)
+        if object_path.suffix == '.zst':
+            file_name += '.zst'
+        original_path = contact_dir / file_name
+        file_path = original_path
+        
+        # Handle filename conflicts; an existing link to the same object is reused
+        counter = 1
+        while file_path.exists():
+            if os.path.samefile(file_path, object_path):
+                return file_path
+            file_path = original_path.parent / f"{original_path.stem}_{counter}{original_path.suffix}"
+            counter += 1
+        
+        try:
+            os.link(object_path, file_path)
+        except OSError:
+            # No hardlinks on this filesystem: the DB row references the object instead
+            return object_path
+        return file_path
     
     def _sanitize_filename(self, filename: str) -> str:
         """Sanitize filename for safe storage."""
@@ -102,54 +682,94 @@ class FileManager:
         
         return filename
     
-    def _calculate_file_hash(self, file_path: Path) -> str:
-        """Calculate SHA256 hash of file."""
+    def _hash_file(self, file_path: Path):
+        """SHA256 hash object fed with the file's contents (to continue a resumed download)."""
         hash_sha256 = hashlib.sha256()
         with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
+            for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
                 hash_sha256.update(chunk)
-        return hash_sha256.hexdigest()
+        return hash_sha256
+    
+    def _calculate_file_hash(self, file_path: Path) -> str:
+        """Calculate SHA256 hash of file."""
+        return self._hash_file(file_path).hexdigest()
     
     def store_file_metadata(self, contact_id: int, file_name: str, file_path: str, 
                           file_size: int, mime_type: str, file_hash: str,
-                          keap_file_id: str = None) -> int:
-        """Store file metadata in database."""
+                          keap_file_id: str = None, content_hash: str = None,
+                          stored_size: int = None, compression: str = None) -> int:
+        """
+        Store one file's metadata and return its id.
+        
+        ``content_hash`` needs add_file_objects.sql, ``stored_size`` and
+        ``compression`` add_file_compression.sql. Syncs buffer rows in a
+        MetadataWriter instead; this is for single ad hoc rows.
+        """
+        row = (contact_id, file_name, file_path, file_size, mime_type, file_hash, keap_file_id)
+        if content_hash is not None:
+            row += (content_hash,)
+        if stored_size is not None:
+            row += (stored_size, compression)
         conn = self.get_connection()
         try:
             with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO keap.contact_files 
-                    (contact_id, file_name, file_path, file_size, mime_type, file_hash, keap_file_id, created_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (contact_id, file_hash) DO UPDATE SET
-                        file_name = EXCLUDED.file_name,
-                        file_path = EXCLUDED.file_path,
-                        file_size = EXCLUDED.file_size,
-                        mime_type = EXCLUDED.mime_type,
-                        updated_at = %s
-                    RETURNING id
-                """, (contact_id, file_name, file_path, file_size, mime_type, file_hash, 
-                     keap_file_id, datetime.now(), datetime.now()))
-                
-                file_id = cur.fetchone()[0]
-                conn.commit()
-                return file_id
+                file_id = upsert_contact_files(cur, [row], content_hash is not None, fetch=True,
+                                               compression=stored_size is not None)[0][0]
+            conn.commit()
+            return file_id
         finally:
             conn.close()
     
-    def sync_contact_files(self, contact_id: int, download_files: bool = False) -> Dict[str, Any]:
-        """Sync files for a specific contact."""
-        print(f"Syncing files for contact {contact_id}...")
+    def sync_contact_files(self, contact_id: int, download_files: bool = False,
+                           writer: Optional[MetadataWriter] = None,
+                           stats: Optional[TransferStats] = None,
+                           known: Optional[KnownFiles] = None) -> Dict[str, Any]:
+        """
+        Sync files for a specific contact.
+        
+        Metadata is buffered in ``writer`` for batched upserts (a writer of
+        its own, flushed on return, if none is given; that also logs the
+        contact's timing); ``stats`` accumulates run-wide throughput. Files are
+        identified from the listing metadata and checked against ``known``
+        (loaded for this contact if not given), so an unchanged contact costs
+        just the listing call.
+        """
+        verbose = stats is None
+        if verbose:
+            print(f"Syncing files for contact {contact_id}...")
+        
+        if writer is None:
+            # On its own, a contact's rows and its timing go out in one batch on close
+            started = time.monotonic()
+            writer = MetadataWriter(self.get_connection, self.cfg.file_metadata_batch_size,
+                                    content_hash=self.content_hash_supported,
+                                    compression=self.compression_supported)
+            try:
+                result = self.sync_contact_files(contact_id, download_files, writer, stats, known)
+                writer.add_log(contact_id, 'download' if download_files else 'metadata_only',
+                               result['files_found'], result['files_downloaded'], result['files_skipped'],
+                               result['bytes_downloaded'], int((time.monotonic() - started) * 1000))
+            finally:
+                writer.close()
+            return result
         
         # Get files from Keap API
         files = self.get_contact_files(contact_id)
+        if files and known is None:
+            known = self.load_known_files(contact_id)
         
         if not files:
-            print(f"No files found for contact {contact_id}")
-            return {"contact_id": contact_id, "files_found": 0, "files_downloaded": 0, "files_skipped": 0}
+            if verbose:
+                print(f"No files found for contact {contact_id}")
+            return {"contact_id": contact_id, "files_found": 0, "files_downloaded": 0, "files_skipped": 0,
+                    "files_failed": 0, "bytes_downloaded": 0}
         
+        store = writer.add
         files_downloaded = 0
         files_skipped = 0
+        files_failed = 0
+        files_deduplicated = 0
+        bytes_downloaded = 0
         
         for file_info in files:
             file_name = file_info.get('file_name', 'unknown')
@@ -162,100 +782,293 @@ class FileManager:
                 continue
             
             # Check if file already exists
-            file_hash = self._calculate_remote_file_hash(file_url)
-            if self._file_exists(contact_id, file_hash):
-                print(f"File {file_name} already exists, skipping")
+            file_hash = remote_file_identity(file_info)
+            if known.contains(contact_id, file_hash, keap_file_id):
+                if verbose:
+                    print(f"File {file_name} already exists, skipping")
                 files_skipped += 1
                 continue
             
             if download_files:
                 # Download file
-                file_path = self.download_file(file_url, contact_id, file_name)
-                if file_path:
+                download = self.download_file(file_url, contact_id, file_name, keap_file_id)
+                if download:
                     # Store metadata
-                    file_size = Path(file_path).stat().st_size
-                    mime_type, _ = mimetypes.guess_type(file_path)
-                    self.store_file_metadata(contact_id, file_name, file_path, 
-                                           file_size, mime_type, file_hash, keap_file_id)
+                    content = {'content_hash': download['content_hash']} if self.content_hash_supported else {}
+                    if self.compression_supported:
+                        content.update(stored_size=download['stored_size'], compression=download['compression'])
+                    store(contact_id, file_name, download['path'], download['size'], download['mime_type'],
+                          file_hash, keap_file_id, **content)
+                    known.add(contact_id, file_hash, keap_file_id)
                     files_downloaded += 1
-                    print(f"Downloaded: {file_name}")
+                    bytes_downloaded += download['size']
+                    if download['deduplicated']:
+                        files_deduplicated += 1
+                    if verbose:
+                        print(f"Downloaded: {file_name}"
+                              f"{' (already stored, linked)' if download['deduplicated'] else ''}")
                 else:
                     files_skipped += 1
+                    files_failed += 1
             else:
                 # Just store metadata without downloading
-                self.store_file_metadata(contact_id, file_name, file_url, 
-                                       0, 'application/octet-stream', file_hash, keap_file_id)
+                store(contact_id, file_name, file_url, 0, 'application/octet-stream', file_hash, keap_file_id)
+                known.add(contact_id, file_hash, keap_file_id)
                 files_downloaded += 1
-                print(f"Metadata stored: {file_name}")
+                if verbose:
+                    print(f"Metadata stored: {file_name}")
+        
+        if stats is not None:
+            stats.add(files_found=len(files), files_stored=files_downloaded,
+                      files_skipped=files_skipped, files_deduplicated=files_deduplicated,
+                      bytes_downloaded=bytes_downloaded)
         
         return {
             "contact_id": contact_id,
             "files_found": len(files),
             "files_downloaded": files_downloaded,
-            "files_skipped": files_skipped
+            "files_skipped": files_skipped,
+            "files_deduplicated": files_deduplicated,
+            "files_failed": files_failed,
+            "bytes_downloaded": bytes_downloaded
         }
     
-    def _calculate_remote_file_hash(self, file_url: str) -> str:
-        """Calculate hash of remote file without downloading."""
-        try:
-            response = requests.head(file_url, timeout=10)
-            # Use URL + last_modified as hash
-            last_modified = response.headers.get('last-modified', '')
-            content_length = response.headers.get('content-length', '')
-            hash_input = f"{file_url}_{last_modified}_{content_length}"
-            return hashlib.sha256(hash_input.encode()).hexdigest()
-        except:
-            # Fallback to URL hash
-            return hashlib.sha256(file_url.encode()).hexdigest()
-    
-    def _file_exists(self, contact_id: int, file_hash: str) -> bool:
-        """Check if file already exists in database."""
+    def load_known_files(self, contact_id: int = None) -> KnownFiles:
+        """
+        Preload the stored ``(contact_id, file_hash/keap_file_id)`` pairs.
+        
+        One streamed query per run (or per contact when syncing just one);
+        above ``FILE_KNOWN_SET_LIMIT`` rows they go into a Bloom filter.
+        """
+        where, params = ("WHERE contact_id = %s", (contact_id,)) if contact_id is not None else ("", ())
         conn = self.get_connection()
         try:
             with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT id FROM keap.contact_files 
-                    WHERE contact_id = %s AND file_hash = %s
-                """, (contact_id, file_hash))
-                return cur.fetchone() is not None
+                cur.execute(f"SELECT count(*) FROM keap.contact_files {where}", params)
+                known = KnownFiles(cur.fetchone()[0], self.cfg.file_known_set_limit)
+            with conn.cursor(name="keap_known_files") as cur:
+                cur.itersize = 10000
+                cur.execute(f"SELECT contact_id, file_hash, keap_file_id FROM keap.contact_files {where}", params)
+                for row_contact_id, file_hash, keap_file_id in cur:
+                    known.add(row_contact_id, file_hash, keap_file_id)
         finally:
             conn.close()
+        return known
     
-    def sync_all_contact_files(self, download_files: bool = False, limit: int = None) -> Dict[str, Any]:
-        """Sync files for all contacts."""
+    def sync_all_contact_files(self, download_files: bool = False, limit: int = None,
+                               workers: int = None, full: bool = False) -> Dict[str, Any]:
+        """
+        Sync files for changed contacts on a thread pool.
+        
+        Only contacts updated since the last completed run, or flagged by the
+        contact sync, are visited (all contacts with ``full`` or before
+        sql/add_file_sync_state.sql). Contacts go in id order and progress is
+        checkpointed by contact id, so an interrupted or ``limit``-ed run
+        continues where it stopped. Each contact's timing and counts are
+        logged to keap.file_download_log.
+        
+        API calls share the client's rate limiter, requests are bounded per
+        host, downloads stream to disk and metadata is upserted in batches.
+        Stored files are preloaded once, so dedup checks need no requests.
+        """
+        workers = workers or self.cfg.file_sync_workers
+        incremental = self.incremental_sync_supported
         conn = self.get_connection()
+        conn.autocommit = True
         try:
-            with conn.cursor() as cur:
-                query = "SELECT id FROM keap.contacts"
-                if limit:
-                    query += f" LIMIT {limit}"
-                
-                cur.execute(query)
-                contact_ids = [row[0] for row in cur.fetchall()]
+            run = self._start_file_sync_run(conn, full) if incremental else None
+            return self._sync_contacts(conn, run, download_files, limit, workers)
         finally:
             conn.close()
+    
+    def _sync_contacts(self, conn, run: Optional[Dict[str, Any]], download_files: bool,
+                       limit: Optional[int], workers: int) -> Dict[str, Any]:
+        """Run the pool over the selected contacts, checkpointing on ``conn``."""
+        operation = 'download' if download_files else 'metadata_only'
+        known = self.load_known_files()
+        print(f"Known files: {known.rows} ({'Bloom filter' if known.bloom else 'in memory'})")
+        stats = TransferStats()
+        writer = MetadataWriter(self.get_connection, self.cfg.file_metadata_batch_size,
+                                content_hash=self.content_hash_supported,
+                                compression=self.compression_supported)
+        failed_lock = threading.Lock()
+        failed: List[int] = []
         
-        total_files_found = 0
-        total_files_downloaded = 0
-        total_files_skipped = 0
-        contacts_processed = 0
-        
-        for contact_id in contact_ids:
-            result = self.sync_contact_files(contact_id, download_files)
-            total_files_found += result['files_found']
-            total_files_downloaded += result['files_downloaded']
-            total_files_skipped += result['files_skipped']
-            contacts_processed += 1
-            
-            if contacts_processed % 100 == 0:
-                print(f"Processed {contacts_processed} contacts...")
+        def process(contact_id):
+            started = time.monotonic()
+            result, error = {}, None
+            try:
+                result = self.sync_contact_files(contact_id, download_files, writer=writer, stats=stats, known=known)
+            except Exception as e:
+                error = str(e)
+                stats.add(errors=1)
+                print(f"Error syncing files for contact {contact_id}: {e}")
+            if error is None and result.get('files_failed'):
+                error = f"{result['files_failed']} file(s) failed to download"
+            if error is not None:
+                with failed_lock:
+                    failed.append(contact_id)
+            writer.add_log(contact_id, operation, result.get('files_found', 0),
+                           result.get('files_downloaded', 0), result.get('files_skipped', 0),
+                           result.get('bytes_downloaded', 0), int((time.monotonic() - started) * 1000), error)
+            stats.add(contacts=1)
+            stats.maybe_report()
+            return contact_id
         
-        return {
-            "contacts_processed": contacts_processed,
-            "total_files_found": total_files_found,
-            "total_files_downloaded": total_files_downloaded,
-            "total_files_skipped": total_files_skipped
-        }
+        def checkpoint(contact_id):
+            # Metadata and timings first, so the checkpoint never runs ahead of what is stored
+            writer.flush()
+            with failed_lock:
+                retry = failed[:]
+                failed.clear()
+            if run is not None:
+                # Contacts that failed are flagged again rather than passed by the watermark
+                self._checkpoint_file_sync(conn, run, contact_id, retry)
+        
+        after = run['after'] if run else 0
+        selected = 0
+        submitted = deque()
+        done = set()
+        done_through = after
+        since_checkpoint = 0
+        exhausted = True
+        
+        def advance(finished):
+            # The checkpoint is the highest id with every contact before it finished
+            nonlocal done_through, since_checkpoint
+            done.update(future.result() for future in finished)
+            while submitted and submitted[0] in done:
+                done_through = submitted.popleft()
+                done.discard(done_through)
+                since_checkpoint += 1
+            if since_checkpoint >= self.cfg.file_sync_checkpoint_every:
+                checkpoint(done_through)
+                since_checkpoint = 0
+        
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                pending = set()
+                for contact_id in self._changed_contact_ids(conn, run, after):
+                    if limit is not None and selected >= limit:
+                        exhausted = False
+                        break
+                    selected += 1
+                    if len(pending) >= workers * 4:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        advance(finished)
+                    submitted.append(contact_id)
+                    pending.add(pool.submit(process, contact_id))
+                advance(wait(pending).done)
+            checkpoint(done_through)
+        finally:
+            writer.close()
+        
+        if run is not None:
+            if exhausted:
+                self._finish_file_sync_run(conn, run)
+            else:
+                print(f"File sync stopped after contact {done_through}; the next run continues from there")
+        
+        result = stats.snapshot()
+        result['checkpoint'] = done_through
+        result['complete'] = exhausted
+        print(f"File sync: {result['contacts_processed']} contacts, {result['total_files_downloaded']} files, "
+              f"{result['bytes_downloaded'] / (1024 * 1024):.1f} MB in {result['elapsed_seconds']}s "
+              f"({result['files_per_second']} files/s, {result['mb_per_second']} MB/s) "
+              f"with {workers} worker(s)")
+        return result
+    
+    def _start_file_sync_run(self, conn, full: bool = False) -> Dict[str, Any]:
+        """
+        Open (or resume) an incremental run in keap_meta.file_sync_state.
+        
+        A new run fixes ``target_watermark`` at the current max(updated_at),
+        which becomes the watermark once every selected contact is processed;
+        ``full`` clears the watermark so all contacts are selected.
+        """
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT watermark, last_contact_id, status, run_started_at
+                FROM keap_meta.file_sync_state WHERE name = %s
+            """, (FILE_SYNC_SCOPE,))
+            row = cur.fetchone()
+            if row and row[2] == 'running' and not full:
+                print(f"Resuming file sync after contact {row[1] or 0}")
+                return {"watermark": row[0], "after": row[1] or 0, "started_at": row[3]}
+            
+            watermark = row[0] if row and not full else None
+            cur.execute("""
+                INSERT INTO keap_meta.file_sync_state
+                (name, watermark, target_watermark, last_contact_id, status, run_started_at, updated_at)
+                SELECT %s, %s, max(updated_at), 0, 'running', now(), now() FROM keap.contacts
+                ON CONFLICT (name) DO UPDATE SET
+                    watermark = EXCLUDED.watermark,
+                    target_watermark = EXCLUDED.target_watermark,
+                    last_contact_id = 0,
+                    status = 'running',
+                    run_started_at = EXCLUDED.run_started_at,
+                    updated_at = now()
+                RETURNING run_started_at
+            """, (FILE_SYNC_SCOPE, watermark))
+            print(f"File sync: contacts changed since {watermark}" if watermark else "File sync: all contacts")
+            return {"watermark": watermark, "after": 0, "started_at": cur.fetchone()[0]}
+    
+    def _changed_contact_ids(self, conn, run: Optional[Dict[str, Any]], after: int = 0,
+                             page_size: int = 1000):
+        """Contact ids to visit in id order, fetched a page at a time by keyset."""
+        while True:
+            with conn.cursor() as cur:
+                if run is None or run['watermark'] is None:
+                    cur.execute("""
+                        SELECT id FROM keap.contacts WHERE id > %s ORDER BY id LIMIT %s
+                    """, (after, page_size))
+                else:
+                    cur.execute("""
+                        SELECT id FROM (
+                            SELECT id FROM keap.contacts WHERE updated_at > %s
+                            UNION
+                            SELECT contact_id FROM keap.file_sync_pending
+                        ) changed
+                        WHERE id > %s ORDER BY id LIMIT %s
+                    """, (run['watermark'], after, page_size))
+                ids = [row[0] for row in cur.fetchall()]
+            yield from ids
+            if len(ids) < page_size:
+                return
+            after = ids[-1]
+    
+    def _checkpoint_file_sync(self, conn, run: Dict[str, Any], contact_id: int,
+                              failed: List[int] = ()) -> None:
+        """Record progress, clear the flags of contacts done in this run and re-flag ``failed``."""
+        with conn.cursor() as cur:
+            cur.execute("""
+                DELETE FROM keap.file_sync_pending
+                WHERE contact_id <= %s AND flagged_at <= %s
+            """, (contact_id, run['started_at']))
+            if failed:
+                cur.execute("""
+                    INSERT INTO keap.file_sync_pending (contact_id)
+                    SELECT unnest(%s::bigint[])
+                    ON CONFLICT (contact_id) DO UPDATE SET flagged_at = now()
+                """, (list(failed),))
+            cur.execute("""
+                UPDATE keap_meta.file_sync_state
+                SET last_contact_id = %s, updated_at = now()
+                WHERE name = %s
+            """, (contact_id, FILE_SYNC_SCOPE))
+    
+    def _finish_file_sync_run(self, conn, run: Dict[str, Any]) -> None:
+        """Advance the watermark after every selected contact was processed."""
+        with conn.cursor() as cur:
+            cur.execute("""
+                DELETE FROM keap.file_sync_pending WHERE flagged_at <= %s
+            """, (run['started_at'],))
+            cur.execute("""
+                UPDATE keap_meta.file_sync_state
+                SET watermark = coalesce(target_watermark, watermark), last_contact_id = NULL,
+                    status = 'completed', updated_at = now()
+                WHERE name = %s
+            """, (FILE_SYNC_SCOPE,))
     
     def list_contact_files(self, contact_id: int = None) -> List[Dict[str, Any]]:
         """List files for a contact or all contacts."""
@@ -284,14 +1097,170 @@ class FileManager:
         finally:
             conn.close()
     
-    def cleanup_orphaned_files(self) -> int:
-        """Remove files that no longer exist in Keap."""
-        # This would require checking against Keap API
-        # For now, just return 0
-        return 0
+    def iter_file_inventory(self, page_size: int = INVENTORY_PAGE_SIZE):
+        """Yield the Keap file inventory (file box items of all contacts) a page at a time."""
+        offset = 0
+        while True:
+            with self.host_limiter.slot(self.client.base):
+                response = self.client.request('GET', '/crm/rest/v1/files',
+                                               params={'limit': page_size, 'offset': offset})
+            files = response.json().get('files', [])
+            if files:
+                yield files
+            if len(files) < page_size:
+                return
+            offset += page_size
+    
+    def cleanup_orphaned_files(self, delete: bool = False, dry_run: bool = False,
+                               batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        Remove rows and local files of contact files that no longer exist in Keap.
+        
+        The Keap inventory is streamed page by page into a temp table and
+        anti-joined against keap.contact_files on keap_file_id; orphans are
+        read back through a server-side cursor and handled ``batch_size`` at a
+        time, so neither side is held in memory. Files are moved under
+        ``quarantine/<timestamp>/`` next to a manifest.jsonl of their rows,
+        or removed with ``delete``. A stored object goes only once no
+        remaining row references it; ``reclaimed_bytes`` counts those (for a
+        quarantine, once it is emptied). Rows without a keap_file_id are left
+        alone.
+        """
+        mode = 'dry_run' if dry_run else 'delete' if delete else 'quarantine'
+        quarantine = None
+        if mode == 'quarantine':
+            quarantine = self.storage_dir / "quarantine" / datetime.now().strftime('%Y%m%d_%H%M%S')
+        report = {"mode": mode, "inventory_files": 0, "orphaned_rows": 0, "files_removed": 0,
+                  "objects_removed": 0, "reclaimed_bytes": 0,
+                  "quarantine_dir": str(quarantine) if quarantine else None}
+        
+        conn = self.get_connection()
+        try:
+            report["inventory_files"] = self._load_file_inventory(conn)
+            with conn.cursor() as cur:
+                cur.execute("SELECT count(*) FROM keap.contact_files WHERE keap_file_id IS NOT NULL")
+                tracked = cur.fetchone()[0]
+            if not report["inventory_files"] and tracked:
+                raise ValueError(f"Keap returned no files; refusing to treat all {tracked} stored files as orphaned")
+            
+            content_hash = "cf.content_hash" if self.content_hash_supported else "NULL"
+            # WITH HOLD keeps the orphan list across the per-batch commits
+            with conn.cursor(name="keap_orphaned_files", withhold=True) as orphans:
+                orphans.itersize = batch_size
+                orphans.execute(f"""
+                    SELECT cf.id, cf.contact_id, cf.keap_file_id, cf.file_name, cf.file_path,
+                           cf.file_size, cf.file_hash, {content_hash}
+                    FROM keap.contact_files cf
+                    WHERE cf.keap_file_id IS NOT NULL
+                      AND NOT EXISTS (
+                          SELECT 1 FROM keap_file_inventory i WHERE i.keap_file_id = cf.keap_file_id
+                      )
+                    ORDER BY cf.id
+                """)
+                conn.commit()
+                while True:
+                    rows = orphans.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    self._remove_orphans(conn, rows, quarantine, dry_run, report)
+        finally:
+            conn.close()
+        
+        report["reclaimed_mb"] = report["reclaimed_bytes"] / (1024 * 1024)
+        return report
+    
+    def _load_file_inventory(self, conn) -> int:
+        """Stream the Keap inventory into the session temp table keap_file_inventory."""
+        total = 0
+        with conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS keap_file_inventory")
+            cur.execute("CREATE TEMP TABLE keap_file_inventory (keap_file_id text NOT NULL)")
+            for page in self.iter_file_inventory():
+                ids = [(str(f['id']),) for f in page if f.get('id') is not None]
+                if ids:
+                    psycopg2.extras.execute_values(
+                        cur, "INSERT INTO keap_file_inventory (keap_file_id) VALUES %s", ids, page_size=len(ids))
+                    total += len(ids)
+            cur.execute("CREATE INDEX ON keap_file_inventory (keap_file_id)")
+            cur.execute("ANALYZE keap_file_inventory")
+        return total
+    
+    def _remove_orphans(self, conn, rows: List[tuple], quarantine: Optional[Path],
+                        dry_run: bool, report: Dict[str, Any]) -> None:
+        """
+        Retire one batch of orphaned rows: files first, then the rows.
+        
+        If the run stops between the two, the rows are found again next time.
+        """
+        ids = [row[0] for row in rows]
+        hashes = sorted({row[7] for row in rows if row[7]})
+        released = set()
+        if hashes:
+            # Objects no row outside this batch still references
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT h FROM unnest(%s::text[]) h
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM keap.contact_files cf
+                        WHERE cf.content_hash = h AND cf.id <> ALL(%s::bigint[])
+                    )
+                """, (hashes, ids))
+                released = {row[0] for row in cur.fetchall()}
+        
+        if quarantine is not None:
+            quarantine.mkdir(parents=True, exist_ok=True)
+            columns = ("id", "contact_id", "keap_file_id", "file_name", "file_path",
+                       "file_size", "file_hash", "content_hash")
+            with open(quarantine / "manifest.jsonl", "a") as manifest:
+                for row in rows:
+                    manifest.write(json.dumps(dict(zip(columns, row)), default=str) + "\n")
+        
+        storage = self.storage_dir.resolve()
+        for row in rows:
+            path, row_hash = Path(row[4]).resolve(), row[7]
+            # Only files under our storage; objects are handled below by reference
+            if not path.is_file() or not path.is_relative_to(storage):
+                continue
+            if row_hash and path == (self.stored_object(row_hash) or self.object_path(row_hash)).resolve():
+                continue
+            if not row_hash and path.stat().st_nlink == 1:
+                report["reclaimed_bytes"] += path.stat().st_size
+            self._retire_file(path, quarantine, dry_run)
+            report["files_removed"] += 1
+        
+        for content_hash in sorted(released):
+            object_path = self.stored_object(content_hash)
+            if object_path is not None:
+                report["reclaimed_bytes"] += object_path.stat().st_size
+                self._retire_file(object_path, quarantine, dry_run)
+                report["objects_removed"] += 1
+        
+        report["orphaned_rows"] += len(rows)
+        if dry_run:
+            return
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM keap.contact_files WHERE id = ANY(%s::bigint[])", (ids,))
+        conn.commit()
+    
+    def _retire_file(self, path: Path, quarantine: Optional[Path], dry_run: bool) -> None:
+        """Move a stored file into the quarantine (keeping its relative path) or delete it."""
+        if dry_run:
+            return
+        if quarantine is None:
+            path.unlink()
+            return
+        target = quarantine / path.resolve().relative_to(self.storage_dir.resolve())
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, target)
     
     def get_storage_stats(self) -> Dict[str, Any]:
-        """Get storage statistics."""
+        """
+        Get storage statistics.
+        
+        With content hashes, ``stored_size_bytes`` counts each object once and
+        ``dedup_saved_bytes`` is what per-contact copies would have added.
+        With stored sizes, ``disk_size_bytes`` is that after compression.
+        """
         conn = self.get_connection()
         try:
             with conn.cursor() as cur:
@@ -305,12 +1274,75 @@ class FileManager:
                 """)
                 
                 result = cur.fetchone()
-                return {
+                stats = {
                     "total_files": result[0] or 0,
                     "total_size_bytes": result[1] or 0,
                     "total_size_mb": (result[1] or 0) / (1024 * 1024),
                     "contacts_with_files": result[2] or 0,
                     "avg_file_size_bytes": result[3] or 0
                 }
+                
+                if self.content_hash_supported:
+                    # Rows without a content hash (metadata-only, pre-migration) count as their own object
+                    disk = "coalesce(stored_size, file_size)" if self.compression_supported else "file_size"
+                    cur.execute(f"""
+                        SELECT COUNT(*), SUM(size), SUM(disk)
+                        FROM (
+                            SELECT coalesce(content_hash, 'row:' || id) AS object, max(file_size) AS size,
+                                   max({disk}) AS disk
+                            FROM keap.contact_files
+                            GROUP BY 1
+                        ) objects
+                    """)
+                    objects, stored, disk_size = cur.fetchone()
+                    stored = stored or 0
+                    disk_size = disk_size or 0
+                    stats.update({
+                        "unique_objects": objects or 0,
+                        "stored_size_bytes": stored,
+                        "stored_size_mb": stored / (1024 * 1024),
+                        "dedup_saved_bytes": stats["total_size_bytes"] - stored,
+                        "dedup_ratio": round(stats["total_size_bytes"] / stored, 2) if stored else 1.0,
+                        "disk_size_bytes": disk_size,
+                        "disk_size_mb": disk_size / (1024 * 1024),
+                        "compression_saved_bytes": stored - disk_size,
+                    })
+                return stats
+        finally:
+            conn.close()
+    
+    def get_compression_stats(self) -> List[Dict[str, Any]]:
+        """
+        Compression ratio per MIME type over stored objects (each counted once).
+        
+        Objects stored before sql/add_file_compression.sql count as uncompressed.
+        """
+        if not (self.content_hash_supported and self.compression_supported):
+            return []
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT coalesce(mime_type, 'unknown'), COUNT(*),
+                           COUNT(*) FILTER (WHERE compression IS NOT NULL),
+                           SUM(file_size), SUM(coalesce(stored_size, file_size))
+                    FROM (
+                        SELECT DISTINCT ON (content_hash) content_hash, mime_type, file_size,
+                               stored_size, compression
+                        FROM keap.contact_files
+                        WHERE content_hash IS NOT NULL
+                        ORDER BY content_hash, id
+                    ) objects
+                    GROUP BY 1
+                    ORDER BY SUM(file_size) DESC NULLS LAST
+                """)
+                return [{
+                    "mime_type": mime_type,
+                    "objects": objects,
+                    "compressed_objects": compressed,
+                    "original_bytes": original or 0,
+                    "stored_bytes": stored or 0,
+                    "ratio": round(original / stored, 2) if stored else 1.0,
+                } for mime_type, objects, compressed, original, stored in cur.fetchall()]
         finally:
             conn.close()
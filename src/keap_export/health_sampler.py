@@ -0,0 +1,223 @@
+"""
+Background Resource Sampler
+Periodically records process and sync health into keap_meta.system_health.
+"""
+
+from __future__ import annotations
+import gc
+import os
+import threading
+import time
+import psycopg2
+import psycopg2.extras
+from typing import Dict, Any, List, Optional, Tuple
+from .config import Settings
+
+def _read_rss_mb() -> Optional[float]:
+    """Current resident set size in MB (falls back to peak RSS off Linux)."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is KB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if peak > 1 << 30 else peak / 1024
+    except (ImportError, OSError):
+        return None
+
+class HealthSampler(threading.Thread):
+    """
+    Daemon thread that samples resource usage at a fixed interval.
+
+    Each tick collects RSS, CPU time, GC pauses, open DB connections,
+    HTTP pool usage, in-flight pages and throttle headroom, and writes
+    them with a single multi-row insert on a dedicated connection so the
+    sync's own connections and transactions are never touched.
+    """
+
+    def __init__(self, cfg: Settings, run_id: int, interval: float = None):
+        super().__init__(name=f"health-sampler-{run_id}", daemon=True)
+        self.cfg = cfg
+        self.run_id = run_id
+        self.interval = interval if interval is not None else cfg.health_sample_interval
+        self._stop_event = threading.Event()
+        self._conn = None
+        self._sync = None
+
+        # GC pause accounting, updated from gc.callbacks
+        self._gc_started: Optional[float] = None
+        self._gc_pause_total = 0.0
+        self._gc_collections = 0
+
+        # Deltas between samples
+        self._last_cpu = os.times()
+        self._last_wall = time.monotonic()
+        self._last_gc_pause = 0.0
+        self._last_gc_collections = 0
+
+    def attach(self, sync) -> None:
+        """Attach the sync currently running so samples carry its context."""
+        self._sync = sync
+
+    def detach(self, sync=None) -> None:
+        """Detach a sync once it has finished."""
+        if sync is None or self._sync is sync:
+            self._sync = None
+
+    def _gc_callback(self, phase: str, info: Dict[str, Any]) -> None:
+        if phase == 'start':
+            self._gc_started = time.perf_counter()
+        elif phase == 'stop' and self._gc_started is not None:
+            self._gc_pause_total += time.perf_counter() - self._gc_started
+            self._gc_collections += 1
+            self._gc_started = None
+
+    def _get_connection(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(
+                host=self.cfg.db_host, port=self.cfg.db_port,
+                dbname=self.cfg.db_name, user=self.cfg.db_user, password=self.cfg.db_password
+            )
+            self._conn.autocommit = True
+        return self._conn
+
+    def _db_connection_count(self, conn) -> Optional[int]:
+        """Count other open backends for this database user."""
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    '''select count(*) from pg_stat_activity
+                       where datname = current_database() and usename = current_user
+                         and pid <> pg_backend_pid()'''
+                )
+                return cur.fetchone()[0]
+        except psycopg2.Error:
+            return None
+
+    def _http_pool_usage(self) -> Tuple[Optional[int], Optional[int]]:
+        """Return (pools, connections in use) for the attached client's session."""
+        client = getattr(self._sync, 'client', None)
+        session = getattr(client, 'session', None)
+        if session is None:
+            return None, None
+        pools = in_use = 0
+        try:
+            for adapter in session.adapters.values():
+                manager = getattr(adapter, 'poolmanager', None)
+                if manager is None:
+                    continue
+                for key in list(manager.pools.keys()):
+                    pool = manager.pools.get(key)
+                    if pool is None:
+                        continue
+                    pools += 1
+                    # The pool queue holds maxsize slots; checked-out connections leave it
+                    if pool.pool is not None:
+                        in_use += max(pool.pool.maxsize - pool.pool.qsize(), 0)
+        except (AttributeError, RuntimeError):
+            return None, None
+        return pools, in_use
+
+    def collect(self) -> List[Tuple[str, float, str]]:
+        """Collect one sample as (metric_name, value, unit) tuples."""
+        now = time.monotonic()
+        cpu = os.times()
+        elapsed = max(now - self._last_wall, 1e-6)
+        cpu_delta = (cpu.user - self._last_cpu.user) + (cpu.system - self._last_cpu.system)
+        gc_pause = self._gc_pause_total - self._last_gc_pause
+        gc_collections = self._gc_collections - self._last_gc_collections
+        self._last_wall, self._last_cpu = now, cpu
+        self._last_gc_pause, self._last_gc_collections = self._gc_pause_total, self._gc_collections
+
+        metrics = [
+            ('cpu_time', cpu.user + cpu.system, 'seconds'),
+            ('cpu_usage', 100.0 * cpu_delta / elapsed, 'percent'),
+            ('gc_pause', gc_pause * 1000, 'ms'),
+            ('gc_collections', gc_collections, 'count'),
+            ('threads', threading.active_count(), 'count'),
+        ]
+        rss = _read_rss_mb()
+        if rss is not None:
+            metrics.append(('memory_rss', rss, 'MB'))
+
+        pools, in_use = self._http_pool_usage()
+        if pools is not None:
+            metrics.append(('http_pools', pools, 'count'))
+            metrics.append(('http_connections_in_use', in_use, 'count'))
+
+        sync = self._sync
+        if sync is not None:
+            metrics.append(('pages_in_flight', getattr(sync, 'pages_in_flight', 0), 'count'))
+            remaining = getattr(getattr(sync, 'client', None), 'last_throttle_remaining', None)
+            if remaining is not None:
+                metrics.append(('throttle_remaining', remaining, 'requests'))
+        return metrics
+
+    def _tags(self) -> Dict[str, Any]:
+        tags = {'component': 'sync', 'pid': os.getpid()}
+        sync = self._sync
+        if sync is not None:
+            tags['entity'] = getattr(sync, 'entity', None)
+            tags['page'] = getattr(sync, 'current_page', None)
+        return tags
+
+    def sample(self) -> None:
+        """Take one sample and write it to keap_meta.system_health."""
+        metrics = self.collect()
+        tags = psycopg2.extras.Json(self._tags())
+        conn = self._get_connection()
+        db_connections = self._db_connection_count(conn)
+        if db_connections is not None:
+            metrics.append(('db_connections', db_connections, 'count'))
+        with conn.cursor() as cur:
+            psycopg2.extras.execute_values(
+                cur,
+                '''insert into keap_meta.system_health
+                   (run_id, metric_name, metric_value, metric_unit, tags) values %s''',
+                [(self.run_id, name, value, unit, tags) for name, value, unit in metrics]
+            )
+
+    def run(self) -> None:
+        gc.callbacks.append(self._gc_callback)
+        try:
+            while not self._stop_event.wait(self.interval):
+                try:
+                    self.sample()
+                except Exception as e:
+                    print(f"Warning: Health sample failed for run {self.run_id}: {e}")
+                    self._close()
+            # Final sample so short runs are still represented
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Warning: Health sample failed for run {self.run_id}: {e}")
+        finally:
+            if self._gc_callback in gc.callbacks:
+                gc.callbacks.remove(self._gc_callback)
+            self._close()
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except psycopg2.Error:
+                pass
+            self._conn = None
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop sampling and wait for the final sample to be written."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+def start_health_sampler(cfg: Settings, run_id: Optional[int]) -> Optional[HealthSampler]:
+    """Start a sampler for a run, or return None when sampling is disabled."""
+    if run_id is None or cfg.health_sample_interval <= 0:
+        return None
+    sampler = HealthSampler(cfg, run_id)
+    sampler.start()
+    return sampler
@@ -1,172 +1,330 @@
 from __future__ import annotations
+import atexit
+import copy
 import json
 import logging
+import logging.handlers
+import queue
 import sys
+import threading
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from .config import Settings
 
+# Numeric fields summed across a sampling window, per event type
+_AGGREGATE_FIELDS = {
+    'page_fetch': ('items_count', 'duration_ms'),
+    'upsert_batch': ('batch_size', 'duration_ms'),
+}
+
+def parse_sample_rates(spec: str) -> Dict[str, int]:
+    """Parse LOG_SAMPLE, e.g. ``page_fetch=100,upsert_batch=50`` (log 1 in N)."""
+    rates = {}
+    for part in (spec or '').split(','):
+        if '=' not in part:
+            continue
+        event, _, rate = part.partition('=')
+        try:
+            rates[event.strip()] = max(int(rate), 1)
+        except ValueError:
+            continue
+    return rates
+
+class EventSampler:
+    """
+    Emits 1 in N high-frequency events and aggregates the rest.
+
+    Each emitted event carries a ``sampled`` block with the number of events
+    it represents and the summed numeric fields for that window, so totals
+    stay exact while log volume no longer grows with page count.
+    """
+
+    def __init__(self, rates: Dict[str, int]):
+        self.rates = rates
+        self._windows: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def offer(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the event to emit now, or None if it was folded into a window."""
+        name = event.get('event')
+        rate = self.rates.get(name, 1)
+        if rate <= 1:
+            return event
+        key = (name, event.get('entity'))
+        with self._lock:
+            window = self._windows.setdefault(key, {'events': 0, 'totals': {}, 'last': None})
+            window['events'] += 1
+            for field in _AGGREGATE_FIELDS.get(name, ()):
+                value = event.get(field)
+                if isinstance(value, (int, float)):
+                    window['totals'][field] = window['totals'].get(field, 0) + value
+            window['last'] = event
+            if window['events'] < rate:
+                return None
+            del self._windows[key]
+        return self._with_window(event, window, rate)
+
+    def flush(self, entity: Optional[str] = None):
+        """Yield partially filled windows (optionally only for one entity)."""
+        with self._lock:
+            keys = [k for k in self._windows if entity is None or k[1] == entity]
+            windows = [(k, self._windows.pop(k)) for k in keys]
+        for (name, _), window in windows:
+            yield self._with_window(window['last'], window, self.rates.get(name, 1))
+
+    @staticmethod
+    def _with_window(event: Dict[str, Any], window: Dict[str, Any], rate: int) -> Dict[str, Any]:
+        event = dict(event)
+        event['sampled'] = {'rate': rate, 'events': window['events'], **window['totals']}
+        return event
+
+class _EventMessage:
+    """Log record payload that defers JSON serialization to the writer thread."""
+
+    __slots__ = ('data',)
+
+    def __init__(self, data: Dict[str, Any]):
+        self.data = data
+
+    def __str__(self) -> str:
+        return json.dumps(self.data, default=str)
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never formats on the caller's thread and drops when full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Event dicts are built fresh per call, so the record can be handed over as-is;
+        # only exception info is rendered here because tracebacks can't cross threads
+        if record.exc_info:
+            record = copy.copy(record)
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+# One background writer per process, replaced when the logging config changes
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_key: Optional[Tuple] = None
+_listener_lock = threading.Lock()
+
+def _stop_listener() -> None:
+    global _listener, _listener_key
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        _listener_key = None
+
+atexit.register(_stop_listener)
+
+def _build_stream_handler(cfg: Settings) -> logging.Handler:
+    handler = logging.StreamHandler(sys.stdout)
+    if cfg.log_format.lower() == 'json':
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        ))
+    return handler
+
+def _configure(logger: logging.Logger, cfg: Settings) -> None:
+    """Attach the (shared) handler chain to the keap_export logger."""
+    global _listener, _listener_key
+    key = (cfg.log_format.lower(), cfg.log_async, cfg.log_queue_size)
+    with _listener_lock:
+        if cfg.log_async and _listener_key == key and logger.handlers:
+            return
+        for handler in logger.handlers[:]:
+            logger.removeHandler(handler)
+        _stop_listener()
+
+        if cfg.log_async:
+            log_queue = queue.Queue(maxsize=cfg.log_queue_size)
+            _listener = logging.handlers.QueueListener(log_queue, _build_stream_handler(cfg))
+            _listener.start()
+            _listener_key = key
+            logger.addHandler(NonBlockingQueueHandler(log_queue))
+        else:
+            logger.addHandler(_build_stream_handler(cfg))
+        logger.propagate = False
+
 class KeapLogger:
     """Structured JSON logger for Keap export operations."""
-    
+
     def __init__(self, cfg: Settings):
         self.cfg = cfg
         self.logger = logging.getLogger('keap_export')
         self.logger.setLevel(getattr(logging, cfg.log_level.upper(), logging.INFO))
-        
-        # Remove existing handlers
-        for handler in self.logger.handlers[:]:
-            self.logger.removeHandler(handler)
-        
-        # Create console handler
-        handler = logging.StreamHandler(sys.stdout)
-        
-        # Set formatter based on config
-        if cfg.log_format.lower() == 'json':
-            handler.setFormatter(JSONFormatter())
-        else:
-            handler.setFormatter(logging.Formatter(
-                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-            ))
-        
-        self.logger.addHandler(handler)
-    
+        self.sampler = EventSampler(parse_sample_rates(cfg.log_sample))
+        _configure(self.logger, cfg)
+
+    def _emit(self, level: int, event: Dict[str, Any]) -> None:
+        """Hand an event dict to the handler chain without serializing it."""
+        if not self.logger.isEnabledFor(level):
+            return
+        event = self.sampler.offer(event)
+        if event is not None:
+            self.logger.log(level, _EventMessage(event))
+
+    def flush_sampled(self, entity: Optional[str] = None) -> None:
+        """Emit partially filled sampling windows, e.g. when an entity finishes."""
+        for event in self.sampler.flush(entity):
+            self.logger.log(logging.INFO, _EventMessage(event))
+
+    @staticmethod
+    def _timestamp() -> str:
+        return datetime.utcnow().isoformat() + 'Z'
+
     def log_sync_start(self, entity: str, since: Optional[str] = None, dry_run: bool = False) -> None:
         """Log the start of a sync operation."""
-        self.logger.info(json.dumps({
+        self._emit(logging.INFO, {
             'event': 'sync_start',
             'entity': entity,
             'since': since,
             'dry_run': dry_run,
-            'timestamp': datetime.utcnow().isoformat() + 'Z'
-        }))
-    
-    def log_sync_end(self, entity: str, total_items: int, duration_seconds: float, 
+            'timestamp': self._timestamp()
+        })
+
+    def log_sync_end(self, entity: str, total_items: int, duration_seconds: float,
                     success: bool = True, error: Optional[str] = None) -> None:
         """Log the end of a sync operation."""
-        self.logger.info(json.dumps({
+        self.flush_sampled(entity)
+        self._emit(logging.INFO, {
             'event': 'sync_end',
             'entity': entity,
             'total_items': total_items,
             'duration_seconds': duration_seconds,
             'success': success,
             'error': error,
-            'timestamp': datetime.utcnow().isoformat() + 'Z'
-        }))
-    
-    def log_page_fetch(self, entity: str, page: int, items_count: int, 
+            'timestamp': self._timestamp()
+        })
+
+    def log_page_fetch(self, entity: str, page: int, items_count: int,
                        duration_ms: int, throttle_remaining: Optional[int] = None) -> None:
         """Log a page fetch operation."""
-        self.logger.info(json.dumps({
+        self._emit(logging.INFO, {
             'event': 'page_fetch',
             'entity': entity,
             'page': page,
             'items_count': items_count,
             'duration_ms': duration_ms,
             'throttle_remaining': throttle_remaining,
-            'timestamp': datetime.utcnow().isoformat() + 'Z'
-        }))
-    
+            'timestamp': self._timestamp()
+        })
+
     def log_throttle_hit(self, entity: str, retry_after: int, throttle_type: str) -> None:
         """Log when throttle limits are hit."""
-        self.logger.warning(json.dumps({
+        self._emit(logging.WARNING, {
             'event': 'throttle_hit',
             'entity': entity,
             'retry_after': retry_after,
             'throttle_type': throttle_type,
-            'timestamp': datetime.utcnow().isoformat() + 'Z'
-        }))
-    
-    def log_retry(self, entity: str, attempt: int, max_attempts: int, 
+            'timestamp': self._timestamp()
+        })
+
+    def log_retry(self, entity: str, attempt: int, max_attempts: int,
                   error: str, delay_seconds: float) -> None:
         """Log a retry attempt."""
-        self.logger.warning(json.dumps({
+        self._emit(logging.WARNING, {
             'event': 'retry',
             'entity': entity,
             'attempt': attempt,
             'max_attempts': max_attempts,
             'error': error,
             'delay_seconds': delay_seconds,
-            'timestamp': datetime.utcnow().isoformat() + 'Z'
-        }))
-    
+            'timestamp': self._timestamp()
+        })
+
     def log_upsert_batch(self, entity: str, batch_size: int, duration_ms: int) -> None:
         """Log a batch upsert operation."""
-        self.logger.info(json.dumps({
+        self._emit(logging.INFO, {
             'event': 'upsert_batch',
             'entity': entity,
             'batch_size': batch_size,
             'duration_ms': duration_ms,
-            'timestamp': datetime.utcnow().isoformat() + 'Z'
-        }))
-    
+            'timestamp': self._timestamp()
+        })
+
     def log_validation_start(self, entity: str) -> None:
         """Log the start of validation."""
-        self.logger.info(json.dumps({
+        self._emit(logging.INFO, {
             'event': 'validation_start',
             'entity': entity,
-            'timestamp': datetime.utcnow().isoformat() + 'Z'
-        }))
-    
-    def log_validation_result(self, entity: str, orphans: int, warnings: int, 
+            'timestamp': self._timestamp()
+        })
+
+    def log_validation_result(self, entity: str, orphans: int, warnings: int,
                              errors: int, duration_seconds: float) -> None:
         """Log validation results."""
-        self.logger.info(json.dumps({
+        self._emit(logging.INFO, {
             'event': 'validation_result',
             'entity': entity,
             'orphans': orphans,
             'warnings': warnings,
             'errors': errors,
             'duration_seconds': duration_seconds,
-            'timestamp': datetime.utcnow().isoformat() + 'Z'
-        }))
-    
+            'timestamp': self._timestamp()
+        })
+
     def log_error(self, entity: str, error: str, context: Optional[Dict[str, Any]] = None) -> None:
         """Log an error."""
         log_data = {
             'event': 'error',
             'entity': entity,
             'error': error,
-            'timestamp': datetime.utcnow().isoformat() + 'Z'
+            'timestamp': self._timestamp()
         }
         if context:
             log_data['context'] = context
-        
-        self.logger.error(json.dumps(log_data))
-    
+
+        self._emit(logging.ERROR, log_data)
+
     def log_info(self, message: str, entity: Optional[str] = None, **kwargs) -> None:
         """Log an info message."""
         log_data = {
             'event': 'info',
             'message': message,
-            'timestamp': datetime.utcnow().isoformat() + 'Z'
+            'timestamp': self._timestamp()
         }
         if entity:
             log_data['entity'] = entity
         if kwargs:
             log_data.update(kwargs)
-        
-        self.logger.info(json.dumps(log_data))
+
+        self._emit(logging.INFO, log_data)
 
 class JSONFormatter(logging.Formatter):
     """Custom formatter for JSON logging."""
-    
+
     def format(self, record):
-        # If the record already contains JSON, return it as-is
-        if hasattr(record, 'msg') and isinstance(record.msg, str):
-            try:
-                json.loads(record.msg)
-                return record.msg
-            except (json.JSONDecodeError, TypeError):
-                pass
-        
+        # Structured events are serialized exactly once, here
+        if isinstance(record.msg, _EventMessage):
+            return str(record.msg)
+
+        # Pre-serialized JSON from older callers passes through without re-parsing
+        if isinstance(record.msg, str) and not record.args:
+            msg = record.msg.strip()
+            if msg.startswith('{') and msg.endswith('}'):
+                return msg
+
         # Otherwise, format as JSON
-        return json.dumps({
+        log_data = {
             'level': record.levelname,
             'message': record.getMessage(),
             'timestamp': datetime.utcnow().isoformat() + 'Z',
             'logger': record.name
-        })
+        }
+        if record.exc_text:
+            log_data['exception'] = record.exc_text
+        return json.dumps(log_data)
 
 def get_logger(cfg: Settings) -> KeapLogger:
     """Get a configured KeapLogger instance."""
@@ -0,0 +1,253 @@
+"""
+Live Sync Metrics
+In-memory counters, gauges and histograms with a Prometheus/OpenMetrics
+exposition endpoint. Scrapes only read these aggregates, never Postgres.
+"""
+
+from __future__ import annotations
+import http.server
+import socketserver
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+DEFAULT_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric(ABC):
+    """Base class for a metric family with a fixed set of label names."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _label_str(self, values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def family_name(self, openmetrics: bool) -> str:
+        return self.name
+
+    @abstractmethod
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """(suffix, rendered labels, value) for every sample of the family."""
+
+    def render(self, openmetrics: bool = False) -> List[str]:
+        family = self.family_name(openmetrics)
+        lines = [f"# HELP {family} {_escape(self.documentation)}", f"# TYPE {family} {self.kind}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    """Monotonically increasing counter. ``name`` should not end in ``_total``."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def family_name(self, openmetrics: bool) -> str:
+        # Prometheus text names the family after the sample, OpenMetrics strips _total
+        return self.name if openmetrics else f"{self.name}_total"
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [('_total', self._label_str(k), v) for k, v in items]
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [('', self._label_str(k), v) for k, v in items]
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed upper bounds."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def get_count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), []))
+
+    def samples(self):
+        with self._lock:
+            items = [(k, list(c), self._sums[k]) for k, c in sorted(self._counts.items())]
+        samples = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append(('_bucket', self._label_str(key, ('le', _format_value(bound))), cumulative))
+            samples.append(('_count', self._label_str(key), cumulative))
+            samples.append(('_sum', self._label_str(key), total))
+        return samples
+
+class MetricsRegistry:
+    """Holds metric families and renders them for scraping."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self, openmetrics: bool = False) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render(openmetrics))
+        if openmetrics:
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+# Process-wide registry and the sync metrics published through it
+REGISTRY = MetricsRegistry()
+
+PAGES_FETCHED = REGISTRY.counter(
+    'keap_pages_fetched', 'API pages fetched', ['entity'])
+RECORDS_FETCHED = REGISTRY.counter(
+    'keap_records_fetched', 'Records returned by the API', ['entity'])
+RECORDS_UPSERTED = REGISTRY.counter(
+    'keap_records_upserted', 'Records upserted into PostgreSQL', ['entity'])
+REQUEST_RETRIES = REGISTRY.counter(
+    'keap_request_retries', 'API request retries', ['entity'])
+THROTTLE_EVENTS = REGISTRY.counter(
+    'keap_throttle_events', 'Throttle pauses, Retry-After waits and 429 responses', ['entity', 'reason'])
+THROTTLE_WAIT = REGISTRY.counter(
+    'keap_throttle_wait_seconds', 'Time spent waiting on throttling', ['entity'])
+SYNC_ERRORS = REGISTRY.counter(
+    'keap_sync_errors', 'Failed entity syncs', ['entity'])
+REQUEST_LATENCY = REGISTRY.histogram(
+    'keap_request_duration_seconds', 'API page request latency including retries', ['entity'])
+THROTTLE_REMAINING = REGISTRY.gauge(
+    'keap_throttle_remaining', 'Lowest throttle budget reported on the last response', ['entity'])
+QUEUE_DEPTH = REGISTRY.gauge(
+    'keap_sync_queue_depth', 'Fetched records waiting to be upserted', ['entity'])
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """Serves /metrics and /health from the in-memory registry."""
+
+    registry = REGISTRY
+
+    def _write(self, status: int, body: str, content_type: str = "text/plain; charset=utf-8"):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == "/health":
+            return self._write(200, "ok")
+        if path != "/metrics":
+            return self._write(404, "Not Found")
+        openmetrics = 'application/openmetrics-text' in (self.headers.get('Accept') or '')
+        content_type = OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE
+        return self._write(200, self.registry.render(openmetrics), content_type)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would otherwise flood stdout
+        pass
+
+class _ThreadingServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> http.server.HTTPServer:
+    """Serve metrics from a daemon thread. Call ``shutdown()`` on the result to stop."""
+    httpd = _ThreadingServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=httpd.serve_forever, name=f"metrics-{port}", daemon=True)
+    thread.start()
+    return httpd
@@ -5,12 +5,16 @@ import requests
 from typing import Callable, Any, Optional, Dict
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from .config import Settings
+from .metrics import REQUEST_RETRIES
 
 class KeapRetryHandler:
     """Enhanced retry handler with exponential backoff and jitter for Keap API calls."""
     
-    def __init__(self, cfg: Settings):
+    def __init__(self, cfg: Settings, entity: str = None, on_throttle: Callable = None):
         self.cfg = cfg
+        self.entity = entity
+        # on_throttle(wait_seconds, throttle_type, remaining, reason) accounts for Retry-After/429 waits
+        self.on_throttle = on_throttle
         self.max_retries = getattr(cfg, 'max_retries', 5)
         self.retry_delay = getattr(cfg, 'retry_delay', 1)
         self.max_retry_delay = getattr(cfg, 'max_retry_delay', 30)
@@ -67,6 +71,22 @@ class KeapRetryHandler:
         
         return None
     
+    def _record_throttle(self, response: requests.Response, delay: float) -> None:
+        """Report a throttle-driven retry wait to the on_throttle hook."""
+        remaining = None
+        for header in ('x-keap-product-throttle-available', 'x-keap-tenant-throttle-available'):
+            try:
+                remaining = int(response.headers[header])
+                break
+            except (KeyError, ValueError, TypeError):
+                continue
+        reason = 'http_429' if response.status_code == 429 else 'retry_after'
+        try:
+            self.on_throttle(delay, 'retry_after' if response.headers.get('Retry-After') else 'product',
+                             remaining, reason)
+        except Exception as e:
+            print(f"Warning: Failed to record throttle wait: {e}")
+    
     def should_retry(self, exception: Exception, attempt: int) -> bool:
         """Determine if we should retry based on exception and attempt count."""
         if attempt >= self.max_retries:
@@ -105,8 +125,11 @@ class KeapRetryHandler:
                         throttle_delay = self.get_throttle_delay(e.response)
                         if throttle_delay:
                             delay = throttle_delay
+                        if self.on_throttle and (throttle_delay or e.response.status_code == 429):
+                            self._record_throttle(e.response, delay)
                 
                 # Log retry attempt
+                REQUEST_RETRIES.inc(entity=self.entity or 'unknown')
                 print(f"Retry attempt {attempt + 1}/{self.max_retries + 1} after {delay:.2f}s delay: {e}")
                 
                 # Wait before retry
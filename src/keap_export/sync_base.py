@@ -4,10 +4,14 @@ from datetime import datetime
 from typing import Dict, Any, Optional, List, Callable
 from .config import Settings
 from .client import KeapClient
-from .db import get_conn, upsert, to_jsonb
+from .db import get_conn, upsert, to_jsonb, rollup_contact_ids, refresh_contact_rollup
 from .logger import get_logger
 from .etl_meta import get_etl_tracker
 from .retry import KeapRetryHandler
+from .metrics import (
+    PAGES_FETCHED, RECORDS_FETCHED, RECORDS_UPSERTED, REQUEST_LATENCY,
+    THROTTLE_REMAINING, QUEUE_DEPTH, SYNC_ERRORS, THROTTLE_EVENTS, THROTTLE_WAIT,
+)
 
 class BaseSync:
     """Base class for all Keap entity sync operations."""
@@ -19,7 +23,15 @@ class BaseSync:
         self.client = KeapClient(cfg)
         self.logger = get_logger(cfg)
         self.etl_tracker = get_etl_tracker(cfg)
-        self.retry_handler = KeapRetryHandler(cfg)
+        self.retry_handler = KeapRetryHandler(cfg, entity, on_throttle=self.client.record_throttle_wait)
+        self.client.on_throttle = self._record_throttle_event
+        self._active_tracker = None
+        # Progress state read by the background health sampler
+        self.current_page = None
+        self.pages_in_flight = 0
+        # Time split for the last fetch: waiting on throttling vs doing work
+        self.throttle_wait_seconds = 0.0
+        self.working_seconds = 0.0
     
     def transform_record(self, raw_record: Dict[str, Any]) -> Dict[str, Any]:
         """Transform raw API record to database format. Override in subclasses."""
@@ -30,6 +42,23 @@ class BaseSync:
             'raw': to_jsonb(raw_record)
         }
     
+    def _record_throttle_event(self, endpoint: Optional[str], throttle_type: Optional[str],
+                               remaining: Optional[int], wait_seconds: float, reason: str) -> None:
+        """Persist a throttle wait reported by the client or retry handler."""
+        throttle_type = throttle_type or reason
+        THROTTLE_EVENTS.inc(entity=self.entity, reason=reason)
+        THROTTLE_WAIT.inc(wait_seconds, entity=self.entity)
+        self.logger.log_throttle_hit(self.entity, wait_seconds, throttle_type)
+        tracker = self._active_tracker if self._active_tracker is not None else self.etl_tracker
+        tracker.log_throttle_event(
+            entity=self.entity,
+            endpoint=endpoint or self.endpoint,
+            throttle_type=throttle_type,
+            throttle_remaining=remaining,
+            wait_time_ms=int(wait_seconds * 1000),
+            reason=reason
+        )
+    
     def _parse_datetime(self, dt_str: Optional[str]) -> Optional[datetime]:
         """Parse datetime string from Keap API."""
         if not dt_str:
@@ -60,6 +89,9 @@ class BaseSync:
         
         self.logger.log_sync_start(self.entity, since, dry_run)
         start_time = time.time()
+        self._active_tracker = etl_tracker
+        throttle_wait_start = self.client.throttle_wait_seconds
+        throttle_events_start = self.client.throttle_events
         
         # Update sync progress to running
         if etl_tracker:
@@ -76,17 +108,29 @@ class BaseSync:
                     response = self.client.request('GET', self.endpoint, params=page_params)
                     return response.json()
                 
+                self.current_page = page
+                self.pages_in_flight += 1
                 try:
                     data = self.retry_handler.retry_with_backoff(make_request)
                 except Exception as e:
                     self.logger.log_error(self.entity, f"Failed to fetch page {page}: {e}")
                     raise
+                finally:
+                    self.pages_in_flight -= 1
+                
+                REQUEST_LATENCY.observe(time.time() - page_start, entity=self.entity)
+                throttle_remaining = getattr(self.client, 'last_throttle_remaining', None)
+                if throttle_remaining is not None:
+                    THROTTLE_REMAINING.set(throttle_remaining, entity=self.entity)
                 
                 # Extract records from response
                 records = self._extract_records(data)
                 if not records:
                     break
                 
+                PAGES_FETCHED.inc(entity=self.entity)
+                RECORDS_FETCHED.inc(len(records), entity=self.entity)
+                
                 # Log page fetch
                 page_duration = (time.time() - page_start) * 1000
                 self.logger.log_page_fetch(self.entity, page, len(records), int(page_duration))
@@ -120,6 +164,7 @@ class BaseSync:
                 )
                 
                 all_records.extend(records)
+                QUEUE_DEPTH.set(len(all_records), entity=self.entity)
                 
                 # Save checkpoint for resume capability
                 if etl_tracker:
@@ -172,6 +217,15 @@ class BaseSync:
                 # Continue with all records if date parsing fails
         
         duration = time.time() - start_time
+        self.throttle_wait_seconds = self.client.throttle_wait_seconds - throttle_wait_start
+        self.working_seconds = max(duration - self.throttle_wait_seconds, 0.0)
+        self.logger.log_info(
+            f"Fetch time split for {self.entity}",
+            entity=self.entity,
+            throttle_wait_seconds=round(self.throttle_wait_seconds, 3),
+            working_seconds=round(self.working_seconds, 3),
+            throttle_events=self.client.throttle_events - throttle_events_start
+        )
         self.logger.log_sync_end(self.entity, len(all_records), duration, success=True)
         
         return all_records
@@ -198,6 +252,7 @@ class BaseSync:
         """Sync all records for this entity."""
         # Use external tracker if provided, otherwise use instance tracker
         tracker = etl_tracker if etl_tracker is not None else self.etl_tracker
+        tracker.attach_sync(self)
         
         try:
             # Fetch all records
@@ -205,8 +260,11 @@ class BaseSync:
             
             if dry_run:
                 self.logger.log_info(f"Dry run: Would process {len(raw_records)} {self.entity} records")
+                QUEUE_DEPTH.set(0, entity=self.entity)
                 return len(raw_records)
             
+            QUEUE_DEPTH.set(len(raw_records), entity=self.entity)
+            
             # Transform and upsert records
             processed_count = 0
             batch_size = 100
@@ -231,13 +289,17 @@ class BaseSync:
                 if transformed_batch:
                     conn = get_conn(self.cfg)
                     try:
+                        touched_contacts = rollup_contact_ids(conn, self.entity, transformed_batch)
                         for record in transformed_batch:
                             upsert(conn, self.entity, record)
+                        # Keep keap.contact_rollup current for just the contacts this batch touched
+                        refresh_contact_rollup(conn, touched_contacts)
                         conn.commit()
                         
                         batch_duration = (time.time() - batch_start) * 1000
                         self.logger.log_upsert_batch(self.entity, len(transformed_batch), int(batch_duration))
                         processed_count += len(transformed_batch)
+                        RECORDS_UPSERTED.inc(len(transformed_batch), entity=self.entity)
                         
                     except Exception as e:
                         conn.rollback()
@@ -245,10 +307,18 @@ class BaseSync:
                         raise
                     finally:
                         conn.close()
+                
+                QUEUE_DEPTH.set(max(len(raw_records) - i - batch_size, 0), entity=self.entity)
             
             # Record source count
             tracker.record_source_count(self.entity, processed_count)
             
+            # Roll request metrics and throttle waits up into entity_performance
+            try:
+                tracker.calculate_entity_performance(self.entity)
+            except Exception as e:
+                self.logger.log_error(self.entity, f"Failed to calculate entity performance: {e}")
+            
             # Mark entity as completed
             if etl_tracker:
                 etl_tracker.update_sync_progress(self.entity, 'completed', items_processed=processed_count)
@@ -257,12 +327,18 @@ class BaseSync:
             
         except Exception as e:
             self.logger.log_error(self.entity, f"Sync failed: {e}")
+            SYNC_ERRORS.inc(entity=self.entity)
+            QUEUE_DEPTH.set(0, entity=self.entity)
             
             # Mark entity as failed
             if etl_tracker:
                 etl_tracker.update_sync_progress(self.entity, 'failed', error_msg=str(e))
             
             raise
+        finally:
+            tracker.detach_sync(self)
+            # Upsert batches are logged after sync_end, so close their sampling windows here
+            self.logger.flush_sampled(self.entity)
 
 class UserSync(BaseSync):
     """Sync users from Keap API."""
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Data Export Script for Keap Database
-Exports data in CSV and Parquet formats for external analysis.
+Exports data in CSV, Parquet, Arrow IPC and Excel formats for external analysis.
 """
 
 import sys
@@ -16,8 +16,9 @@ from keap_export.exporters import ExportManager
 def main():
     """Main export function."""
     parser = argparse.ArgumentParser(description="Export Keap data in various formats")
-    parser.add_argument("--format", choices=["csv", "parquet"], default="csv",
-                       help="Export format (default: csv)")
+    parser.add_argument("--format", choices=["csv", "parquet", "arrow", "xlsx"], default="csv",
+                       help="Export format (default: csv); arrow writes a memory-mappable "
+                            "IPC snapshot with a contact id index; xlsx requires openpyxl")
     parser.add_argument("--entity", type=str,
                        help="Specific entity to export (e.g., contacts, companies)")
     parser.add_argument("--all", action="store_true",
@@ -30,6 +31,35 @@ def main():
                        help="WHERE clause for filtering data (e.g., 'created_at > \\'2023-01-01\\'')")
     parser.add_argument("--limit", type=int,
                        help="Limit number of records to export")
+    parser.add_argument("--columns", type=str,
+                       help="Comma-separated columns to export")
+    parser.add_argument("--include-raw", action="store_true",
+                       help="Include the raw API payload column (excluded by default)")
+    parser.add_argument("--compress", choices=["gzip", "zstd", "lz4"],
+                       help="Compress CSV output (gzip, zstd), Parquet codec (default: snappy) "
+                            "or Arrow codec (zstd, lz4; default: none)")
+    parser.add_argument("--jsonb", choices=["text", "first"], default="text",
+                       help="CSV: keep JSONB arrays (emails, phones, addresses, custom fields, "
+                            "stage moves) as JSON text, or project their first element into columns")
+    parser.add_argument("--explode", type=str, metavar="COLUMN",
+                       help="CSV: one row per element of this JSONB array column (e.g. phone_numbers)")
+    parser.add_argument("--row-group-size", type=int,
+                       help="Rows per Parquet row group / fetch chunk (default: EXPORT_ROW_GROUP_SIZE)")
+    parser.add_argument("--workers", type=int,
+                       help="Parallel worker processes for --all (default: EXPORT_WORKERS)")
+    parser.add_argument("--force", action="store_true",
+                       help="Re-export tables with --all even if unchanged since the last export")
+    parser.add_argument("--incremental", action="store_true",
+                       help="Append rows changed since the last run to a partitioned Parquet dataset "
+                            "(with --all or --entity)")
+    parser.add_argument("--dataset-dir", type=str,
+                       help="Incremental dataset directory (default: <output-dir>/dataset)")
+    parser.add_argument("--partition-by", choices=["day", "month"],
+                       help="Incremental partition granularity (default: EXPORT_PARTITION_GRANULARITY)")
+    parser.add_argument("--compact", action="store_true",
+                       help="Compact the incremental dataset (optionally only --entity)")
+    parser.add_argument("--target-file-mb", type=int,
+                       help="Target file size for --compact (default: EXPORT_COMPACTION_TARGET_MB)")
     parser.add_argument("--list", action="store_true",
                        help="List existing export files")
     parser.add_argument("--cleanup", type=int, metavar="DAYS",
@@ -41,6 +71,10 @@ def main():
     
     # Load configuration
     cfg = Settings()
+    if args.row_group_size:
+        cfg.export_row_group_size = args.row_group_size
+    
+    columns = [c.strip() for c in args.columns.split(",") if c.strip()] if args.columns else None
     
     # Initialize export manager
     export_manager = ExportManager(cfg, args.output_dir)
@@ -62,10 +96,29 @@ def main():
             export_manager.cleanup_old_exports(args.cleanup)
             return 0
         
+        if args.compact:
+            # Compact incremental dataset
+            export_manager.compact_dataset(args.dataset_dir, args.entity, args.target_file_mb)
+            return 0
+        
+        if args.incremental:
+            # Incremental dataset export
+            if not (args.all or args.entity):
+                print("--incremental requires --all or --entity")
+                return 1
+            tables = None if args.all else [args.entity]
+            results = export_manager.export_incremental(tables, args.dataset_dir,
+                                                        include_raw=args.include_raw,
+                                                        granularity=args.partition_by)
+            total_rows = sum(r['rows'] for r in results)
+            print(f"Incremental export completed: {total_rows} rows across {len(results)} entities")
+            return 0
+        
         if args.analytics:
             # Export analytics dataset
             print(f"Exporting analytics dataset in {args.format} format...")
-            filepath = export_manager.export_analytics(args.format, args.limit)
+            filepath = export_manager.export_analytics(args.format, args.limit,
+                                                        compression=args.compress)
             if filepath:
                 print(f"Analytics export completed: {filepath}")
             return 0
@@ -73,7 +126,11 @@ def main():
         if args.all:
             # Export all entities
             print(f"Exporting all entities in {args.format} format...")
-            exported_files = export_manager.export_all(args.format, args.where, args.limit)
+            exported_files = export_manager.export_all(args.format, args.where, args.limit,
+                                                      include_raw=args.include_raw,
+                                                      compression=args.compress,
+                                                      workers=args.workers,
+                                                      skip_unchanged=not args.force)
             print(f"Exported {len(exported_files)} entities:")
             for file_path in exported_files:
                 print(f"  {file_path}")
@@ -82,7 +139,11 @@ def main():
         if args.entity:
             # Export specific entity
             print(f"Exporting {args.entity} in {args.format} format...")
-            filepath = export_manager.export_entity(args.entity, args.format, args.where, args.limit)
+            filepath = export_manager.export_entity(args.entity, args.format, args.where, args.limit,
+                                                    columns=columns,
+                                                    include_raw=args.include_raw,
+                                                    compression=args.compress,
+                                                    jsonb=args.jsonb, explode=args.explode)
             if filepath:
                 print(f"Export completed: {filepath}")
             return 0
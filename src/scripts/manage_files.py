@@ -25,15 +25,27 @@ def main():
     parser.add_argument("--all-contacts", action="store_true",
                        help="Process all contacts")
     parser.add_argument("--limit", type=int,
-                       help="Limit number of contacts to process")
+                       help="Limit number of contacts to process (the next run continues after them)")
+    parser.add_argument("--full", action="store_true",
+                       help="Visit every contact, not just those changed since the last file sync")
+    parser.add_argument("--workers", type=int,
+                       help="Concurrent workers for --all-contacts (default: FILE_SYNC_WORKERS)")
     parser.add_argument("--list", action="store_true",
                        help="List files for contact or all contacts")
     parser.add_argument("--stats", action="store_true",
                        help="Show file storage statistics")
+    parser.add_argument("--compression-stats", action="store_true",
+                       help="Show the compression ratio per MIME type")
     parser.add_argument("--large-files", type=int, metavar="MB",
                        help="Find files larger than specified MB")
     parser.add_argument("--by-type", type=str,
                        help="List files of specific MIME type")
+    parser.add_argument("--cleanup-orphans", action="store_true",
+                       help="Quarantine files and rows that no longer exist in Keap")
+    parser.add_argument("--delete", action="store_true",
+                       help="With --cleanup-orphans, delete instead of quarantining")
+    parser.add_argument("--dry-run", action="store_true",
+                       help="With --cleanup-orphans, only report what would be removed")
     parser.add_argument("--storage-dir", type=str, default="files",
                        help="Directory to store files (default: files)")
     parser.add_argument("--config", type=str, default=".env",
@@ -56,6 +68,40 @@ def main():
             print(f"Total size: {stats['total_size_mb']:.2f} MB")
             print(f"Contacts with files: {stats['contacts_with_files']:,}")
             print(f"Average file size: {stats['avg_file_size_bytes']:.0f} bytes")
+            if 'unique_objects' in stats:
+                print(f"Unique objects: {stats['unique_objects']:,}")
+                print(f"Stored on disk: {stats['stored_size_mb']:.2f} MB")
+                print(f"Saved by deduplication: {stats['dedup_saved_bytes'] / (1024 * 1024):.2f} MB "
+                      f"(ratio {stats['dedup_ratio']}x)")
+                if stats['compression_saved_bytes']:
+                    print(f"On disk after compression: {stats['disk_size_mb']:.2f} MB "
+                          f"(saved {stats['compression_saved_bytes'] / (1024 * 1024):.2f} MB)")
+            return 0
+        
+        if args.compression_stats:
+            rows = file_manager.get_compression_stats()
+            if rows:
+                print("=== Compression by MIME Type ===")
+                print(f"{'MIME Type':<40} {'Objects':>8} {'Compressed':>10} {'Original MB':>12} {'Stored MB':>10} {'Ratio':>6}")
+                print("-" * 92)
+                for row in rows:
+                    print(f"{row['mime_type'][:40]:<40} {row['objects']:>8,} {row['compressed_objects']:>10,} "
+                          f"{row['original_bytes'] / (1024 * 1024):>12.2f} {row['stored_bytes'] / (1024 * 1024):>10.2f} "
+                          f"{row['ratio']:>5}x")
+            else:
+                print("No compression data (requires sql/add_file_objects.sql and sql/add_file_compression.sql)")
+            return 0
+        
+        if args.cleanup_orphans:
+            report = file_manager.cleanup_orphaned_files(delete=args.delete, dry_run=args.dry_run)
+            print(f"=== Orphaned File Cleanup ({report['mode']}) ===")
+            print(f"Files in Keap: {report['inventory_files']:,}")
+            print(f"Orphaned rows: {report['orphaned_rows']:,}")
+            print(f"Files removed: {report['files_removed']:,} (+{report['objects_removed']:,} stored objects)")
+            print(f"Space reclaimed: {report['reclaimed_mb']:.2f} MB")
+            if report['quarantine_dir'] and report['orphaned_rows']:
+                print(f"Quarantined under {report['quarantine_dir']} (manifest.jsonl lists the rows); "
+                      f"delete that directory to free the space")
             return 0
         
         if args.large_files:
@@ -132,12 +178,18 @@ def main():
                 print(f"Files skipped: {result['files_skipped']}")
             elif args.all_contacts:
                 # Sync all contacts
-                result = file_manager.sync_all_contact_files(args.download, args.limit)
+                result = file_manager.sync_all_contact_files(args.download, args.limit, args.workers, args.full)
                 print(f"=== Sync Results ===")
                 print(f"Contacts processed: {result['contacts_processed']}")
                 print(f"Total files found: {result['total_files_found']}")
                 print(f"Files {'downloaded' if args.download else 'metadata stored'}: {result['total_files_downloaded']}")
                 print(f"Files skipped: {result['total_files_skipped']}")
+                print(f"Files deduplicated: {result['total_files_deduplicated']}")
+                print(f"Errors: {result['errors']}")
+                print(f"Throughput: {result['files_per_second']} files/s, {result['mb_per_second']} MB/s "
+                      f"over {result['elapsed_seconds']}s")
+                if not result['complete']:
+                    print(f"Stopped after contact {result['checkpoint']}; run again to continue")
             else:
                 print("Error: --sync requires --contact-id or --all-contacts")
                 return 1
@@ -100,6 +100,17 @@ def show_throttle_analysis(run_id=None):
             avg_remaining_str = f"{avg_remaining:.1f}" if avg_remaining else "N/A"
             total_wait_str = f"{total_wait}ms" if total_wait else "N/A"
             print(f"{entity:<12} {endpoint:<25} {throttle_type:<12} {events:<8} {avg_remaining_str:<15} {total_wait_str:<12}")
+        
+        cur.execute("""
+            SELECT * FROM keap_meta.get_throttle_time_split(%s)
+        """, (run_id,))
+        
+        print(f"\n{'Entity':<12} {'Events':<8} {'429s':<6} {'Throttled':<12} {'Working':<12} {'Throttled %'}")
+        print("-" * 70)
+        
+        for row in cur.fetchall():
+            entity, events, http_429, throttle_wait_ms, working_ms, throttled_pct = row
+            print(f"{entity:<12} {events:<8} {http_429:<6} {f'{throttle_wait_ms}ms':<12} {f'{working_ms}ms':<12} {throttled_pct:.1f}%")
 
 def show_error_analysis(run_id=None):
     """Show error analysis for a specific run or latest run."""
@@ -141,26 +152,44 @@ def show_system_health(run_id=None):
             run_id = result[0]
         
         cur.execute("""
-            SELECT 
-                metric_name,
-                metric_value,
-                metric_unit,
-                tags,
-                recorded_at
-            FROM keap_meta.system_health
+            SELECT * FROM keap_meta.get_system_health_summary(%s)
+        """, (run_id,))
+        
+        print(f"\n=== System Health Summary for Run {run_id} ===")
+        print(f"{'Entity':<14} {'Samples':<8} {'Peak RSS':<10} {'Avg CPU':<8} {'GC Pause':<10} {'DB Conns':<9} {'HTTP Conns':<11} {'Min Throttle'}")
+        print("-" * 90)
+        
+        for row in cur.fetchall():
+            entity, samples, peak_rss, avg_cpu, gc_pause, db_conns, http_conns, min_throttle = row
+            peak_rss_str = f"{peak_rss:.1f}MB" if peak_rss is not None else "N/A"
+            avg_cpu_str = f"{avg_cpu:.1f}%" if avg_cpu is not None else "N/A"
+            gc_pause_str = f"{gc_pause:.1f}ms" if gc_pause is not None else "N/A"
+            db_conns_str = f"{db_conns:.0f}" if db_conns is not None else "N/A"
+            http_conns_str = f"{http_conns:.0f}" if http_conns is not None else "N/A"
+            min_throttle_str = f"{min_throttle:.0f}" if min_throttle is not None else "N/A"
+            print(f"{entity:<14} {samples:<8} {peak_rss_str:<10} {avg_cpu_str:<8} {gc_pause_str:<10} {db_conns_str:<9} {http_conns_str:<11} {min_throttle_str}")
+        
+        # Latest samples, so spikes can be tied to a specific page
+        cur.execute("""
+            SELECT sampled_at, entity, page, rss_mb, cpu_percent, gc_pause_ms, pages_in_flight, throttle_remaining
+            FROM keap_meta.system_health_timeline
             WHERE run_id = %s
-            ORDER BY recorded_at DESC
+            ORDER BY sampled_at DESC
+            LIMIT 20
         """, (run_id,))
         
-        print(f"\n=== System Health Metrics for Run {run_id} ===")
-        print(f"{'Metric':<20} {'Value':<10} {'Unit':<10} {'Tags':<30} {'Recorded'}")
+        print(f"\n{'Sampled':<10} {'Entity':<14} {'Page':<6} {'RSS':<10} {'CPU':<8} {'GC Pause':<10} {'In Flight':<10} {'Throttle'}")
         print("-" * 90)
         
         for row in cur.fetchall():
-            metric_name, value, unit, tags, recorded_at = row
-            tags_str = str(tags)[:30] if tags else ""
-            recorded_str = recorded_at.strftime("%H:%M:%S") if recorded_at else "N/A"
-            print(f"{metric_name:<20} {value:<10} {unit or '':<10} {tags_str:<30} {recorded_str}")
+            sampled_at, entity, page, rss, cpu, gc_pause, in_flight, throttle = row
+            sampled_str = sampled_at.strftime("%H:%M:%S") if sampled_at else "N/A"
+            rss_str = f"{rss:.1f}MB" if rss is not None else "N/A"
+            cpu_str = f"{cpu:.1f}%" if cpu is not None else "N/A"
+            gc_pause_str = f"{gc_pause:.1f}ms" if gc_pause is not None else "N/A"
+            in_flight_str = f"{in_flight:.0f}" if in_flight is not None else "-"
+            throttle_str = f"{throttle:.0f}" if throttle is not None else "-"
+            print(f"{sampled_str:<10} {entity or '(idle)':<14} {page if page is not None else '-':<6} {rss_str:<10} {cpu_str:<8} {gc_pause_str:<10} {in_flight_str:<10} {throttle_str}")
 
 def main():
     """Main dashboard function."""
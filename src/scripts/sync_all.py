@@ -17,6 +17,7 @@ from keap_export.config import Settings
 from keap_export.sync_base import create_sync
 from keap_export.logger import get_logger
 from keap_export.etl_meta import get_etl_tracker
+from keap_export.metrics import start_metrics_server
 
 # Define sync order: reference tables first, then main entities
 SYNC_ORDER = [
@@ -71,6 +72,8 @@ def main():
                        help="Continue syncing other entities if one fails")
     parser.add_argument("--resume", action="store_true",
                        help="Resume from last successful checkpoint")
+    parser.add_argument("--metrics-port", type=int,
+                       help="Expose live sync metrics on http://<host>:PORT/metrics (default: METRICS_PORT, 0 disables)")
     
     args = parser.parse_args()
     
@@ -148,6 +151,13 @@ def main():
                 logger.log_info("No interrupted runs found to resume")
                 return 0
     
+    # Start the metrics endpoint before any entity work
+    metrics_port = args.metrics_port if args.metrics_port is not None else cfg.metrics_port
+    metrics_server = None
+    if metrics_port:
+        metrics_server = start_metrics_server(metrics_port, cfg.metrics_host)
+        logger.log_info(f"Metrics available at http://{cfg.metrics_host}:{metrics_port}/metrics")
+    
     start_time = time.time()
     results = []
     failed_entities = []
@@ -187,6 +197,11 @@ def main():
         logger.log_error("sync_all", f"Unexpected error: {e}")
         etl_tracker.end_run(success=False, notes=f"Unexpected error: {e}")
         return 1
+    
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -12,7 +12,7 @@ import requests
 import sys
 sys.path.insert(0, '/opt/es-keap-database/src')
 
-from keap_export.client import KeapClient
+from keap_export.client import KeapClient, RateLimiter
 from keap_export.config import Settings
 
 
@@ -210,6 +210,44 @@ class TestKeapClient:
             # Should use the valid value (50)
             mock_sleep.assert_called_once_with(2.0)
     
+    def test_handle_throttle_headers_records_event(self):
+        """Test throttle pauses are reported to the on_throttle hook."""
+        mock_response = Mock()
+        mock_response.headers = {
+            'x-keap-product-throttle-available': '5'
+        }
+        events = []
+        self.client.on_throttle = lambda *args: events.append(args)
+        self.client.last_endpoint = '/crm/rest/v1/contacts'
+        
+        with patch('time.sleep') as mock_sleep:
+            self.client._handle_throttle_headers(mock_response)
+            mock_sleep.assert_called_once_with(5.0)
+        
+        assert events == [('/crm/rest/v1/contacts', 'product', 5, 5.0, 'critical')]
+        assert self.client.throttle_wait_seconds == 5.0
+        assert self.client.throttle_events == 1
+    
+    def test_record_throttle_wait_survives_hook_errors(self):
+        """Test a failing hook does not break the request path."""
+        self.client.on_throttle = Mock(side_effect=RuntimeError("db down"))
+        
+        self.client.record_throttle_wait(2.0, 'retry_after', None, 'http_429')
+        
+        assert self.client.throttle_wait_seconds == 2.0
+    
+    def test_retry_after_seconds(self):
+        """Test Retry-After parsing for seconds, missing and invalid values."""
+        mock_response = Mock()
+        mock_response.headers = {'Retry-After': '12'}
+        assert KeapClient.retry_after_seconds(mock_response) == 12.0
+        
+        mock_response.headers = {}
+        assert KeapClient.retry_after_seconds(mock_response) == 5.0
+        
+        mock_response.headers = {'Retry-After': 'soon'}
+        assert KeapClient.retry_after_seconds(mock_response, default=3.0) == 3.0
+    
     @patch('requests.Session.request')
     def test_request_success(self, mock_request):
         """Test successful request."""
@@ -237,6 +275,38 @@ class TestKeapClient:
             mock_handle.assert_called_once_with(mock_response)
             assert response == mock_response
     
+    @patch('requests.Session.request')
+    def test_request_records_every_429(self, mock_request):
+        """Each 429 retry waits Retry-After and is accounted as a throttle event."""
+        throttled = Mock(status_code=429, headers={'Retry-After': '3'}, content=b'')
+        throttled.raise_for_status.side_effect = requests.HTTPError("429", response=throttled)
+        ok = Mock(status_code=200, headers={}, content=b'[]')
+        ok.raise_for_status.return_value = None
+        mock_request.side_effect = [throttled, throttled, ok]
+        
+        with patch.object(KeapClient.request.retry, 'sleep') as mock_sleep, \
+                patch('keap_export.client.time.sleep'):
+            response = self.client.request('GET', '/test')
+        
+        assert response == ok
+        assert [c.args[0] for c in mock_sleep.call_args_list] == [3.0, 3.0]
+        assert self.client.throttle_events == 2
+        assert self.client.throttle_wait_seconds == 6.0
+    
+    @patch('requests.Session.request')
+    def test_request_reraises_http_error(self, mock_request):
+        """Exhausted retries surface the HTTPError, not tenacity's RetryError."""
+        failed = Mock(status_code=503, headers={}, content=b'')
+        failed.raise_for_status.side_effect = requests.HTTPError("503", response=failed)
+        mock_request.return_value = failed
+        
+        with patch.object(KeapClient.request.retry, 'sleep'):
+            with pytest.raises(requests.HTTPError):
+                self.client.request('GET', '/test')
+        
+        assert mock_request.call_count == 5
+        assert self.client.throttle_events == 0
+    
     @patch('requests.Session.request')
     def test_request_401_with_oauth(self, mock_request):
         """Test request with 401 error and OAuth retry."""
@@ -355,6 +425,84 @@ class TestKeapClient:
             mock_request.assert_called_once()
 
 
+
+class TestClientThreadSafety:
+    """Test a KeapClient shared by worker threads."""
+    
+    def setup_method(self):
+        self.cfg = Settings(
+            client_id="test_client",
+            client_secret="test_secret",
+            redirect_uri="https://example.com/callback",
+            base_url="https://api.infusionsoft.com"
+        )
+    
+    def test_concurrent_expiry_refreshes_once(self):
+        """Test threads finding the token expired refresh the single-use refresh token once."""
+        import threading
+        client = KeapClient(self.cfg)
+        bundle = {'tb': Mock(access_token='old', is_expired=True, refresh_token='r1')}
+        
+        def refresh(cfg, refresh_token):
+            time.sleep(0.05)
+            return Mock(access_token='new', is_expired=False, refresh_token='r2')
+        
+        def save(cfg, tb):
+            bundle['tb'] = tb
+        
+        with patch('keap_export.client.load_token_bundle', side_effect=lambda cfg: bundle['tb']), \
+             patch('keap_export.client.refresh_tokens', side_effect=refresh) as mock_refresh, \
+             patch('keap_export.client.save_token_bundle', side_effect=save):
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(client._headers()))
+                       for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        assert mock_refresh.call_count == 1
+        assert all(h['Authorization'] == 'Bearer new' for h in results)
+    
+    def test_last_endpoint_is_per_thread(self):
+        """Test one thread's request does not overwrite another thread's endpoint."""
+        import threading
+        client = KeapClient(self.cfg)
+        client.last_endpoint = '/main'
+        thread = threading.Thread(target=lambda: setattr(client, 'last_endpoint', '/worker'))
+        thread.start()
+        thread.join()
+        assert client.last_endpoint == '/main'
+
+
+class TestRateLimiter:
+    """Test the shared request pacing."""
+
+    def test_spaces_requests(self):
+        """Test consecutive acquires are spaced by the per-minute interval."""
+        limiter = RateLimiter(600)
+        with patch('time.sleep') as mock_sleep:
+            assert limiter.acquire() == 0
+            limiter.acquire()
+        assert mock_sleep.call_args[0][0] == pytest.approx(0.1, abs=0.02)
+
+    def test_hold_delays_everyone(self):
+        """Test a throttle hold pushes back the next slot."""
+        limiter = RateLimiter(0)
+        limiter.hold(2.0)
+        with patch('time.sleep') as mock_sleep:
+            limiter.acquire()
+        assert mock_sleep.call_args[0][0] == pytest.approx(2.0, abs=0.1)
+
+    def test_disabled(self):
+        """Test 0 requests per minute disables pacing."""
+        limiter = RateLimiter(0)
+        with patch('time.sleep') as mock_sleep:
+            limiter.acquire()
+            limiter.acquire()
+        mock_sleep.assert_not_called()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
 
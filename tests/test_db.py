@@ -27,7 +27,9 @@ from keap_export.db import (
     upsert_note,
     upsert_product,
     upsert_order,
-    to_jsonb
+    to_jsonb,
+    rollup_contact_ids,
+    refresh_contact_rollup
 )
 from keap_export.config import Settings
 
@@ -524,6 +526,45 @@ class TestUpsertDispatcher:
             upsert(mock_conn, 'unknown', data)
 
 
+class TestContactRollup:
+    """Test the contact rollup helpers."""
+
+    def test_rollup_contact_ids_contacts(self):
+        """Test contact batches touch their own ids without a query."""
+        conn = MagicMock()
+        assert rollup_contact_ids(conn, 'contacts', [{'id': 1}, {'id': 2}]) == {1, 2}
+        conn.cursor.assert_not_called()
+
+    def test_rollup_contact_ids_includes_previous_contact(self):
+        """Test child batches also touch the contact a record moves away from."""
+        conn = MagicMock()
+        cur = conn.cursor.return_value.__enter__.return_value
+        cur.fetchall.return_value = [(7,)]
+
+        ids = rollup_contact_ids(conn, 'tasks', [{'id': 10, 'contact_id': 3}, {'id': 11, 'contact_id': None}])
+
+        assert ids == {3, 7}
+        assert cur.execute.call_args[0][1] == ([10, 11],)
+
+    def test_rollup_contact_ids_unrelated_table(self):
+        """Test tables that do not feed the rollup touch nothing."""
+        assert rollup_contact_ids(MagicMock(), 'products', [{'id': 1}]) == set()
+
+    def test_refresh_contact_rollup(self):
+        """Test the refresh runs once per batch and is skipped when not installed."""
+        conn = MagicMock()
+        cur = conn.cursor.return_value.__enter__.return_value
+        cur.fetchone.side_effect = [(True,), (2,)]
+
+        with patch('keap_export.db._rollup_available', None):
+            assert refresh_contact_rollup(conn, {5, 4}) == 2
+            assert cur.execute.call_args[0][1] == ([4, 5],)
+
+        with patch('keap_export.db._rollup_available', False):
+            cur.execute.reset_mock()
+            assert refresh_contact_rollup(conn, {1}) == 0
+            cur.execute.assert_not_called()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
-
@@ -0,0 +1,628 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the exporters module.
+"""
+
+import gzip
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import MagicMock, Mock, patch
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+# Add the src directory to the path
+import sys
+sys.path.insert(0, '/opt/es-keap-database/src')
+
+from keap_export.exporters import (
+    ArrowExporter, ArrowSnapshot, CSVExporter, CopyProgress, DatasetCompactor, DatasetManifest,
+    ExcelExporter, ExportManager, ParquetExporter, arrow_index_path, arrow_type_for, json_to_arrow,
+    jsonb_recordset, new_run_id, open_compressed
+)
+from keap_export.config import Settings
+from scripts import export_data
+
+
+def _copy_cursor(chunks, rowcount):
+    """Mock cursor whose copy_expert writes the given chunks to the sink."""
+    cur = Mock()
+    cur.rowcount = rowcount
+    cur.copy_expert.side_effect = lambda query, sink: [sink.write(c) for c in chunks]
+    conn = Mock()
+    conn.cursor.return_value.__enter__ = Mock(return_value=cur)
+    conn.cursor.return_value.__exit__ = Mock(return_value=False)
+    return conn, cur
+
+
+class TestCSVExporter:
+    """Test the streaming CSV exporter."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.cfg = Settings()
+
+    def test_select_columns_excludes_raw_by_default(self, tmp_path):
+        """Test raw payloads are dropped unless requested."""
+        exporter = CSVExporter(self.cfg, str(tmp_path))
+        with patch.object(exporter, 'get_table_columns', return_value=['id', 'email', 'raw']):
+            assert exporter.select_columns('contacts') == ['id', 'email']
+            assert exporter.select_columns('contacts', include_raw=True) == ['id', 'email', 'raw']
+            assert exporter.select_columns('contacts', columns=['email']) == ['email']
+            with pytest.raises(ValueError, match="Unknown columns"):
+                exporter.select_columns('contacts', columns=['nope'])
+
+    def test_export_table_streams_gzip(self, tmp_path):
+        """Test COPY output is written straight into a compressed file."""
+        exporter = CSVExporter(self.cfg, str(tmp_path))
+        conn, cur = _copy_cursor([b'id,email\n', b'1,a@example.com\n'], rowcount=1)
+        with patch.object(exporter, 'get_table_columns', return_value=['id', 'email', 'raw']), \
+             patch.object(exporter, 'get_connection', return_value=conn):
+            path = exporter.export_table('contacts', compression='gzip', filename='contacts.csv.gz')
+
+        with gzip.open(path, 'rb') as f:
+            assert f.read() == b'id,email\n1,a@example.com\n'
+        copy_sql = cur.copy_expert.call_args[0][0]
+        assert 'raw' not in repr(copy_sql)
+
+    def test_export_table_empty_removes_file(self, tmp_path):
+        """Test an empty result leaves no file behind."""
+        exporter = CSVExporter(self.cfg, str(tmp_path))
+        conn, _ = _copy_cursor([b'id\n'], rowcount=0)
+        with patch.object(exporter, 'get_table_columns', return_value=['id']), \
+             patch.object(exporter, 'get_connection', return_value=conn):
+            assert exporter.export_table('tags', filename='tags.csv') is None
+        assert not (tmp_path / 'tags.csv').exists()
+
+
+class TestParquetExporter:
+    """Test the chunked Parquet exporter."""
+
+    COLUMN_TYPES = {
+        'id': ('int8', -1, None),
+        'value': ('numeric', (15 << 16) + 2 + 4, None),
+        'metadata': ('jsonb', -1, None),
+        'updated_at': ('timestamptz', -1, None),
+    }
+
+    def test_arrow_type_mapping(self):
+        """Test catalog types map to typed Arrow columns."""
+        assert arrow_type_for('int8') == (pa.int64(), None)
+        assert arrow_type_for('numeric', (15 << 16) + 2 + 4) == (pa.decimal128(15, 2), None)
+        assert arrow_type_for('numeric') == (pa.float64(), 'float8')
+        assert arrow_type_for('numeric', (50 << 16) + 4) == (pa.float64(), 'float8')
+        assert arrow_type_for('timestamptz') == (pa.timestamp('us', tz='UTC'), None)
+        assert arrow_type_for('jsonb') == (pa.string(), 'text')
+        assert arrow_type_for('_text', elem_typname='text') == (pa.list_(pa.string()), None)
+        assert arrow_type_for('_numeric', elem_typname='numeric') == (pa.list_(pa.float64()), 'float8[]')
+
+    def test_export_table_writes_row_groups(self, tmp_path):
+        """Test each fetched chunk becomes a row group with the catalog schema."""
+        exporter = ParquetExporter(Settings(), str(tmp_path))
+        ts = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        rows = [(i, Decimal('1.50'), '{"a": 1}', ts) for i in range(5)]
+        cur = Mock()
+        cur.fetchmany.side_effect = [rows[:2], rows[2:4], rows[4:], []]
+        conn = Mock()
+        conn.cursor.return_value.__enter__ = Mock(return_value=cur)
+        conn.cursor.return_value.__exit__ = Mock(return_value=False)
+
+        with patch.object(exporter, 'get_table_columns', return_value=list(self.COLUMN_TYPES)), \
+             patch.object(exporter, 'get_column_types', return_value=self.COLUMN_TYPES), \
+             patch.object(exporter, 'get_connection', return_value=conn):
+            path = exporter.export_table('opportunities', filename='opps.parquet', row_group_size=2)
+
+        conn.cursor.assert_called_once_with(name='keap_parquet_export')
+        parquet_file = pq.ParquetFile(path)
+        assert parquet_file.metadata.num_row_groups == 3
+        table = parquet_file.read()
+        assert table.schema.field('value').type == pa.decimal128(15, 2)
+        assert table.schema.field('metadata').type == pa.string()
+        assert table.column('id').to_pylist() == [0, 1, 2, 3, 4]
+        # jsonb is cast in SQL rather than parsed per cell
+        assert "SQL('text')" in repr(cur.execute.call_args[0][0])
+
+    def test_unconstrained_numeric_is_selected_as_float8(self, tmp_path):
+        """Test numeric without precision is cast in SQL; psycopg2 would return Decimal otherwise."""
+        exporter = ParquetExporter(Settings(), str(tmp_path))
+        column_types = {'id': ('int8', -1, None), 'score_value': ('numeric', -1, None)}
+        cur = Mock()
+
+        def fetchmany(size):
+            # Emulate psycopg2: numeric comes back as Decimal unless cast to float8
+            if cur.fetchmany.call_count > 1:
+                return []
+            if "SQL('float8')" in repr(cur.execute.call_args[0][0]):
+                return [(1, 1.5), (2, None)]
+            return [(1, Decimal('1.5')), (2, None)]
+
+        cur.fetchmany.side_effect = fetchmany
+        conn = Mock()
+        conn.cursor.return_value.__enter__ = Mock(return_value=cur)
+        conn.cursor.return_value.__exit__ = Mock(return_value=False)
+
+        with patch.object(exporter, 'get_table_columns', return_value=list(column_types)), \
+             patch.object(exporter, 'get_column_types', return_value=column_types), \
+             patch.object(exporter, 'get_connection', return_value=conn):
+            path = exporter.export_table('contacts', filename='contacts.parquet')
+
+        table = pq.read_table(path)
+        assert table.schema.field('score_value').type == pa.float64()
+        assert table.column('score_value').to_pylist() == [1.5, None]
+
+
+class TestJsonbFlattening:
+    """Test typed flattening of JSONB array columns."""
+
+    def test_json_to_arrow_list_of_struct(self):
+        """Test JSON texts parse into list<struct> in one pass, nulls and extra keys included."""
+        arrow_type = pa.list_(pa.struct([('number', pa.string()), ('type', pa.string())]))
+        values = ['[{"number": "555", "type": "Mobile", "extra": 1}]', None, '[]']
+        result = json_to_arrow(values, arrow_type)
+        assert result.type == arrow_type
+        assert result.to_pylist() == [[{'number': '555', 'type': 'Mobile'}], None, []]
+
+    def test_parquet_stores_struct_columns(self, tmp_path):
+        """Test JSONB arrays are normalized in SQL and written as typed structs."""
+        exporter = ParquetExporter(Settings(), str(tmp_path))
+        column_types = {'id': ('int8', -1, None), 'custom_fields': ('jsonb', -1, None)}
+        cur = Mock()
+        cur.fetchmany.side_effect = [[(1, '[{"id": 7, "content": "gold"}]'), (2, None)], []]
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cur
+        with patch.object(exporter, 'get_table_columns', return_value=list(column_types)), \
+             patch.object(exporter, 'get_column_types', return_value=column_types), \
+             patch.object(exporter, 'get_connection', return_value=conn):
+            path = exporter.export_table('contacts', filename='contacts.parquet')
+
+        table = pq.read_table(path)
+        assert table.schema.field('custom_fields').type == pa.list_(
+            pa.struct([('id', pa.int64()), ('content', pa.string())]))
+        assert table.column('custom_fields').to_pylist() == [[{'id': 7, 'content': 'gold'}], None]
+        assert 'jsonb_to_recordset' in repr(cur.execute.call_args[0][0])
+
+    def test_recordset_skips_non_object_elements(self):
+        """Test a mixed array like [1, "x", {...}] keeps only its objects instead of failing the export."""
+        for query in (repr(jsonb_recordset('phone_numbers')),
+                      repr(CSVExporter.flattened_select('keap', 'contacts', ['id', 'phone_numbers'],
+                                                        explode='phone_numbers'))):
+            assert "jsonb_typeof(" in query and "= 'array'" in query
+            assert 'jsonb_path_query_array(' in query
+            assert '$[*] ? (@.type() == "object")' in query
+
+    def test_csv_first_element_projection(self):
+        """Test --jsonb first replaces arrays with typed first-element columns."""
+        query = repr(CSVExporter.flattened_select('keap', 'contacts', ['id', 'email_addresses'], jsonb='first'))
+        assert "Identifier('email_addresses_email')" in query
+        assert "Literal('field')" in query
+        assert 'LATERAL' not in query
+
+    def test_csv_explode(self):
+        """Test --explode joins one row per element with prefixed columns."""
+        query = repr(CSVExporter.flattened_select('keap', 'contacts', ['id', 'phone_numbers'],
+                                                  explode='phone_numbers'))
+        assert 'LEFT JOIN LATERAL' in query
+        assert "Identifier('x', 'phone_numbers_number')" in query
+        with pytest.raises(ValueError, match="Cannot explode"):
+            CSVExporter.flattened_select('keap', 'contacts', ['id'], explode='phone_numbers')
+
+
+class TestExcelExporter:
+    """Test the streaming write-only Excel exporter."""
+
+    COLUMN_TYPES = {
+        'id': ('int8', -1, None),
+        'email': ('text', -1, None),
+        'tag_ids': ('_int8', -1, 'int8'),
+        'updated_at': ('timestamptz', -1, None),
+    }
+
+    def _exporter(self, tmp_path, rows):
+        exporter = ExcelExporter(Settings(), str(tmp_path))
+        cur = Mock()
+        cur.fetchmany.side_effect = [rows, []]
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cur
+        return exporter, conn, cur
+
+    def test_select_converts_for_excel(self, tmp_path):
+        """Test timestamptz becomes naive UTC and arrays are cast to text."""
+        exporter = ExcelExporter(Settings(), str(tmp_path))
+        with patch.object(exporter, 'get_column_types', return_value=self.COLUMN_TYPES):
+            query = repr(exporter.excel_select('contacts'))
+        assert "SQL(\" AT TIME ZONE 'UTC' AS \")" in query
+        assert "Identifier('tag_ids'), SQL('::text AS ')" in query
+
+    def test_splits_sheets_at_row_limit(self, tmp_path):
+        """Test rows beyond the per-sheet limit continue on numbered sheets."""
+        openpyxl = pytest.importorskip('openpyxl')
+        rows = [(i, f'user{i}@example.com\x07', '{1,2}', datetime(2025, 1, 1)) for i in range(5)]
+        exporter, conn, _ = self._exporter(tmp_path, rows)
+        with patch.object(exporter, 'get_table_columns', return_value=list(self.COLUMN_TYPES)), \
+             patch.object(exporter, 'get_column_types', return_value=self.COLUMN_TYPES), \
+             patch.object(exporter, 'get_connection', return_value=conn):
+            path = exporter.export_table('contacts', filename='contacts.xlsx', rows_per_sheet=2)
+
+        conn.cursor.assert_called_once_with(name='keap_xlsx_export')
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        assert workbook.sheetnames == ['contacts', 'contacts_2', 'contacts_3']
+        first = list(workbook['contacts'].values)
+        assert first[0] == ('id', 'email', 'tag_ids', 'updated_at')
+        assert first[1][:2] == (0, 'user0@example.com')
+        assert len(list(workbook['contacts_3'].values)) == 2
+
+    def test_requires_openpyxl(self, tmp_path):
+        """Test a missing openpyxl is reported clearly."""
+        try:
+            import openpyxl  # noqa: F401
+            pytest.skip("openpyxl is installed")
+        except ImportError:
+            pass
+        exporter, conn, _ = self._exporter(tmp_path, [])
+        with pytest.raises(ValueError, match="requires the openpyxl package"):
+            exporter.write_query("SELECT 1", ['x'], tmp_path / 'x.xlsx', 'x')
+
+
+class TestArrowExporter:
+    """Test Arrow IPC snapshots and their contact index."""
+
+    COLUMN_TYPES = {
+        'id': ('int8', -1, None),
+        'contact_id': ('int8', -1, None),
+        'title': ('text', -1, None),
+    }
+
+    def _export(self, tmp_path, rows, **kwargs):
+        exporter = ArrowExporter(Settings(), str(tmp_path))
+        cur = Mock()
+        cur.fetchmany.side_effect = [rows[:2], rows[2:], []]
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cur
+        with patch.object(exporter, 'get_table_columns', return_value=list(self.COLUMN_TYPES)), \
+             patch.object(exporter, 'get_column_types', return_value=self.COLUMN_TYPES), \
+             patch.object(exporter, 'get_connection', return_value=conn):
+            return exporter.export_table('tasks', filename='tasks.arrow', row_group_size=2, **kwargs)
+
+    def test_snapshot_is_mapped_and_indexed_by_contact(self, tmp_path):
+        """Test the uncompressed snapshot memory-maps and lookups use the index."""
+        rows = [(1, 20, 'a'), (2, 10, 'b'), (3, None, 'c'), (4, 20, 'd')]
+        path = self._export(tmp_path, rows)
+
+        assert arrow_index_path(path).name == 'tasks.index.arrow'
+        snapshot = ArrowSnapshot(path)
+        assert snapshot.table.num_rows == 4
+        assert snapshot.index_column == 'contact_id'
+        assert snapshot.lookup(20).column('id').to_pylist() == [1, 4]
+        assert snapshot.lookup(10).column('title').to_pylist() == ['b']
+        assert snapshot.lookup(99).num_rows == 0
+
+    def test_compressed_snapshot(self, tmp_path):
+        """Test a codec can be requested for smaller files."""
+        path = self._export(tmp_path, [(1, 5, 'x' * 100)] * 3, compression='zstd')
+        assert ArrowSnapshot(path).lookup(5).num_rows == 3
+
+    def test_skip_unchanged_reuses_index(self, tmp_path):
+        """Test a reused snapshot brings its index along."""
+        previous = tmp_path / 'tasks_1.arrow'
+        previous.write_bytes(b'data')
+        arrow_index_path(previous).write_bytes(b'index')
+        exporter = ArrowExporter(Settings(), str(tmp_path))
+        with patch.object(exporter, 'table_fingerprint', return_value=(1, 'abc')), \
+             patch.object(exporter, 'get_previous_export', return_value=('abc', str(previous))):
+            path, skipped = exporter.export_if_changed('tasks', 'arrow::raw=False', 'tasks_2.arrow')
+
+        assert skipped
+        assert arrow_index_path(path).read_bytes() == b'index'
+
+
+class TestSnapshotExport:
+    """Test consistent multi-table exports."""
+
+    def test_connection_imports_snapshot(self, tmp_path):
+        """Test exporters with a snapshot id read inside that snapshot."""
+        exporter = CSVExporter(Settings(), str(tmp_path), snapshot_id='00000003-1')
+        conn = MagicMock()
+        cur = conn.cursor.return_value.__enter__.return_value
+        with patch('keap_export.exporters.psycopg2.connect', return_value=conn):
+            exporter.get_connection()
+
+        conn.set_session.assert_called_once_with(isolation_level='REPEATABLE READ', readonly=True)
+        cur.execute.assert_called_once_with("SET TRANSACTION SNAPSHOT %s", ('00000003-1',))
+
+    def test_export_all_shares_snapshot(self, tmp_path):
+        """Test every table is exported from the coordinator's snapshot."""
+        manager = ExportManager(Settings(), str(tmp_path))
+        conn = MagicMock()
+        cur = conn.cursor.return_value.__enter__.return_value
+        cur.fetchone.return_value = ('00000003-1',)
+        cur.fetchall.return_value = [('contacts',), ('tags',)]
+
+        with patch.object(manager.csv_exporter, 'get_connection', return_value=conn), \
+             patch('keap_export.exporters._export_table_in_snapshot',
+                   side_effect=lambda cfg, out, fmt, table, snap, opts, key: (opts['filename'], False)) as worker:
+            files = manager.export_all('csv', workers=1)
+
+        assert [call.args[4] for call in worker.call_args_list] == ['00000003-1', '00000003-1']
+        assert worker.call_args_list[0].args[6] == 'csv::raw=False'
+        # Files from one snapshot share a timestamp
+        assert len({f.split('_', 1)[1] for f in files}) == 1
+        conn.rollback.assert_called_once()
+
+
+class TestAnalyticsExport:
+    """Test the analytics dataset export."""
+
+    def test_query_schema_and_no_fan_out(self, tmp_path):
+        """Test result types come from the probe and counts come from the rollup."""
+        exporter = ParquetExporter(Settings(), str(tmp_path))
+        conn = MagicMock()
+        cur = conn.cursor.return_value.__enter__.return_value
+        cur.description = [
+            Mock(type_code=20, precision=None, scale=None), Mock(type_code=1700, precision=18, scale=2),
+            Mock(type_code=3802, precision=None, scale=None),
+        ]
+        for column, name in zip(cur.description, ['contact_id', 'total_opportunity_value', 'extra']):
+            column.name = name
+        cur.fetchall.return_value = [(20, 'int8', None), (1700, 'numeric', None), (3802, 'jsonb', None)]
+
+        with patch.object(exporter, 'get_connection', return_value=conn), \
+             patch('keap_export.exporters.contact_rollup_available', return_value=True), \
+             patch.object(exporter, 'write_query', return_value=3) as write_query:
+            path = exporter.export_analytics_dataset()
+
+        assert path.endswith('.parquet')
+        select_query, arrow_schema, _ = write_query.call_args[0]
+        assert arrow_schema.field('total_opportunity_value').type == pa.decimal128(18, 2)
+        assert arrow_schema.field('extra').type == pa.string()
+        probe = repr(cur.execute.call_args_list[0][0][0])
+        assert 'COUNT(DISTINCT' not in probe.upper()
+        assert 'keap.contact_rollup' in probe
+
+    def test_falls_back_without_rollup(self, tmp_path):
+        """Test per-child aggregates replace the rollup until its migration is applied."""
+        exporter = ParquetExporter(Settings(), str(tmp_path))
+        conn = MagicMock()
+        cur = conn.cursor.return_value.__enter__.return_value
+        cur.description = []
+        cur.fetchall.return_value = []
+
+        with patch.object(exporter, 'get_connection', return_value=conn), \
+             patch('keap_export.exporters.contact_rollup_available', return_value=False), \
+             patch.object(exporter, 'write_query', return_value=1):
+            exporter.export_analytics_dataset()
+
+        probe = repr(cur.execute.call_args_list[0][0][0])
+        assert 'keap.contact_rollup' not in probe
+        assert 'FROM keap.opportunities GROUP BY contact_id' in probe
+
+
+class TestSkipUnchanged:
+    """Test fingerprint-based skipping of unchanged tables."""
+
+    def test_unchanged_table_reuses_previous_file(self, tmp_path):
+        """Test a matching fingerprint hardlinks the previous file instead of exporting."""
+        previous = tmp_path / 'tags_20251023_010000.csv'
+        previous.write_text('id\n1\n')
+        exporter = CSVExporter(Settings(), str(tmp_path))
+        with patch.object(exporter, 'table_fingerprint', return_value=(1, 'abc')), \
+             patch.object(exporter, 'get_previous_export', return_value=('abc', str(previous))), \
+             patch.object(exporter, 'export_table') as export_table:
+            path, skipped = exporter.export_if_changed('tags', 'csv::raw=False', 'tags_20251024_010000.csv')
+
+        assert skipped
+        export_table.assert_not_called()
+        assert open(path).read() == 'id\n1\n'
+        assert (tmp_path / 'tags_20251024_010000.csv').stat().st_ino == previous.stat().st_ino
+
+    def test_changed_table_is_exported_and_recorded(self, tmp_path):
+        """Test a new fingerprint triggers an export and is remembered."""
+        exporter = CSVExporter(Settings(), str(tmp_path))
+        with patch.object(exporter, 'table_fingerprint', return_value=(2, 'new')), \
+             patch.object(exporter, 'get_previous_export', return_value=('old', '/gone.csv')), \
+             patch.object(exporter, 'export_table', return_value='/out/tags.csv') as export_table, \
+             patch.object(exporter, 'record_export') as record_export:
+            path, skipped = exporter.export_if_changed('tags', 'csv::raw=False', 'tags.csv',
+                                                       include_raw=False)
+
+        assert (path, skipped) == ('/out/tags.csv', False)
+        export_table.assert_called_once_with('tags', 'keap', filename='tags.csv', include_raw=False)
+        record_export.assert_called_once_with('tags', 'csv::raw=False', 'new', 2, '/out/tags.csv', 'keap')
+
+
+class TestIncrementalExport:
+    """Test partitioned incremental exports and the manifest."""
+
+    COLUMN_TYPES = {
+        'id': ('int8', -1, None),
+        'updated_at': ('timestamptz', -1, None),
+    }
+
+    def _exporter(self, tmp_path, chunks, columns=None):
+        exporter = ParquetExporter(Settings(), str(tmp_path))
+        cur = Mock()
+        cur.fetchmany.side_effect = chunks + [[]]
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cur
+        patches = [
+            patch.object(exporter, 'get_table_columns', return_value=columns or list(self.COLUMN_TYPES)),
+            patch.object(exporter, 'get_column_types', return_value=self.COLUMN_TYPES),
+            patch.object(exporter, 'get_connection', return_value=conn),
+            patch.object(exporter, 'get_primary_key', return_value=['id']),
+        ]
+        for p in patches:
+            p.start()
+        return exporter, cur, patches
+
+    def test_partitions_and_watermark(self, tmp_path):
+        """Test rows land in updated_date partitions and the watermark advances."""
+        day1 = datetime(2025, 10, 23, 8, tzinfo=timezone.utc)
+        day2 = datetime(2025, 10, 24, 9, tzinfo=timezone.utc)
+        exporter, cur, patches = self._exporter(
+            tmp_path, [[(1, day1), (2, day1)], [(3, day2)]])
+        manifest = DatasetManifest(tmp_path / 'dataset')
+        try:
+            result = exporter.export_incremental('contacts', manifest, 'run1')
+        finally:
+            for p in patches:
+                p.stop()
+        manifest.save()
+
+        assert result['rows'] == 3 and result['files'] == 2
+        assert (tmp_path / 'dataset/entity=contacts/updated_date=2025-10-23/part-run1.parquet').exists()
+        reloaded = DatasetManifest(tmp_path / 'dataset')
+        assert reloaded.watermark('contacts') == day2.isoformat(timespec='microseconds')
+        assert [f['rows'] for f in reloaded.files('contacts')] == [2, 1]
+        assert all(len(f['sha256']) == 64 for f in reloaded.files())
+
+    def test_second_run_filters_on_watermark(self, tmp_path):
+        """Test later runs only select rows past the watermark."""
+        manifest = DatasetManifest(tmp_path / 'dataset')
+        manifest.record_run('contacts', 'run1', [], '2025-10-24T09:00:00.000000+00:00')
+        exporter, cur, patches = self._exporter(tmp_path, [])
+        try:
+            result = exporter.export_incremental('contacts', manifest, 'run2')
+        finally:
+            for p in patches:
+                p.stop()
+
+        query = repr(cur.execute.call_args[0][0])
+        assert "updated_at > " in query and '2025-10-24T09:00:00' in query
+        assert result['rows'] == 0
+        assert manifest.watermark('contacts') == '2025-10-24T09:00:00.000000+00:00'
+
+    def test_sync_marker_selects_rows_written_since_last_run(self, tmp_path):
+        """Test marker tables filter on synced_at, so old or NULL updated_at rows are exported."""
+        manifest = DatasetManifest(tmp_path / 'dataset')
+        manifest.record_run('contacts', 'run1', [], '2025-10-24T09:00:00.000000+00:00',
+                            synced_watermark='2025-10-25T01:00:00.000000+00:00')
+        stale = datetime(2025, 10, 20, 8, tzinfo=timezone.utc)
+        exporter, cur, patches = self._exporter(
+            tmp_path, [[(7, None), (8, stale)]], columns=['id', 'updated_at', 'synced_at'])
+        try:
+            result = exporter.export_incremental('contacts', manifest, 'run2',
+                                                 changes_bound='2025-10-26T01:00:00.000000+00:00')
+        finally:
+            for p in patches:
+                p.stop()
+
+        query = repr(cur.execute.call_args[0][0])
+        assert "Identifier('synced_at')" in query and '2025-10-25T01:00:00' in query
+        assert 'updated_at > ' not in query
+        assert result['rows'] == 2
+        # The marker bound advances; the updated_at watermark never moves back
+        assert manifest.synced_watermark('contacts') == '2025-10-26T01:00:00.000000+00:00'
+        assert manifest.watermark('contacts') == '2025-10-24T09:00:00.000000+00:00'
+
+    def test_changes_bound_covers_transactions_without_writes(self, tmp_path):
+        """Test an open transaction that has not written yet (no xid) still holds the bound back."""
+        exporter = ParquetExporter(Settings(), str(tmp_path))
+        read_only_so_far = datetime(2025, 10, 26, 0, 59, tzinfo=timezone.utc)
+        conn, cur = MagicMock(), Mock()
+        conn.cursor.return_value.__enter__.return_value = cur
+        cur.fetchone.return_value = (read_only_so_far,)
+        with patch.object(exporter, '_connect', return_value=conn):
+            bound = exporter.changes_bound()
+
+        query = cur.execute.call_args[0][0]
+        assert 'xact_start IS NOT NULL' in query and 'pg_backend_pid()' in query
+        assert 'backend_xid' not in query
+        assert conn.autocommit is True
+        assert bound == '2025-10-26T00:59:00.000000+00:00'
+
+    def test_run_ids_are_unique(self):
+        """Test run ids taken within the same second do not collide."""
+        assert len({new_run_id() for _ in range(100)}) == 100
+
+
+class TestDatasetCompactor:
+    """Test dataset compaction."""
+
+    def _write(self, root, manifest, run_id, partition, rows):
+        table = pa.table({
+            'id': pa.array([r[0] for r in rows], pa.int64()),
+            'updated_at': pa.array([r[1] for r in rows], pa.timestamp('us', tz='UTC')),
+        })
+        path = root / 'entity=contacts' / partition / f'part-{run_id}.parquet'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, path)
+        entry = {'entity': 'contacts', 'run_id': run_id, 'partition': partition,
+                 'path': path.relative_to(root).as_posix(), 'rows': len(rows),
+                 'bytes': path.stat().st_size, 'sha256': 'x'}
+        manifest.record_run('contacts', run_id, [entry], None, primary_key=['id'])
+
+    def test_merges_files_and_keeps_latest_version(self, tmp_path):
+        """Test superseded rows are dropped across partitions and small files merged."""
+        day1 = datetime(2025, 10, 23, tzinfo=timezone.utc)
+        day2 = datetime(2025, 10, 24, tzinfo=timezone.utc)
+        manifest = DatasetManifest(tmp_path)
+        self._write(tmp_path, manifest, 'run1', 'updated_date=2025-10-23', [(1, day1), (2, day1)])
+        self._write(tmp_path, manifest, 'run2', 'updated_date=2025-10-24', [(1, day2)])
+        self._write(tmp_path, manifest, 'run3', 'updated_date=2025-10-24', [(3, day2)])
+        manifest.save()
+
+        results = DatasetCompactor(Settings(), tmp_path).compact()
+
+        assert results == [{'entity': 'contacts', 'partitions': 2, 'files_in': 3,
+                            'files_out': 2, 'rows_dropped': 1}]
+        manifest = DatasetManifest(tmp_path)
+        files = manifest.files('contacts')
+        assert sorted(f['rows'] for f in files) == [1, 2]
+        assert manifest.data['tables']['contacts']['row_count'] == 3
+        assert not (tmp_path / 'entity=contacts/updated_date=2025-10-24/part-run2.parquet').exists()
+
+        ids = {}
+        for entry in files:
+            table = pq.read_table(tmp_path / entry['path'])
+            ids[entry['partition']] = sorted(table.column('id').to_pylist())
+        assert ids == {'updated_date=2025-10-23': [2], 'updated_date=2025-10-24': [1, 3]}
+
+    def test_single_clean_partition_untouched(self, tmp_path):
+        """Test partitions with one file and no superseded rows are skipped."""
+        manifest = DatasetManifest(tmp_path)
+        self._write(tmp_path, manifest, 'run1', 'updated_date=2025-10-23',
+                    [(1, datetime(2025, 10, 23, tzinfo=timezone.utc))])
+        manifest.save()
+
+        assert DatasetCompactor(Settings(), tmp_path).compact()[0]['partitions'] == 0
+        assert (tmp_path / 'entity=contacts/updated_date=2025-10-23/part-run1.parquet').exists()
+
+
+class TestCompression:
+    """Test output stream helpers."""
+
+    def test_unsupported_compression(self, tmp_path):
+        """Test unknown codecs are rejected."""
+        with pytest.raises(ValueError, match="Unsupported compression"):
+            open_compressed(tmp_path / 'x.csv', 'lz4')
+
+    def test_progress_counts_bytes(self):
+        """Test the progress sink forwards writes and counts bytes."""
+        sink = Mock()
+        progress = CopyProgress(sink, 'contacts')
+        progress.write(b'abc')
+        progress.write(b'de')
+
+        assert progress.bytes_written == 5
+        assert sink.write.call_count == 2
+
+
+class TestExportCli:
+    """Test export_data.py passes options to the right ExportManager call."""
+
+    def _run(self, argv):
+        with patch.object(export_data, 'ExportManager') as manager_cls, \
+             patch.object(sys, 'argv', ['export_data.py'] + argv):
+            manager = manager_cls.return_value
+            assert export_data.main() == 0
+        return manager
+
+    def test_analytics(self):
+        """Test --analytics does not receive the CSV-only JSONB options."""
+        manager = self._run(['--analytics', '--format', 'parquet', '--limit', '10'])
+        manager.export_analytics.assert_called_once_with('parquet', 10, compression=None)
+
+    def test_entity_forwards_jsonb_options(self):
+        """Test --jsonb and --explode reach the entity export."""
+        manager = self._run(['--entity', 'contacts', '--jsonb', 'first', '--explode', 'phone_numbers'])
+        kwargs = manager.export_entity.call_args.kwargs
+        assert kwargs['jsonb'] == 'first' and kwargs['explode'] == 'phone_numbers'
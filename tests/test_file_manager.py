@@ -0,0 +1,649 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the file manager module.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from unittest.mock import MagicMock, Mock, patch
+import pytest
+import requests
+
+# Add the src directory to the path
+import sys
+sys.path.insert(0, '/opt/es-keap-database/src')
+
+from keap_export.file_manager import (
+    BloomFilter, FileManager, HostLimiter, KnownFiles, MetadataWriter, TransferStats, open_stored_file,
+    remote_file_identity
+)
+from keap_export.config import Settings
+
+
+class TestHostLimiter:
+    """Test per-host concurrency limits."""
+
+    def test_bounds_concurrency_per_host(self):
+        """Test no more than per_host requests to one host run at once."""
+        limiter = HostLimiter(2)
+        active, peak = {'a': 0}, {'a': 0}
+        lock = threading.Lock()
+
+        def request():
+            with limiter.slot('https://files.example.com/x'):
+                with lock:
+                    active['a'] += 1
+                    peak['a'] = max(peak['a'], active['a'])
+                time.sleep(0.02)
+                with lock:
+                    active['a'] -= 1
+
+        threads = [threading.Thread(target=request) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert peak['a'] == 2
+
+
+class TestMetadataWriter:
+    """Test batched contact_files upserts."""
+
+    def test_flushes_in_batches_and_dedupes(self):
+        """Test rows are upserted per batch and duplicate keys collapse."""
+        conn = MagicMock()
+        writer = MetadataWriter(lambda: conn, batch_size=2)
+        with patch('psycopg2.extras.execute_values') as execute_values:
+            writer.add(1, 'a.pdf', '/f/a.pdf', 10, 'application/pdf', 'h1')
+            writer.add(1, 'a2.pdf', '/f/a2.pdf', 10, 'application/pdf', 'h1')
+            execute_values.assert_not_called()
+            writer.add(2, 'b.pdf', '/f/b.pdf', 20, 'application/pdf', 'h2')
+            assert execute_values.call_count == 1
+            rows = execute_values.call_args[0][2]
+            assert [row[1] for row in rows] == ['a2.pdf', 'b.pdf']
+            writer.add(3, 'c.pdf', '/f/c.pdf', 30, 'application/pdf', 'h3')
+            writer.close()
+
+        assert execute_values.call_count == 2
+        assert writer.rows_written == 3
+        assert conn.commit.call_count == 2
+        conn.close.assert_called_once()
+
+    def test_log_rows_share_the_batch(self):
+        """Test download log rows count towards the batch and go out in the same transaction."""
+        conn = MagicMock()
+        writer = MetadataWriter(lambda: conn, batch_size=3)
+        with patch('psycopg2.extras.execute_values') as execute_values:
+            writer.add(1, 'a.pdf', '/f/a.pdf', 10, 'application/pdf', 'h1')
+            writer.add_log(1, 'download', 1, 1, 0, 10, 25)
+            execute_values.assert_not_called()
+            writer.add_log(2, 'download', error_message='boom')
+
+        tables = ['contact_files' if 'contact_files' in call[0][1] else 'file_download_log'
+                  for call in execute_values.call_args_list]
+        assert tables == ['contact_files', 'file_download_log']
+        assert execute_values.call_args[0][2][1] == (2, 'download', 0, 0, 0, 0, None, 'boom')
+        assert conn.commit.call_count == 1
+        assert writer.log_rows_written == 2
+
+    def test_single_contact_sync_writes_one_batch(self, tmp_path):
+        """Test a metadata-only contact sync uses one connection and one upsert for all its files."""
+        manager = FileManager(Settings(), str(tmp_path))
+        manager._columns[('contact_files', 'content_hash')] = True
+        manager._columns[('contact_files', 'stored_size')] = False
+        files = [{'id': f'f{i}', 'file_name': f'{i}.pdf', 'file_url': f'https://files.example.com/{i}'}
+                 for i in range(5)]
+        conn = MagicMock()
+        with patch.object(manager, 'get_connection', return_value=conn) as get_connection, \
+             patch.object(manager, 'get_contact_files', return_value=files), \
+             patch('psycopg2.extras.execute_values') as execute_values:
+            result = manager.sync_contact_files(7, known=KnownFiles())
+
+        assert result['files_downloaded'] == 5
+        get_connection.assert_called_once()
+        assert [len(call[0][2]) for call in execute_values.call_args_list] == [5, 1]
+        assert execute_values.call_args[0][2][0][:2] == (7, 'metadata_only')
+
+
+class TestContentAddressedStorage:
+    """Test single-pass hashing and content-addressed objects."""
+
+    def _manager(self, tmp_path, body):
+        manager = FileManager(Settings(), str(tmp_path))
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.status_code = 200
+        response.headers = {'Content-Length': str(len(body)), 'ETag': '"v1"'}
+        response.iter_content.side_effect = lambda chunk_size: iter([body[:3], body[3:]])
+        session = Mock()
+        session.get.return_value = response
+        manager._local.session = session
+        return manager
+
+    def test_download_hashes_while_streaming(self, tmp_path):
+        """Test the hash comes from the stream and the object is linked under the contact."""
+        manager = self._manager(tmp_path, b'hello world')
+        with patch.object(manager, '_calculate_file_hash') as rehash:
+            result = manager.download_file('https://files.example.com/a', 1, 'a.txt')
+
+        rehash.assert_not_called()
+        expected = hashlib.sha256(b'hello world').hexdigest()
+        assert result['content_hash'] == expected
+        assert result['size'] == 11 and not result['deduplicated']
+        object_path = tmp_path / 'objects' / expected[:2] / expected[2:4] / expected
+        assert object_path.read_bytes() == b'hello world'
+        assert os.path.samefile(result['path'], object_path)
+        assert list((tmp_path / 'temp').iterdir()) == []
+
+    def test_identical_content_is_stored_once(self, tmp_path):
+        """Test a second contact with the same attachment links the existing object."""
+        manager = self._manager(tmp_path, b'same bytes')
+        first = manager.download_file('https://files.example.com/a', 1, 'a.pdf')
+        second = manager.download_file('https://files.example.com/b', 2, 'copy.pdf')
+
+        assert second['deduplicated']
+        assert os.stat(first['path']).st_ino == os.stat(second['path']).st_ino
+        assert sum(1 for p in (tmp_path / 'objects').rglob('*') if p.is_file()) == 1
+
+    def test_redownload_reuses_contact_link(self, tmp_path):
+        """Test downloading the same file again for a contact does not create name_1 copies."""
+        manager = self._manager(tmp_path, b'again')
+        first = manager.download_file('https://files.example.com/a', 1, 'a.pdf')
+        second = manager.download_file('https://files.example.com/a', 1, 'a.pdf')
+        assert first['path'] == second['path']
+
+    def test_storage_stats_report_dedup(self, tmp_path):
+        """Test stats count each object once."""
+        manager = FileManager(Settings(), str(tmp_path))
+        manager._columns[('contact_files', 'content_hash')] = True
+        conn = MagicMock()
+        cur = conn.cursor.return_value.__enter__.return_value
+        manager._columns[('contact_files', 'stored_size')] = False
+        cur.fetchone.side_effect = [(3, 300, 2, 100), (1, 100, 100)]
+        with patch.object(manager, 'get_connection', return_value=conn):
+            stats = manager.get_storage_stats()
+
+        assert stats['unique_objects'] == 1
+        assert stats['dedup_saved_bytes'] == 200
+        assert stats['dedup_ratio'] == 3.0
+
+
+class TestCompressedStorage:
+    """Test the zstd storage tier."""
+
+    def _manager(self, tmp_path, body, compression='zstd'):
+        if compression == 'zstd':
+            pytest.importorskip('zstandard')
+        cfg = Settings()
+        cfg.file_compression = compression
+        manager = FileManager(cfg, str(tmp_path))
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.status_code = 200
+        response.headers = {'Content-Length': str(len(body))}
+        response.iter_content.side_effect = lambda chunk_size: iter([body])
+        manager._local.session = Mock(get=Mock(return_value=response))
+        return manager
+
+    def test_text_is_compressed_and_reads_back(self, tmp_path):
+        """Test a compressible file is stored as .zst and streams back decompressed."""
+        body = b'name,email\n' + b'jane,jane@example.com\n' * 2000
+        manager = self._manager(tmp_path, body)
+        result = manager.download_file('https://files.example.com/a', 1, 'contacts.csv')
+
+        content_hash = hashlib.sha256(body).hexdigest()
+        assert result['content_hash'] == content_hash
+        assert result['compression'] == 'zstd' and result['mime_type'] == 'text/csv'
+        assert result['size'] == len(body) and result['stored_size'] < len(body) / 10
+        assert result['path'].endswith('contacts.csv.zst')
+        assert manager.stored_object(content_hash) == manager.object_path(content_hash, compressed=True)
+        with open_stored_file(result['path']) as f:
+            assert f.read() == body
+
+    def test_incompressible_types_are_stored_as_is(self, tmp_path):
+        """Test images and other pre-compressed types skip compression."""
+        manager = self._manager(tmp_path, b'\x89PNG' + b'\0' * 5000)
+        result = manager.download_file('https://files.example.com/a', 1, 'logo.png')
+        assert result['compression'] is None and result['stored_size'] == result['size']
+        assert result['path'].endswith('logo.png')
+
+    def test_random_content_is_not_kept_compressed(self, tmp_path):
+        """Test a compressible type whose content does not shrink is stored raw."""
+        manager = self._manager(tmp_path, os.urandom(4096))
+        result = manager.download_file('https://files.example.com/a', 1, 'scan.pdf')
+        assert result['compression'] is None
+        assert not list((tmp_path / 'temp').iterdir())
+
+    def test_disabled_by_default(self, tmp_path):
+        """Test FILE_COMPRESSION=none stores everything as-is."""
+        manager = self._manager(tmp_path, b'text ' * 1000, compression='none')
+        result = manager.download_file('https://files.example.com/a', 1, 'notes.txt')
+        assert result['compression'] is None
+        with open_stored_file(result['path']) as f:
+            assert f.read() == b'text ' * 1000
+
+    def test_compression_stats_per_mime_type(self, tmp_path):
+        """Test the per-MIME report derives ratios from original and stored sizes."""
+        manager = FileManager(Settings(), str(tmp_path))
+        manager._columns[('contact_files', 'content_hash')] = True
+        manager._columns[('contact_files', 'stored_size')] = True
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value.fetchall.return_value = [
+            ('application/pdf', 4, 3, 4000, 1000), ('image/png', 2, 0, 500, 500)]
+        with patch.object(manager, 'get_connection', return_value=conn):
+            rows = manager.get_compression_stats()
+
+        assert [(row['mime_type'], row['ratio']) for row in rows] == [('application/pdf', 4.0), ('image/png', 1.0)]
+
+    def test_writer_records_stored_size(self):
+        """Test stored size and compression are written next to the original size."""
+        conn = MagicMock()
+        writer = MetadataWriter(lambda: conn, batch_size=10, compression=True)
+        with patch('psycopg2.extras.execute_values') as execute_values:
+            writer.add(1, 'a.csv', '/f/a.csv.zst', 1000, 'text/csv', 'h1', 'f1', 'c1', 120, 'zstd')
+            writer.close()
+        assert 'stored_size, compression' in execute_values.call_args[0][1]
+        assert execute_values.call_args[0][2] == [(1, 'a.csv', '/f/a.csv.zst', 1000, 'text/csv', 'h1', 'f1',
+                                                   'c1', 120, 'zstd')]
+
+
+class TestResumableDownloads:
+    """Test ranged resume of interrupted downloads via temp/."""
+
+    def _response(self, status, headers, chunks):
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.status_code = status
+        response.headers = headers
+        response.iter_content.side_effect = lambda chunk_size: iter(chunks)
+        return response
+
+    def _manager(self, tmp_path, response):
+        manager = FileManager(Settings(), str(tmp_path))
+        manager._columns[('file_download_log', 'temp_path')] = True
+        manager._local.session = Mock()
+        manager._local.session.get.return_value = response
+        return manager
+
+    def test_interrupted_download_is_kept_and_recorded(self, tmp_path):
+        """Test a failed stream leaves the partial in temp/ and records it."""
+        def chunks():
+            yield b'hello '
+            raise ConnectionError("reset")
+        response = self._response(200, {'Content-Length': '11', 'ETag': '"v1"'}, chunks())
+        manager = self._manager(tmp_path, response)
+        with patch.object(manager, '_record_partial') as record_partial:
+            assert manager.download_file('https://files.example.com/a', 1, 'a.txt', 'f1') is None
+
+        temp_path = manager._temp_path('https://files.example.com/a', 1, 'f1')
+        assert temp_path.read_bytes() == b'hello '
+        assert record_partial.call_args[0][2:4] == (temp_path, '"v1"')
+
+    def test_resume_with_range(self, tmp_path):
+        """Test a partial resumes from its size and the hash covers the whole file."""
+        response = self._response(206, {'Content-Range': 'bytes 6-10/11', 'ETag': '"v1"'}, [b'world'])
+        manager = self._manager(tmp_path, response)
+        temp_path = manager._temp_path('https://files.example.com/a', 1, 'f1')
+        temp_path.write_bytes(b'hello ')
+        with patch.object(manager, '_get_partial', return_value={'bytes_received': 6, 'validator': '"v1"'}), \
+             patch.object(manager, '_complete_partial') as complete_partial:
+            result = manager.download_file('https://files.example.com/a', 1, 'a.txt', 'f1')
+
+        headers = manager._local.session.get.call_args[1]['headers']
+        assert headers['Range'] == 'bytes=6-' and headers['If-Range'] == '"v1"'
+        assert result['content_hash'] == hashlib.sha256(b'hello world').hexdigest()
+        assert open(result['path'], 'rb').read() == b'hello world'
+        complete_partial.assert_called_once_with(temp_path, 11)
+        assert not temp_path.exists()
+
+    def test_server_without_ranges_restarts(self, tmp_path):
+        """Test a 200 reply to a ranged request rewrites the file from zero."""
+        response = self._response(200, {'Content-Length': '11'}, [b'hello world'])
+        manager = self._manager(tmp_path, response)
+        temp_path = manager._temp_path('https://files.example.com/a', 1, 'f1')
+        temp_path.write_bytes(b'stale')
+        with patch.object(manager, '_get_partial', return_value={'bytes_received': 5, 'validator': '"v0"'}), \
+             patch.object(manager, '_complete_partial'):
+            result = manager.download_file('https://files.example.com/a', 1, 'a.txt', 'f1')
+
+        assert manager._local.session.get.call_args[1]['headers']['Range'] == 'bytes=5-'
+        assert open(result['path'], 'rb').read() == b'hello world'
+
+    def test_partial_without_validator_restarts(self, tmp_path):
+        """Test a leftover partial with no recorded validator is not resumed blindly."""
+        response = self._response(200, {'Content-Length': '11'}, [b'hello world'])
+        manager = self._manager(tmp_path, response)
+        temp_path = manager._temp_path('https://files.example.com/a', 1, 'f1')
+        temp_path.write_bytes(b'HELLO ')
+        with patch.object(manager, '_get_partial', return_value=None):
+            result = manager.download_file('https://files.example.com/a', 1, 'a.txt', 'f1')
+
+        headers = manager._local.session.get.call_args[1]['headers']
+        assert 'Range' not in headers and 'If-Range' not in headers
+        assert result['content_hash'] == hashlib.sha256(b'hello world').hexdigest()
+
+    def test_range_mismatch_restarts(self, tmp_path):
+        """Test a 206 that does not start at our offset is discarded, not appended."""
+        wrong = self._response(206, {'Content-Range': 'bytes 0-10/11', 'ETag': '"v1"'}, [b'hello world'])
+        full = self._response(200, {'Content-Length': '11', 'ETag': '"v1"'}, [b'hello world'])
+        manager = self._manager(tmp_path, wrong)
+        manager._local.session.get.side_effect = [wrong, full]
+        temp_path = manager._temp_path('https://files.example.com/a', 1, 'f1')
+        temp_path.write_bytes(b'hello ')
+        with patch.object(manager, '_get_partial',
+                          side_effect=[{'bytes_received': 6, 'validator': '"v1"'}, None]):
+            result = manager.download_file('https://files.example.com/a', 1, 'a.txt', 'f1')
+
+        assert 'Range' not in manager._local.session.get.call_args_list[1][1]['headers']
+        assert open(result['path'], 'rb').read() == b'hello world'
+
+    def test_size_mismatch_is_not_accepted(self, tmp_path):
+        """Test a short body is kept as a partial instead of being stored."""
+        response = self._response(200, {'Content-Length': '20'}, [b'short'])
+        manager = self._manager(tmp_path, response)
+        with patch.object(manager, '_record_partial') as record_partial:
+            assert manager.download_file('https://files.example.com/a', 1, 'a.txt', 'f1') is None
+        assert 'incomplete download' in record_partial.call_args[0][4]
+        assert not any(path.is_file() for path in (tmp_path / 'objects').rglob('*'))
+
+
+class TestKnownFiles:
+    """Test the preloaded dedup index."""
+
+    def test_identity_comes_from_listing_metadata(self):
+        """Test id, size and modified date identify a file without the URL."""
+        info = {'id': 7, 'file_size': 10, 'last_updated': '2024-01-01T00:00:00Z',
+                'file_url': 'https://files.example.com/a?token=1'}
+        same = dict(info, file_url='https://files.example.com/a?token=2')
+        assert remote_file_identity(info) == remote_file_identity(same)
+        assert remote_file_identity(info) != remote_file_identity(dict(info, file_size=11))
+        assert remote_file_identity(info) != remote_file_identity(dict(info, last_updated='2024-02-01'))
+
+    @pytest.mark.parametrize('set_limit', [1000, 10])
+    def test_matches_by_hash_or_keap_id(self, set_limit):
+        """Test lookups in both the set and the Bloom filter (legacy rows match by id)."""
+        known = KnownFiles(expected_rows=100, set_limit=set_limit)
+        assert known.bloom == (set_limit == 10)
+        for i in range(100):
+            known.add(i, f'hash{i}', f'f{i}')
+
+        assert known.contains(5, 'hash5')
+        assert known.contains(5, 'legacy', 'f5')
+        assert not known.contains(5, 'hash6', 'f6')
+        assert not known.contains(500, 'new', 'f500')
+
+    def test_identity_rows_do_not_match_by_keap_id(self):
+        """Test a stored identity matches only itself, not any version of the file."""
+        info = {'id': 'f1', 'file_size': 3, 'last_updated': '2024-01-01T00:00:00Z'}
+        known = KnownFiles()
+        known.add(1, remote_file_identity(info), 'f1')
+
+        assert known.contains(1, remote_file_identity(info), 'f1')
+        assert not known.contains(1, remote_file_identity(dict(info, file_size=4)), 'f1')
+
+    def test_modified_file_is_synced_again(self, tmp_path):
+        """Test a file whose size or modified date changed is stored as new."""
+        manager = FileManager(Settings(), str(tmp_path))
+        stored = {'id': 'f1', 'file_name': 'a.pdf', 'file_size': 3,
+                  'last_updated': '2024-01-01T00:00:00Z', 'file_url': 'https://files.example.com/a.pdf'}
+        modified = dict(stored, file_size=4, last_updated='2024-02-01T00:00:00Z')
+        known = KnownFiles()
+        known.add(1, remote_file_identity(stored), 'f1')
+        writer = MagicMock()
+
+        with patch.object(manager, 'get_contact_files', return_value=[modified]):
+            result = manager.sync_contact_files(1, download_files=False, writer=writer, known=known)
+
+        assert result['files_skipped'] == 0
+        writer.add.assert_called_once()
+        assert remote_file_identity(modified) in writer.add.call_args.args
+        assert known.contains(1, remote_file_identity(modified), 'f1')
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        """Test every added key is found and unrelated keys rarely are."""
+        bloom = BloomFilter(10000, error_rate=0.01)
+        for i in range(10000):
+            bloom.add(f'key{i}')
+        assert all(f'key{i}' in bloom for i in range(10000))
+        assert sum(f'other{i}' in bloom for i in range(10000)) < 300
+
+    def test_unchanged_contact_makes_no_extra_requests(self, tmp_path):
+        """Test known files are skipped from the listing alone."""
+        manager = FileManager(Settings(), str(tmp_path))
+        files = [{'id': 'f1', 'file_name': 'a.pdf', 'file_size': 3,
+                  'file_url': 'https://files.example.com/a.pdf'}]
+        known = KnownFiles()
+        known.add(1, remote_file_identity(files[0]), 'f1')
+        manager.download_session.head = MagicMock()
+        manager.download_session.get = MagicMock()
+
+        with patch.object(manager, 'get_contact_files', return_value=files), \
+             patch.object(manager, 'get_connection') as get_connection:
+            result = manager.sync_contact_files(1, download_files=True, writer=MagicMock(), known=known)
+
+        assert result['files_skipped'] == 1
+        get_connection.assert_not_called()
+        manager.download_session.head.assert_not_called()
+        manager.download_session.get.assert_not_called()
+
+
+class TestOrphanCleanup:
+    """Test reconciliation of stored files against the Keap inventory."""
+
+    def _setup(self, tmp_path, content, released):
+        manager = FileManager(Settings(), str(tmp_path))
+        manager._columns[('contact_files', 'content_hash')] = True
+        content_hash = hashlib.sha256(content).hexdigest()
+        object_path = manager.object_path(content_hash)
+        object_path.parent.mkdir(parents=True)
+        object_path.write_bytes(content)
+        link = manager._link_contact_file(content_hash, 1, 'gone.pdf')
+
+        conn = MagicMock()
+        cur = conn.cursor.return_value.__enter__.return_value
+        cur.fetchone.return_value = (2,)
+        cur.fetchmany.side_effect = [[(10, 1, 'f10', 'gone.pdf', str(link), len(content), 'h', content_hash)], []]
+        cur.fetchall.return_value = [(content_hash,)] if released else []
+        return manager, conn, cur, link, object_path
+
+    def _run(self, manager, conn, **kwargs):
+        with patch.object(manager, 'get_connection', return_value=conn), \
+             patch.object(manager, '_load_file_inventory', return_value=1):
+            return manager.cleanup_orphaned_files(**kwargs)
+
+    def test_quarantines_files_and_rows(self, tmp_path):
+        """Test an orphan's link and unreferenced object move to the quarantine."""
+        manager, conn, cur, link, object_path = self._setup(tmp_path, b'orphaned bytes', released=True)
+        report = self._run(manager, conn)
+
+        assert report['orphaned_rows'] == 1
+        assert report['files_removed'] == 1 and report['objects_removed'] == 1
+        assert report['reclaimed_bytes'] == len(b'orphaned bytes')
+        assert not link.exists() and not object_path.exists()
+        quarantine = tmp_path / 'quarantine'
+        assert sum(1 for p in quarantine.rglob('*') if p.is_file() and p.name != 'manifest.jsonl') == 2
+        assert '"keap_file_id": "f10"' in next(quarantine.rglob('manifest.jsonl')).read_text()
+        assert 'DELETE FROM keap.contact_files' in cur.execute.call_args[0][0]
+        assert cur.execute.call_args[0][1] == ([10],)
+
+    def test_shared_object_is_kept(self, tmp_path):
+        """Test deleting an orphan keeps an object other rows still reference."""
+        manager, conn, cur, link, object_path = self._setup(tmp_path, b'shared bytes', released=False)
+        report = self._run(manager, conn, delete=True)
+
+        assert not link.exists() and object_path.exists()
+        assert report['reclaimed_bytes'] == 0 and report['objects_removed'] == 0
+        assert not (tmp_path / 'quarantine').exists()
+
+    def test_dry_run_changes_nothing(self, tmp_path):
+        """Test a dry run reports reclaimable space without touching files or rows."""
+        manager, conn, cur, link, object_path = self._setup(tmp_path, b'kept bytes', released=True)
+        report = self._run(manager, conn, dry_run=True)
+
+        assert report['reclaimed_bytes'] == len(b'kept bytes')
+        assert link.exists() and object_path.exists()
+        assert not any('DELETE' in call[0][0] for call in cur.execute.call_args_list)
+
+    def test_empty_inventory_is_refused(self, tmp_path):
+        """Test an empty Keap listing never orphans every stored file."""
+        manager = FileManager(Settings(), str(tmp_path))
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value.fetchone.return_value = (5,)
+        with patch.object(manager, 'get_connection', return_value=conn), \
+             patch.object(manager, '_load_file_inventory', return_value=0):
+            with pytest.raises(ValueError, match='refusing'):
+                manager.cleanup_orphaned_files()
+
+    def test_inventory_is_streamed_by_page(self, tmp_path):
+        """Test the inventory is paged from Keap and loaded into the temp table page by page."""
+        manager = FileManager(Settings(), str(tmp_path))
+        pages = [{'files': [{'id': 0}, {'id': 1}]}, {'files': [{'id': 2}]}]
+        responses = [Mock(json=Mock(return_value=page)) for page in pages]
+        with patch.object(manager.client, 'request', side_effect=responses) as request:
+            assert list(manager.iter_file_inventory(page_size=2)) == [page['files'] for page in pages]
+        assert [call[1]['params']['offset'] for call in request.call_args_list] == [0, 2]
+
+        with patch.object(manager, 'iter_file_inventory', return_value=iter(p['files'] for p in pages)), \
+             patch('psycopg2.extras.execute_values') as execute_values:
+            assert manager._load_file_inventory(MagicMock()) == 3
+        assert [call[0][2] for call in execute_values.call_args_list] == [[('0',), ('1',)], [('2',)]]
+
+
+class TestConcurrentSync:
+    """Test the concurrent file sync engine."""
+
+    def test_sync_all_reports_throughput(self, tmp_path):
+        """Test all contacts are processed on the pool and totals add up."""
+        manager = FileManager(Settings(), str(tmp_path))
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value.fetchall.return_value = [(i,) for i in range(10)]
+        files = [{'id': 'f1', 'file_name': 'a.pdf', 'file_url': 'https://files.example.com/a.pdf'}]
+
+        manager._columns[('file_sync_pending', 'contact_id')] = False
+
+        with patch.object(manager, 'get_connection', return_value=conn), \
+             patch.object(manager, 'get_contact_files', return_value=files), \
+             patch.object(manager, 'load_known_files', return_value=KnownFiles()), \
+             patch('psycopg2.extras.execute_values') as execute_values:
+            result = manager.sync_all_contact_files(download_files=False, workers=4)
+
+        assert result['contacts_processed'] == 10
+        assert result['total_files_found'] == 10
+        assert result['total_files_downloaded'] == 10
+        assert result['errors'] == 0
+        assert 'files_per_second' in result and 'mb_per_second' in result
+        written = {table: sum(len(call[0][2]) for call in execute_values.call_args_list if table in call[0][1])
+                   for table in ('keap.contact_files', 'keap.file_download_log')}
+        assert written == {'keap.contact_files': 10, 'keap.file_download_log': 10}
+
+    def _incremental(self, tmp_path, contact_ids, checkpoint_every=3, fail=()):
+        cfg = Settings()
+        cfg.file_sync_checkpoint_every = checkpoint_every
+        manager = FileManager(cfg, str(tmp_path))
+        manager._columns[('file_sync_pending', 'contact_id')] = True
+
+        def sync(contact_id, *args, **kwargs):
+            if contact_id in fail:
+                raise RuntimeError('listing failed')
+            return {'files_found': 1, 'files_downloaded': 1, 'files_skipped': 0, 'bytes_downloaded': 0}
+
+        run = {'watermark': '2024-01-01', 'after': 0, 'started_at': '2024-01-02'}
+        patches = [
+            patch.object(manager, 'get_connection', return_value=MagicMock()),
+            patch.object(manager, 'load_known_files', return_value=KnownFiles()),
+            patch.object(manager, 'sync_contact_files', side_effect=sync),
+            patch.object(manager, '_start_file_sync_run', return_value=run),
+            patch.object(manager, '_changed_contact_ids', return_value=iter(contact_ids)),
+            patch('psycopg2.extras.execute_values'),
+            patch.object(manager, '_checkpoint_file_sync'),
+            patch.object(manager, '_finish_file_sync_run'),
+        ]
+        manager.execute_values = [p.start() for p in patches][5]
+        return manager, patches
+
+    def test_incremental_run_checkpoints_in_order(self, tmp_path):
+        """Test checkpoints only advance past finished contacts and the run completes."""
+        manager, patches = self._incremental(tmp_path, [3, 5, 8, 13, 21, 34, 55])
+        try:
+            result = manager.sync_all_contact_files(workers=2)
+            checkpoints = [call[0][2] for call in manager._checkpoint_file_sync.call_args_list]
+            logged = sum(len(call[0][2]) for call in manager.execute_values.call_args_list
+                         if 'file_download_log' in call[0][1])
+            manager._finish_file_sync_run.assert_called_once()
+        finally:
+            for p in patches:
+                p.stop()
+
+        assert checkpoints == sorted(checkpoints) and checkpoints[-1] == 55
+        assert logged == 7
+        assert result['complete'] and result['checkpoint'] == 55
+
+    def test_limit_leaves_run_open(self, tmp_path):
+        """Test a limited run checkpoints but does not advance the watermark."""
+        manager, patches = self._incremental(tmp_path, [1, 2, 3, 4, 5])
+        try:
+            result = manager.sync_all_contact_files(limit=3, workers=1)
+            manager._finish_file_sync_run.assert_not_called()
+            last_checkpoint = manager._checkpoint_file_sync.call_args[0][2]
+        finally:
+            for p in patches:
+                p.stop()
+
+        assert last_checkpoint == 3
+        assert not result['complete'] and result['contacts_processed'] == 3
+
+    def test_failed_contacts_are_flagged_again(self, tmp_path):
+        """Test a contact that errors is re-flagged and logged with its error."""
+        manager, patches = self._incremental(tmp_path, [1, 2, 3], fail={2})
+        try:
+            manager.sync_all_contact_files(workers=1)
+            failed = [id for call in manager._checkpoint_file_sync.call_args_list for id in call[0][3]]
+            rows = [row for call in manager.execute_values.call_args_list
+                    if 'file_download_log' in call[0][1] for row in call[0][2]]
+        finally:
+            for p in patches:
+                p.stop()
+
+        assert failed == [2]
+        assert [row[7] for row in rows if row[0] == 2] == ['listing failed']
+
+    def test_listing_errors_flag_the_contact_again(self, tmp_path):
+        """Test a listing that fails after retries is not counted as a contact without files."""
+        manager, patches = self._incremental(tmp_path, [1, 2, 3])
+        patches[2].stop()
+        try:
+            with patch.object(manager.client, 'request', side_effect=requests.HTTPError('429 Too Many Requests')):
+                manager.sync_all_contact_files(workers=1)
+            failed = [id for call in manager._checkpoint_file_sync.call_args_list for id in call[0][3]]
+        finally:
+            for p in patches[:2] + patches[3:]:
+                p.stop()
+
+        assert failed == [1, 2, 3]
+
+    def test_changed_contacts_are_paged_by_keyset(self, tmp_path):
+        """Test contact ids are fetched in pages after the last id seen."""
+        manager = FileManager(Settings(), str(tmp_path))
+        conn = MagicMock()
+        cur = conn.cursor.return_value.__enter__.return_value
+        cur.fetchall.side_effect = [[(1,), (2,)], [(3,)]]
+        run = {'watermark': '2024-01-01', 'after': 0, 'started_at': '2024-01-02'}
+
+        assert list(manager._changed_contact_ids(conn, run, 0, page_size=2)) == [1, 2, 3]
+        assert [call[0][1] for call in cur.execute.call_args_list] == [
+            ('2024-01-01', 0, 2), ('2024-01-01', 2, 2)]
+        assert 'file_sync_pending' in cur.execute.call_args[0][0]
+
+    def test_stats_snapshot(self):
+        """Test throughput is derived from the counters."""
+        stats = TransferStats()
+        stats.add(files_stored=2, bytes_downloaded=2 * 1024 * 1024)
+        snapshot = stats.snapshot()
+        assert snapshot['total_files_downloaded'] == 2
+        assert snapshot['mb_per_second'] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the health sampler module.
+"""
+
+from unittest.mock import Mock, patch
+import pytest
+
+# Add the src directory to the path
+import sys
+sys.path.insert(0, '/opt/es-keap-database/src')
+
+from keap_export.health_sampler import HealthSampler, start_health_sampler
+from keap_export.config import Settings
+
+
+class TestHealthSampler:
+    """Test the HealthSampler class."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.cfg = Settings(health_sample_interval=15)
+        self.sampler = HealthSampler(self.cfg, run_id=42)
+
+    def test_collect_without_sync(self):
+        """Test process-level metrics are collected with no sync attached."""
+        names = {name for name, _, _ in self.sampler.collect()}
+
+        assert {'cpu_time', 'cpu_usage', 'gc_pause', 'gc_collections'} <= names
+        assert 'pages_in_flight' not in names
+        assert 'throttle_remaining' not in names
+
+    def test_collect_with_attached_sync(self):
+        """Test sync context is included once a sync is attached."""
+        sync = Mock(entity='contacts', current_page=3, pages_in_flight=1)
+        sync.client.last_throttle_remaining = 120
+        sync.client.session = None
+        self.sampler.attach(sync)
+
+        metrics = {name: value for name, value, _ in self.sampler.collect()}
+
+        assert metrics['pages_in_flight'] == 1
+        assert metrics['throttle_remaining'] == 120
+        assert self.sampler._tags()['entity'] == 'contacts'
+        assert self.sampler._tags()['page'] == 3
+
+    def test_detach_only_clears_matching_sync(self):
+        """Test detaching a different sync leaves the current one attached."""
+        current, other = Mock(), Mock()
+        self.sampler.attach(current)
+
+        self.sampler.detach(other)
+        assert self.sampler._sync is current
+
+        self.sampler.detach(current)
+        assert self.sampler._sync is None
+
+    def test_gc_pause_accounting(self):
+        """Test GC callbacks accumulate pause time between samples."""
+        with patch('keap_export.health_sampler.time.perf_counter', side_effect=[1.0, 1.25]):
+            self.sampler._gc_callback('start', {})
+            self.sampler._gc_callback('stop', {})
+
+        metrics = {name: value for name, value, _ in self.sampler.collect()}
+        assert metrics['gc_pause'] == pytest.approx(250.0)
+        assert metrics['gc_collections'] == 1
+
+        # Deltas reset after each sample
+        metrics = {name: value for name, value, _ in self.sampler.collect()}
+        assert metrics['gc_pause'] == 0
+        assert metrics['gc_collections'] == 0
+
+    def test_http_pool_usage_counts_checked_out_connections(self):
+        """Test pool usage is derived from the urllib3 pool queue."""
+        pool = Mock()
+        pool.pool.maxsize = 10
+        pool.pool.qsize.return_value = 7
+        adapter = Mock()
+        adapter.poolmanager.pools = {'api.infusionsoft.com': pool}
+        sync = Mock()
+        sync.client.session.adapters = {'https://': adapter}
+        self.sampler.attach(sync)
+
+        assert self.sampler._http_pool_usage() == (1, 3)
+
+
+class TestStartHealthSampler:
+    """Test the start_health_sampler factory."""
+
+    def test_disabled_without_run_id(self):
+        """Test no sampler is started when there is no ETL run."""
+        assert start_health_sampler(Settings(), None) is None
+
+    def test_disabled_with_zero_interval(self):
+        """Test a zero interval disables sampling."""
+        assert start_health_sampler(Settings(health_sample_interval=0), 1) is None
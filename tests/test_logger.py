@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the logger module.
+"""
+
+import json
+import logging
+from unittest.mock import patch
+
+# Add the src directory to the path
+import sys
+sys.path.insert(0, '/opt/es-keap-database/src')
+
+from keap_export.logger import (
+    EventSampler, JSONFormatter, KeapLogger, _EventMessage, parse_sample_rates
+)
+from keap_export.config import Settings
+
+
+def _record(msg):
+    return logging.LogRecord('keap_export', logging.INFO, __file__, 1, msg, None, None)
+
+
+class TestEventSampler:
+    """Test sampling and window aggregation."""
+
+    def test_parse_sample_rates(self):
+        """Test the LOG_SAMPLE spec is parsed and bad entries are ignored."""
+        rates = parse_sample_rates('page_fetch=100, upsert_batch=50,bogus,x=abc')
+        assert rates == {'page_fetch': 100, 'upsert_batch': 50}
+
+    def test_unsampled_events_pass_through(self):
+        """Test events without a rate are emitted unchanged."""
+        sampler = EventSampler({'page_fetch': 10})
+        event = {'event': 'sync_start', 'entity': 'contacts'}
+        assert sampler.offer(event) is event
+
+    def test_window_totals(self):
+        """Test 1 in N events are emitted with totals for the window."""
+        sampler = EventSampler({'page_fetch': 3})
+        emitted = [sampler.offer({'event': 'page_fetch', 'entity': 'contacts', 'page': p,
+                                  'items_count': 100, 'duration_ms': 10}) for p in range(1, 5)]
+
+        assert emitted[:2] == [None, None]
+        assert emitted[2]['page'] == 3
+        assert emitted[2]['sampled'] == {'rate': 3, 'events': 3, 'items_count': 300, 'duration_ms': 30}
+        assert emitted[3] is None
+
+        flushed = list(sampler.flush('contacts'))
+        assert len(flushed) == 1
+        assert flushed[0]['sampled']['events'] == 1
+        assert list(sampler.flush()) == []
+
+    def test_flush_is_per_entity(self):
+        """Test flushing one entity leaves other windows open."""
+        sampler = EventSampler({'upsert_batch': 5})
+        sampler.offer({'event': 'upsert_batch', 'entity': 'tags', 'batch_size': 1})
+        sampler.offer({'event': 'upsert_batch', 'entity': 'notes', 'batch_size': 1})
+
+        assert [e['entity'] for e in sampler.flush('tags')] == ['tags']
+        assert [e['entity'] for e in sampler.flush()] == ['notes']
+
+
+class TestJSONFormatter:
+    """Test the JSON formatter."""
+
+    def test_event_serialized_once(self):
+        """Test event dicts are dumped without a parse round-trip."""
+        formatter = JSONFormatter()
+        with patch('keap_export.logger.json.loads') as loads:
+            output = formatter.format(_record(_EventMessage({'event': 'page_fetch', 'page': 2})))
+        loads.assert_not_called()
+        assert json.loads(output) == {'event': 'page_fetch', 'page': 2}
+
+    def test_plain_message_wrapped(self):
+        """Test plain messages from other callers are wrapped as JSON."""
+        output = json.loads(JSONFormatter().format(_record('hello')))
+        assert output['message'] == 'hello'
+        assert output['level'] == 'INFO'
+
+
+class TestKeapLogger:
+    """Test the KeapLogger class."""
+
+    def test_sync_mode_writes_events(self, capsys):
+        """Test events reach stdout when async logging is disabled."""
+        logger = KeapLogger(Settings(log_async=False, log_sample='page_fetch=2'))
+        logger.log_page_fetch('contacts', 1, 100, 50)
+        logger.log_page_fetch('contacts', 2, 100, 70)
+        logger.log_sync_end('contacts', 200, 1.5)
+
+        lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [line['event'] for line in lines] == ['page_fetch', 'sync_end']
+        assert lines[0]['sampled']['duration_ms'] == 120
+
+    def test_loggers_share_one_listener(self):
+        """Test repeated get_logger calls reuse the background writer."""
+        import keap_export.logger as logger_module
+        cfg = Settings(log_async=True)
+        KeapLogger(cfg)
+        listener = logger_module._listener
+        KeapLogger(cfg)
+
+        assert listener is not None
+        assert logger_module._listener is listener
+        logger_module._stop_listener()
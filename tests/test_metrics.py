@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the metrics module.
+"""
+
+import urllib.request
+import pytest
+
+# Add the src directory to the path
+import sys
+sys.path.insert(0, '/opt/es-keap-database/src')
+
+from keap_export.metrics import MetricsRegistry, MetricsHandler, start_metrics_server
+
+
+class TestMetricsRegistry:
+    """Test metric families and text exposition."""
+
+    def setup_method(self):
+        """Set up test fixtures."""
+        self.registry = MetricsRegistry()
+
+    def test_counter_prometheus_format(self):
+        """Test counters render with a _total family in Prometheus text."""
+        pages = self.registry.counter('keap_pages_fetched', 'API pages fetched', ['entity'])
+        pages.inc(entity='contacts')
+        pages.inc(2, entity='contacts')
+
+        output = self.registry.render()
+
+        assert '# TYPE keap_pages_fetched_total counter' in output
+        assert 'keap_pages_fetched_total{entity="contacts"} 3' in output
+        assert '# EOF' not in output
+
+    def test_counter_openmetrics_format(self):
+        """Test OpenMetrics output strips _total from the family and ends with EOF."""
+        pages = self.registry.counter('keap_pages_fetched', 'API pages fetched', ['entity'])
+        pages.inc(entity='tags')
+
+        output = self.registry.render(openmetrics=True)
+
+        assert '# TYPE keap_pages_fetched counter' in output
+        assert 'keap_pages_fetched_total{entity="tags"} 1' in output
+        assert output.endswith('# EOF\n')
+
+    def test_gauge_set_and_dec(self):
+        """Test gauges can move in both directions."""
+        depth = self.registry.gauge('keap_sync_queue_depth', 'Queue depth', ['entity'])
+        depth.set(10, entity='notes')
+        depth.dec(4, entity='notes')
+
+        assert depth.get(entity='notes') == 6
+        assert 'keap_sync_queue_depth{entity="notes"} 6' in self.registry.render()
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram buckets, count and sum."""
+        latency = self.registry.histogram('keap_request_duration_seconds', 'Latency',
+                                          ['entity'], buckets=(0.5, 1.0))
+        latency.observe(0.2, entity='contacts')
+        latency.observe(0.7, entity='contacts')
+        latency.observe(3.0, entity='contacts')
+
+        output = self.registry.render()
+
+        assert 'keap_request_duration_seconds_bucket{entity="contacts",le="0.5"} 1' in output
+        assert 'keap_request_duration_seconds_bucket{entity="contacts",le="1"} 2' in output
+        assert 'keap_request_duration_seconds_bucket{entity="contacts",le="+Inf"} 3' in output
+        assert 'keap_request_duration_seconds_count{entity="contacts"} 3' in output
+        assert 'keap_request_duration_seconds_sum{entity="contacts"} 3.9' in output
+
+    def test_label_values_are_escaped(self):
+        """Test quotes in label values are escaped."""
+        errors = self.registry.counter('keap_sync_errors', 'Errors', ['entity'])
+        errors.inc(entity='bad"name')
+
+        assert 'entity="bad\\"name"' in self.registry.render()
+
+    def test_duplicate_metric_rejected(self):
+        """Test registering the same name twice fails."""
+        self.registry.counter('keap_pages_fetched', 'API pages fetched')
+        with pytest.raises(ValueError, match="Duplicate metric"):
+            self.registry.gauge('keap_pages_fetched', 'Again')
+
+
+class TestMetricsServer:
+    """Test the HTTP exposition endpoint."""
+
+    def test_metrics_endpoint_serves_registry(self):
+        """Test /metrics returns the rendered registry and /health returns ok."""
+        registry = MetricsRegistry()
+        registry.counter('keap_records_upserted', 'Upserted', ['entity']).inc(5, entity='users')
+        original = MetricsHandler.registry
+        MetricsHandler.registry = registry
+        httpd = start_metrics_server(0)
+        try:
+            port = httpd.server_address[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+                body = resp.read().decode()
+                assert resp.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            assert 'keap_records_upserted_total{entity="users"} 5' in body
+
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health") as resp:
+                assert resp.read() == b'ok'
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+            MetricsHandler.registry = original
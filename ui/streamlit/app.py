@@ -5,9 +5,12 @@ Read-only interface to verify Keap → PostgreSQL export data
 
 import streamlit as st
 import psycopg2
+from psycopg2 import pool
 import httpx
 import json
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 from dotenv import load_dotenv
@@ -65,6 +68,77 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Cache lifetimes (seconds). Query results are also keyed on the latest ETL run,
+# so a finished sync invalidates them immediately; the TTL only bounds staleness
+# from writes made outside the ETL.
+DATA_VERSION_TTL = 5
+QUERY_TTL = 600
+TOKEN_TTL = 300
+
+TOKEN_FILE = '/opt/es-keap-database/.keap_tokens.json'
+
+# Entity Browser search, backed by the indexes in sql/add_search_indexes.sql.
+# %(like)s is the escaped ILIKE pattern, %(term)s the raw search term.
+SEARCH_FILTERS = {
+    'contacts': "given_name ILIKE %(like)s OR family_name ILIKE %(like)s OR email ILIKE %(like)s",
+    'companies': "name ILIKE %(like)s",
+    'notes': ("title ILIKE %(like)s"
+              " OR to_tsvector('english', coalesce(body, '')) @@ plainto_tsquery('english', %(term)s)"),
+}
+
+
+POOL_SIZE = int(os.getenv('UI_DB_POOL_SIZE', '5'))
+# Seconds a session waits for a free pooled connection before giving up
+POOL_TIMEOUT = float(os.getenv('UI_DB_POOL_TIMEOUT', '30'))
+
+
+@st.cache_resource
+def get_connection_pool(**db_config) -> pool.ThreadedConnectionPool:
+    """One connection pool per process, shared by every session and rerun"""
+    return pool.ThreadedConnectionPool(1, POOL_SIZE, **db_config)
+
+
+@st.cache_resource
+def get_pool_slots() -> threading.BoundedSemaphore:
+    """One slot per pooled connection; getconn raises PoolError instead of waiting"""
+    return threading.BoundedSemaphore(POOL_SIZE)
+
+
+@st.cache_data(ttl=TOKEN_TTL, show_spinner=False)
+def read_keap_token(path: str, mtime: float) -> Optional[str]:
+    """Read the access token; mtime is part of the key so a refreshed file is re-read"""
+    with open(path, 'r') as f:
+        return json.load(f).get('access_token')
+
+
+@st.cache_data(ttl=DATA_VERSION_TTL, show_spinner=False)
+def fetch_data_version(_ui: 'KeapExportUI') -> tuple:
+    """Id and finish time of the latest ETL run, used as the key of cached queries"""
+    with _ui.db_connection() as conn:
+        if not conn:
+            raise RuntimeError("Database connection failed")
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT id, finished_at
+                FROM keap_meta.etl_run_log
+                ORDER BY id DESC
+                LIMIT 1
+            """)
+            row = cur.fetchone()
+            return tuple(row) if row else (None, None)
+
+
+@st.cache_data(ttl=QUERY_TTL, show_spinner=False)
+def query_rows(_ui: 'KeapExportUI', sql: str, params: Any, version: tuple) -> List[tuple]:
+    """Run a read-only query, cached per (sql, params, data version)"""
+    with _ui.db_connection() as conn:
+        if not conn:
+            raise RuntimeError("Database connection failed")
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall()
+
+
 class KeapExportUI:
     def __init__(self):
         self.db_config = {
@@ -79,127 +153,229 @@ class KeapExportUI:
     def _load_keap_token(self) -> Optional[str]:
         """Load Keap access token from file"""
         try:
-            with open('/opt/es-keap-database/.keap_tokens.json', 'r') as f:
-                tokens = json.load(f)
-                return tokens.get('access_token')
+            return read_keap_token(TOKEN_FILE, os.path.getmtime(TOKEN_FILE))
         except Exception as e:
             st.error(f"Failed to load Keap token: {e}")
             return None
     
-    def get_db_connection(self):
-        """Get PostgreSQL connection"""
+    @contextmanager
+    def db_connection(self):
+        """Borrow a pooled read-only PostgreSQL connection (None if unavailable)
+        
+        Sessions wait up to UI_DB_POOL_TIMEOUT seconds for a free connection
+        once all UI_DB_POOL_SIZE are in use.
+        """
+        slots = get_pool_slots()
+        if not slots.acquire(timeout=POOL_TIMEOUT):
+            st.error("Database connection failed: all connections are busy, try again shortly")
+            yield None
+            return
         try:
-            return psycopg2.connect(**self.db_config)
-        except Exception as e:
-            st.error(f"Database connection failed: {e}")
-            return None
+            try:
+                db_pool = get_connection_pool(**self.db_config)
+                conn = db_pool.getconn()
+            except Exception as e:
+                st.error(f"Database connection failed: {e}")
+                conn = None
+            if conn is None:
+                yield None
+                return
+            
+            broken = False
+            try:
+                if not conn.autocommit:
+                    conn.set_session(readonly=True, autocommit=True)
+                yield conn
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                broken = True
+                raise
+            finally:
+                db_pool.putconn(conn, close=broken or bool(conn.closed))
+        finally:
+            slots.release()
+    
+    def data_version(self) -> tuple:
+        """Key that changes whenever an ETL run starts or finishes"""
+        return fetch_data_version(self)
+    
+    def cached_query(self, sql: str, params: Any = ()) -> List[tuple]:
+        """Query results served from cache until the next ETL run"""
+        return query_rows(self, sql, params, self.data_version())
     
     def get_entity_counts(self) -> Dict[str, int]:
         """Get record counts for all entities"""
-        conn = self.get_db_connection()
-        if not conn:
-            return {}
-        
         entities = ['contacts', 'companies', 'opportunities', 'tasks', 'notes', 'tags', 'users']
-        counts = {}
         
         try:
-            with conn.cursor() as cur:
-                for entity in entities:
-                    cur.execute(f"SELECT COUNT(*) FROM keap.{entity}")
-                    counts[entity] = cur.fetchone()[0]
+            rows = self.cached_query(" UNION ALL ".join(
+                f"SELECT '{entity}', COUNT(*) FROM keap.{entity}" for entity in entities
+            ))
+            return dict(rows)
         except Exception as e:
             st.error(f"Error getting entity counts: {e}")
-        finally:
-            conn.close()
-        
-        return counts
+            return {}
     
     def get_etl_runs(self) -> List[Dict]:
         """Get recent ETL runs"""
-        conn = self.get_db_connection()
-        if not conn:
-            return []
-        
         try:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT id, started_at, finished_at, status, notes
-                    FROM keap_meta.etl_run_log
-                    ORDER BY started_at DESC
-                    LIMIT 10
-                """)
-                runs = []
-                for row in cur.fetchall():
-                    duration = None
-                    if row[2]:  # finished_at
-                        start = row[1]
-                        end = row[2]
-                        if isinstance(start, str):
-                            start = datetime.fromisoformat(start.replace('Z', '+00:00'))
-                        if isinstance(end, str):
-                            end = datetime.fromisoformat(end.replace('Z', '+00:00'))
-                        duration = str(end - start)
-                    
-                    runs.append({
-                        'id': row[0],
-                        'started_at': row[1],
-                        'finished_at': row[2],
-                        'duration': duration,
-                        'status': row[3],
-                        'notes': row[4]
-                    })
-                return runs
+            rows = self.cached_query("""
+                SELECT id, started_at, finished_at, status, notes
+                FROM keap_meta.etl_run_log
+                ORDER BY started_at DESC
+                LIMIT 10
+            """)
         except Exception as e:
             st.error(f"Error getting ETL runs: {e}")
             return []
-        finally:
-            conn.close()
+        
+        runs = []
+        for row in rows:
+            duration = None
+            if row[2]:  # finished_at
+                start = row[1]
+                end = row[2]
+                if isinstance(start, str):
+                    start = datetime.fromisoformat(start.replace('Z', '+00:00'))
+                if isinstance(end, str):
+                    end = datetime.fromisoformat(end.replace('Z', '+00:00'))
+                duration = str(end - start)
+            
+            runs.append({
+                'id': row[0],
+                'started_at': row[1],
+                'finished_at': row[2],
+                'duration': duration,
+                'status': row[3],
+                'notes': row[4]
+            })
+        return runs
+    
+    def get_run_metrics(self, run_id: int) -> List[tuple]:
+        """Get request metrics for one ETL run"""
+        return self.cached_query("""
+            SELECT entity, endpoint, item_count, duration_ms, throttle_remaining
+            FROM keap_meta.etl_request_metrics
+            WHERE run_id = %s
+            ORDER BY created_at
+        """, (run_id,))
+    
+    def has_contact_rollup(self) -> bool:
+        """Whether sql/add_contact_rollup.sql is applied (same check as the sync refresh)"""
+        return self.cached_query(
+            "SELECT to_regprocedure('keap.refresh_contact_rollup(bigint[])') IS NOT NULL"
+        )[0][0]
+    
+    def get_contact_coverage(self) -> Dict:
+        """Get engagement coverage from the per-contact rollup, or the child tables without it"""
+        try:
+            if self.has_contact_rollup():
+                row = self.cached_query("""
+                    SELECT
+                        COUNT(*) FILTER (WHERE opportunity_count > 0),
+                        COUNT(*) FILTER (WHERE task_count > 0),
+                        COUNT(*) FILTER (WHERE note_count > 0),
+                        COUNT(*) FILTER (WHERE tag_count > 0),
+                        COALESCE(SUM(opportunity_value), 0),
+                        MAX(last_activity_at)
+                    FROM keap.contact_rollup
+                """)[0]
+            else:
+                row = self.cached_query("""
+                    SELECT
+                        (SELECT COUNT(DISTINCT contact_id) FROM keap.opportunities),
+                        (SELECT COUNT(DISTINCT contact_id) FROM keap.tasks),
+                        (SELECT COUNT(DISTINCT contact_id) FROM keap.notes),
+                        (SELECT COUNT(DISTINCT contact_id) FROM keap.contact_tags),
+                        (SELECT COALESCE(SUM(value), 0) FROM keap.opportunities),
+                        GREATEST(
+                            (SELECT MAX(updated_at) FROM keap.opportunities WHERE contact_id IS NOT NULL),
+                            (SELECT MAX(updated_at) FROM keap.tasks WHERE contact_id IS NOT NULL),
+                            (SELECT MAX(updated_at) FROM keap.notes WHERE contact_id IS NOT NULL)
+                        )
+                """)[0]
+            return {
+                'with_opportunities': row[0],
+                'with_tasks': row[1],
+                'with_notes': row[2],
+                'with_tags': row[3],
+                'pipeline_value': row[4],
+                'last_activity_at': row[5]
+            }
+        except Exception as e:
+            st.error(f"Error getting contact coverage: {e}")
+            return {}
     
     def get_validation_results(self) -> Dict[str, int]:
         """Get validation results"""
-        conn = self.get_db_connection()
-        if not conn:
-            return {}
-        
-        results = {}
-        
         try:
-            with conn.cursor() as cur:
-                # Check for orphaned notes
-                cur.execute("""
-                    SELECT COUNT(*) FROM keap.notes n
-                    LEFT JOIN keap.contacts c ON n.contact_id = c.id
-                    WHERE c.id IS NULL AND n.contact_id IS NOT NULL
-                """)
-                results['orphaned_notes'] = cur.fetchone()[0]
-                
-                # Check for orphaned tasks
-                cur.execute("""
-                    SELECT COUNT(*) FROM keap.tasks t
-                    LEFT JOIN keap.contacts c ON t.contact_id = c.id
-                    WHERE c.id IS NULL AND t.contact_id IS NOT NULL
-                """)
-                results['orphaned_tasks'] = cur.fetchone()[0]
-                
-                # Check for duplicate emails
-                cur.execute("""
-                    SELECT COUNT(*) FROM (
-                        SELECT email, COUNT(*) as cnt
+            row = self.cached_query("""
+                SELECT
+                    -- Orphaned notes
+                    (SELECT COUNT(*) FROM keap.notes n
+                     LEFT JOIN keap.contacts c ON n.contact_id = c.id
+                     WHERE c.id IS NULL AND n.contact_id IS NOT NULL),
+                    -- Orphaned tasks
+                    (SELECT COUNT(*) FROM keap.tasks t
+                     LEFT JOIN keap.contacts c ON t.contact_id = c.id
+                     WHERE c.id IS NULL AND t.contact_id IS NOT NULL),
+                    -- Duplicate emails
+                    (SELECT COUNT(*) FROM (
+                        SELECT email
                         FROM keap.contacts
                         WHERE email IS NOT NULL
                         GROUP BY email
                         HAVING COUNT(*) > 1
-                    ) duplicates
-                """)
-                results['duplicate_emails'] = cur.fetchone()[0]
-                
+                     ) duplicates)
+            """)[0]
+            return {
+                'orphaned_notes': row[0],
+                'orphaned_tasks': row[1],
+                'duplicate_emails': row[2]
+            }
         except Exception as e:
             st.error(f"Error getting validation results: {e}")
-        finally:
-            conn.close()
+            return {}
+    
+    def get_browse_columns(self, entity: str) -> List[str]:
+        """Columns shown in the Entity Browser: everything except raw"""
+        rows = self.cached_query("""
+            SELECT column_name
+            FROM information_schema.columns
+            WHERE table_schema = 'keap' AND table_name = %s AND column_name <> 'raw'
+            ORDER BY ordinal_position
+        """, (entity,))
+        return [row[0] for row in rows]
+    
+    def browse_entity(self, entity: str, search_term: str = '',
+                      before_id: Optional[int] = None, limit: int = 100) -> tuple:
+        """One page of records ordered by id descending, starting below before_id
+        
+        Returns (columns, rows, has_more).
+        """
+        columns = self.get_browse_columns(entity)
+        conditions = []
+        params = {'limit': limit + 1}
+        
+        if search_term and entity in SEARCH_FILTERS:
+            escaped = search_term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            conditions.append(f"({SEARCH_FILTERS[entity]})")
+            params.update(like=f"%{escaped}%", term=search_term)
+        if before_id is not None:
+            conditions.append("id < %(before_id)s")
+            params['before_id'] = before_id
         
-        return results
+        query = f"SELECT {', '.join(columns)} FROM keap.{entity}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id DESC LIMIT %(limit)s"
+        
+        rows = self.cached_query(query, params)
+        return columns, rows[:limit], len(rows) > limit
+    
+    def get_raw_record(self, entity: str, record_id: int) -> Optional[Dict]:
+        """Raw Keap payload of one record"""
+        rows = self.cached_query(f"SELECT raw FROM keap.{entity} WHERE id = %s", (record_id,))
+        return rows[0][0] if rows else None
     
     def fetch_keap_record(self, entity: str, record_id: str) -> Optional[Dict]:
         """Fetch record from Keap API"""
@@ -220,23 +396,21 @@ class KeapExportUI:
     
     def fetch_db_record(self, entity: str, record_id: str) -> Optional[Dict]:
         """Fetch record from PostgreSQL"""
-        conn = self.get_db_connection()
-        if not conn:
-            return None
-        
-        try:
-            with conn.cursor() as cur:
-                cur.execute(f"SELECT * FROM keap.{entity} WHERE id = %s", (record_id,))
-                row = cur.fetchone()
-                if row:
-                    columns = [desc[0] for desc in cur.description]
-                    return dict(zip(columns, row))
+        with self.db_connection() as conn:
+            if not conn:
+                return None
+            
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(f"SELECT * FROM keap.{entity} WHERE id = %s", (record_id,))
+                    row = cur.fetchone()
+                    if row:
+                        columns = [desc[0] for desc in cur.description]
+                        return dict(zip(columns, row))
+                    return None
+            except Exception as e:
+                st.error(f"Error fetching from database: {e}")
                 return None
-        except Exception as e:
-            st.error(f"Error fetching from database: {e}")
-            return None
-        finally:
-            conn.close()
     
     def compare_records(self, keap_data: Dict, db_data: Dict) -> List[Dict]:
         """Compare Keap and database records"""
@@ -283,6 +457,10 @@ def main():
         ["Overview", "Entity Browser", "Record Inspector", "ETL Runs", "Validation Results"]
     )
     
+    # Cached results refresh on their own after each ETL run
+    if st.sidebar.button("Refresh data"):
+        st.cache_data.clear()
+    
     if page == "Overview":
         show_overview(ui)
     elif page == "Entity Browser":
@@ -324,6 +502,24 @@ def show_overview(ui: KeapExportUI):
     with col8:
         st.metric("Products", "Not used", help="No products found in Keap")
     
+    # Engagement coverage
+    coverage = ui.get_contact_coverage()
+    if coverage:
+        st.subheader("🤝 Engagement Coverage")
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("With Opportunities", f"{coverage['with_opportunities']:,}")
+        with col2:
+            st.metric("With Tasks", f"{coverage['with_tasks']:,}")
+        with col3:
+            st.metric("With Notes", f"{coverage['with_notes']:,}")
+        with col4:
+            st.metric("With Tags", f"{coverage['with_tags']:,}")
+        
+        st.markdown(f"**Pipeline Value:** {coverage['pipeline_value']:,.2f} · "
+                    f"**Last Activity:** {coverage['last_activity_at'] or 'N/A'}")
+    
     # Sync health
     st.subheader("🔄 Sync Health")
     runs = ui.get_etl_runs()
@@ -375,43 +571,60 @@ def show_entity_browser(ui: KeapExportUI):
     with col1:
         search_term = st.text_input("Search", placeholder="Enter search term...")
     with col2:
-        limit = st.number_input("Limit", min_value=10, max_value=1000, value=100)
+        limit = st.number_input("Page size", min_value=10, max_value=1000, value=100)
     with col3:
         has_diff = st.checkbox("Show records with differences only")
     
-    # Fetch and display data
-    conn = ui.get_db_connection()
-    if conn:
+    if search_term and entity not in SEARCH_FILTERS:
+        st.info(f"Search is not available for {entity}")
+    
+    # Keyset pagination: each page starts below the last id of the previous one.
+    # The stack of page starts resets whenever the entity, search or page size changes.
+    browse_key = (entity, search_term, limit)
+    if st.session_state.get('browse_key') != browse_key:
+        st.session_state.browse_key = browse_key
+        st.session_state.browse_pages = [None]
+    pages = st.session_state.browse_pages
+    
+    try:
+        columns, rows, has_more = ui.browse_entity(entity, search_term, pages[-1], int(limit))
+    except Exception as e:
+        st.error(f"Error fetching data: {e}")
+        return
+    
+    if not rows:
+        st.info("No records found")
+        return
+    
+    st.dataframe(
+        data=[dict(zip(columns, row)) for row in rows],
+        use_container_width=True
+    )
+    
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        if st.button("◀ Previous", disabled=len(pages) == 1):
+            pages.pop()
+            st.rerun()
+    with col2:
+        if st.button("Next ▶", disabled=not has_more):
+            pages.append(rows[-1][columns.index('id')])
+            st.rerun()
+    with col3:
+        st.caption(f"Page {len(pages)}")
+    
+    # Raw payload is only loaded for the expanded record
+    record_id = st.selectbox(
+        "Expand record",
+        [None] + [row[columns.index('id')] for row in rows],
+        format_func=lambda value: "Select a record ID..." if value is None else str(value)
+    )
+    if record_id is not None:
         try:
-            with conn.cursor() as cur:
-                query = f"SELECT * FROM keap.{entity}"
-                params = []
-                
-                if search_term:
-                    if entity == 'contacts':
-                        query += " WHERE given_name ILIKE %s OR family_name ILIKE %s OR email ILIKE %s"
-                        params.extend([f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"])
-                    elif entity == 'companies':
-                        query += " WHERE company_name ILIKE %s"
-                        params.append(f"%{search_term}%")
-                
-                query += f" ORDER BY id DESC LIMIT {limit}"
-                
-                cur.execute(query, params)
-                rows = cur.fetchall()
-                columns = [desc[0] for desc in cur.description]
-                
-                if rows:
-                    st.dataframe(
-                        data=[dict(zip(columns, row)) for row in rows],
-                        use_container_width=True
-                    )
-                else:
-                    st.info("No records found")
+            with st.expander(f"{entity} {record_id} - raw", expanded=True):
+                st.json(ui.get_raw_record(entity, record_id))
         except Exception as e:
-            st.error(f"Error fetching data: {e}")
-        finally:
-            conn.close()
+            st.error(f"Error fetching record: {e}")
 
 def show_record_inspector(ui: KeapExportUI):
     """Show record inspector"""
@@ -495,34 +708,22 @@ def show_etl_runs(ui: KeapExportUI):
                         st.markdown(f"**Notes:** {run['notes']}")
                 
                 # Get request metrics for this run
-                conn = ui.get_db_connection()
-                if conn:
-                    try:
-                        with conn.cursor() as cur:
-                            cur.execute("""
-                                SELECT entity, endpoint, item_count, duration_ms, throttle_remaining
-                                FROM keap_meta.etl_request_metrics
-                                WHERE run_id = %s
-                                ORDER BY created_at
-                            """, (run['id'],))
-                            
-                            metrics = cur.fetchall()
-                            if metrics:
-                                st.subheader("Request Metrics")
-                                st.dataframe(
-                                    data=[{
-                                        'Entity': m[0],
-                                        'Endpoint': m[1],
-                                        'Items': m[2],
-                                        'Duration (ms)': m[3],
-                                        'Throttle Remaining': m[4]
-                                    } for m in metrics],
-                                    use_container_width=True
-                                )
-                    except Exception as e:
-                        st.error(f"Error fetching metrics: {e}")
-                    finally:
-                        conn.close()
+                try:
+                    metrics = ui.get_run_metrics(run['id'])
+                    if metrics:
+                        st.subheader("Request Metrics")
+                        st.dataframe(
+                            data=[{
+                                'Entity': m[0],
+                                'Endpoint': m[1],
+                                'Items': m[2],
+                                'Duration (ms)': m[3],
+                                'Throttle Remaining': m[4]
+                            } for m in metrics],
+                            use_container_width=True
+                        )
+                except Exception as e:
+                    st.error(f"Error fetching metrics: {e}")
     else:
         st.info("No ETL runs found")
 
@@ -562,32 +763,26 @@ def show_validation_results(ui: KeapExportUI):
         # Show orphaned notes
         if validation_results.get('orphaned_notes', 0) > 0:
             st.subheader("Orphaned Notes")
-            conn = ui.get_db_connection()
-            if conn:
-                try:
-                    with conn.cursor() as cur:
-                        cur.execute("""
-                            SELECT n.id, n.contact_id, n.body, n.created_at
-                            FROM keap.notes n
-                            LEFT JOIN keap.contacts c ON n.contact_id = c.id
-                            WHERE c.id IS NULL AND n.contact_id IS NOT NULL
-                            LIMIT 10
-                        """)
-                        orphaned_notes = cur.fetchall()
-                        if orphaned_notes:
-                            st.dataframe(
-                                data=[{
-                                    'Note ID': note[0],
-                                    'Contact ID': note[1],
-                                    'Body': note[2][:100] + '...' if len(note[2]) > 100 else note[2],
-                                    'Created': note[3]
-                                } for note in orphaned_notes],
-                                use_container_width=True
-                            )
-                except Exception as e:
-                    st.error(f"Error fetching orphaned notes: {e}")
-                finally:
-                    conn.close()
+            try:
+                orphaned_notes = ui.cached_query("""
+                    SELECT n.id, n.contact_id, n.body, n.created_at
+                    FROM keap.notes n
+                    LEFT JOIN keap.contacts c ON n.contact_id = c.id
+                    WHERE c.id IS NULL AND n.contact_id IS NOT NULL
+                    LIMIT 10
+                """)
+                if orphaned_notes:
+                    st.dataframe(
+                        data=[{
+                            'Note ID': note[0],
+                            'Contact ID': note[1],
+                            'Body': note[2][:100] + '...' if len(note[2]) > 100 else note[2],
+                            'Created': note[3]
+                        } for note in orphaned_notes],
+                        use_container_width=True
+                    )
+            except Exception as e:
+                st.error(f"Error fetching orphaned notes: {e}")
     else:
         st.success("✅ All validations passed!")
 